@@ -0,0 +1,339 @@
+"""Admission control for the analysis endpoints.
+
+A fixed number of pipelines run at once; further requests wait in a bounded queue that
+is shared fairly between users (weighted, with an optional per-user concurrency cap).
+A request is turned away immediately, rather than slowing every other request down,
+when:
+
+- the queue is full -> 429 with `Retry-After`;
+- its estimated queue wait is longer than its deadline, or it waited `ADMISSION_MAX_WAIT_S`
+  without getting a slot -> 503 with `Retry-After`.
+
+The estimate is queue position / slots x a moving average of pipeline service time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from milestone3.backend.deadlines import Deadline
+from milestone3.backend.embedding_batcher import Histogram
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def admission_enabled() -> bool:
+    return os.getenv("ADMISSION", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+class AdmissionRejected(Exception):
+    """Request shed before it started; maps to an HTTP 429/503 with `Retry-After`."""
+
+    def __init__(self, status_code: int, reason: str, retry_after_s: float) -> None:
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+    @property
+    def retry_after(self) -> str:
+        return str(max(1, math.ceil(self.retry_after_s)))
+
+
+# ============================================================
+# CONTROLLER
+# ============================================================
+
+class UserSlots:
+    """Running pipelines per user, shared by every lane's controller so a per-user
+    concurrency cap holds across lanes."""
+
+    def __init__(self) -> None:
+        self.active: Dict[str, int] = {}
+        self.controllers: "weakref.WeakSet[AdmissionController]" = weakref.WeakSet()
+
+    def can_start(self, user: str, limit: Optional[int]) -> bool:
+        return limit is None or self.active.get(user, 0) < limit
+
+    def started(self, user: str) -> None:
+        self.active[user] = self.active.get(user, 0) + 1
+
+    def finished(self, user: str) -> None:
+        n = self.active.get(user, 0) - 1
+        if n > 0:
+            self.active[user] = n
+        else:
+            self.active.pop(user, None)
+        # That user's waiters in other lanes may be eligible now.
+        for ctl in list(self.controllers):
+            ctl._dispatch()
+
+
+@dataclass
+class _Waiter:
+    start_tag: float
+    seq: int
+    user: str
+    max_user: Optional[int]
+    future: asyncio.Future
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded, per-user fair wait queue.
+
+    Waiting requests are served by start-time fair queuing: each user's requests get
+    virtual start tags spaced `1 / weight` apart, and a free slot goes to the waiting
+    request with the smallest tag whose user is under its concurrency cap. A user who
+    submits a hundred requests at once therefore gets slots interleaved with everyone
+    else instead of ahead of them. With a single user this is plain FIFO.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrent: int,
+        max_queue: int,
+        max_wait_s: float,
+        ewma_alpha: float = 0.2,
+        users: Optional[UserSlots] = None,
+    ) -> None:
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self.ewma_alpha = ewma_alpha
+        self.service_s: Optional[float] = None
+        self.users = users or UserSlots()
+        self.users.controllers.add(self)
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_start: Dict[str, float] = {}
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "timeout": 0}
+        self.queue_wait_ms = Histogram([1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 30000])
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait_s(self, position: int) -> Optional[float]:
+        """Expected wait for the request at queue `position` (0 = next), if known."""
+        if self.service_s is None:
+            return None
+        return (position // self.max_concurrent + 1) * self.service_s
+
+    def _reject(self, status_code: int, reason: str, position: int) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        return AdmissionRejected(status_code, reason, self.estimated_wait_s(position) or 1.0)
+
+    def _start_tag(self, user: str, weight: float) -> float:
+        # Each request starts no earlier than the previous one of the same user + 1/weight.
+        prev = self._last_start.get(user)
+        tag = self._virtual_time if prev is None else max(self._virtual_time, prev + 1.0 / max(weight, 0.01))
+        self._last_start[user] = tag
+        if len(self._last_start) > 4096:
+            # Users whose tags fell behind virtual time no longer affect ordering.
+            self._last_start = {u: t for u, t in self._last_start.items() if t >= self._virtual_time}
+        return tag
+
+    def _eligible(self) -> Optional[_Waiter]:
+        best = None
+        for w in self._waiters:
+            if self.users.can_start(w.user, w.max_user) and (best is None or (w.start_tag, w.seq) < (best.start_tag, best.seq)):
+                best = w
+        return best
+
+    def _grant(self, user: str) -> None:
+        self._active += 1
+        self.users.started(user)
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrent:
+            w = self._eligible()
+            if w is None:
+                return
+            self._waiters.remove(w)
+            if w.future.done() or w.future.get_loop().is_closed():
+                continue
+            self._virtual_time = max(self._virtual_time, w.start_tag)
+            self._grant(w.user)
+            w.future.set_result(None)
+
+    def _release(self, user: str) -> None:
+        self._active -= 1
+        self.users.finished(user)  # dispatches this and every other lane
+
+    async def _acquire(self, deadline: Optional[Deadline], user: str, weight: float, max_user: Optional[int]) -> None:
+        tag = self._start_tag(user, weight)
+        if self._active < self.max_concurrent and self.users.can_start(user, max_user) and self._eligible() is None:
+            self._virtual_time = max(self._virtual_time, tag)
+            self._grant(user)
+            return
+
+        position = len(self._waiters)
+        if position >= self.max_queue:
+            raise self._reject(429, "queue_full", position)
+
+        remaining = deadline.remaining() if deadline is not None else None
+        est = self.estimated_wait_s(position)
+        if remaining is not None and est is not None and est > remaining:
+            raise self._reject(503, "deadline", position)
+
+        waiter = _Waiter(tag, next(self._seq), user, max_user, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        timeout = self.max_wait_s if remaining is None else min(self.max_wait_s, remaining)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise self._reject(503, "timeout", len(self._waiters))
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        if waiter.future.done() and not waiter.future.cancelled():
+            # Granted just as the wait ended: give the slot back.
+            self._release(waiter.user)
+        else:
+            waiter.future.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _observe_service(self, seconds: float) -> None:
+        if self.service_s is None:
+            self.service_s = seconds
+        else:
+            self.service_s += self.ewma_alpha * (seconds - self.service_s)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        deadline: Optional[Deadline] = None,
+        *,
+        user: Optional[str] = None,
+        weight: float = 1.0,
+        max_user_concurrent: Optional[int] = None,
+    ) -> AsyncIterator[None]:
+        """Hold one pipeline slot; raises `AdmissionRejected` if the request is shed."""
+
+        user = user or "anonymous"
+        t0 = time.perf_counter()
+        await self._acquire(deadline, user, weight, max_user_concurrent)
+        started = time.perf_counter()
+        self.admitted += 1
+        self.queue_wait_ms.observe((started - t0) * 1000.0)
+        try:
+            yield
+        finally:
+            self._observe_service(time.perf_counter() - started)
+            self._release(user)
+
+    def stats(self) -> Dict[str, Any]:
+        queued_by_user: Dict[str, int] = {}
+        for w in self._waiters:
+            queued_by_user[w.user] = queued_by_user.get(w.user, 0) + 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "max_wait_s": self.max_wait_s,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "queued_by_user": queued_by_user,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "service_ms_ewma": round(self.service_s * 1000.0, 2) if self.service_s is not None else None,
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+
+_users = UserSlots()
+_controllers: Dict[str, AdmissionController] = {}
+
+
+def _lane_env(lane: Optional[str], name: str) -> str:
+    # ADMISSION_HEAVY_MAX_QUEUE overrides ADMISSION_MAX_QUEUE for the heavy lane, etc.
+    if lane:
+        specific = f"ADMISSION_{lane.upper()}_{name}"
+        if os.getenv(specific, "").strip():
+            return specific
+    return f"ADMISSION_{name}"
+
+
+def get_controller(lane: Optional[str] = None) -> AdmissionController:
+    """Process-wide controller for /analyze and /analyze_text, one per priority lane.
+
+    `ADMISSION_MAX_CONCURRENT` defaults to the worker's CPU budget (min 2);
+    `ADMISSION_MAX_QUEUE` to 4 x that; `ADMISSION_MAX_WAIT_S` to 30. Each can be set
+    per lane, e.g. `ADMISSION_HEAVY_MAX_CONCURRENT`.
+    """
+
+    key = lane or "default"
+    ctl = _controllers.get(key)
+    if ctl is None:
+        from milestone3.backend.concurrency import load_config
+
+        slots = _env_int(_lane_env(lane, "MAX_CONCURRENT"), 0)
+        if slots <= 0:
+            slots = max(2, load_config().cpu_budget)
+        queue_len = _env_int(_lane_env(lane, "MAX_QUEUE"), -1)
+        ctl = AdmissionController(
+            max_concurrent=slots,
+            max_queue=queue_len if queue_len >= 0 else 4 * slots,
+            max_wait_s=_env_float(_lane_env(lane, "MAX_WAIT_S"), 30.0),
+            users=_users,
+        )
+        _controllers[key] = ctl
+    return ctl
+
+
+def admission_stats() -> Dict[str, Any]:
+    return {
+        "enabled": admission_enabled(),
+        "lanes": {key: ctl.stats() for key, ctl in _controllers.items()},
+        "active_by_user": dict(_users.active),
+    }
+
+
+@asynccontextmanager
+async def admit(
+    deadline: Optional[Deadline] = None,
+    lane: Optional[str] = None,
+    *,
+    user: Optional[str] = None,
+    weight: float = 1.0,
+    max_user_concurrent: Optional[int] = None,
+) -> AsyncIterator[None]:
+    if not admission_enabled():
+        yield
+        return
+    async with get_controller(lane).slot(deadline, user=user, weight=weight, max_user_concurrent=max_user_concurrent):
+        yield
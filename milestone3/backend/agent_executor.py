@@ -0,0 +1,419 @@
+"""Process-pool execution of agents and clause extraction.
+
+`run_agent` and `build_executive_report_data` are pure-Python regex/string work, so
+threads mostly serialize on the GIL. With `AGENT_EXECUTOR=process` they run in a pool
+of worker processes instead. The index is published once into
+`multiprocessing.shared_memory` (embedding matrix + UTF-8 chunk buffer); workers
+attach to it by name, so only a small handle is pickled per call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from milestone3.backend.deadlines import Deadline
+
+if TYPE_CHECKING:
+    from milestone3.backend.contract_pipeline import LocalRAGIndex
+    from milestone3.backend.query_planner import PlanResults
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def executor_mode() -> str:
+    """`thread` (default) or `process`."""
+    mode = os.getenv("AGENT_EXECUTOR", "thread").strip().lower()
+    return "process" if mode in {"process", "processes"} else "thread"
+
+
+def process_mode() -> bool:
+    return executor_mode() == "process"
+
+
+def _process_workers() -> int:
+    from milestone3.backend.concurrency import load_config
+
+    return load_config().process_workers
+
+
+# ============================================================
+# SHARED-MEMORY INDEX
+# ============================================================
+
+@dataclass(frozen=True)
+class SharedIndexHandle:
+    """Picklable description of an index published to shared memory."""
+
+    vectors_name: str
+    text_name: str
+    rows: int
+    dim: int
+    text_bytes: int
+    model_name: str
+
+
+class _SharedChunks:
+    """Read-only sequence of chunk strings decoded on access from a shared buffer.
+
+    Layout: `rows + 1` little-endian int64 offsets followed by the concatenated UTF-8 text.
+    """
+
+    def __init__(self, buf: memoryview, rows: int) -> None:
+        self._offsets = np.ndarray((rows + 1,), dtype="<i8", buffer=buf)
+        self._text = buf[(rows + 1) * 8:]
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self._rows
+        if not 0 <= i < self._rows:
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._text[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(self._rows):
+            yield self[i]
+
+
+def _release(segments: List[shared_memory.SharedMemory]) -> None:
+    for shm in segments:
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception:
+            pass
+
+
+_publish_lock = threading.Lock()
+
+
+def _published(rag: "LocalRAGIndex", snap: Any) -> Optional[SharedIndexHandle]:
+    shared = getattr(rag, "_shared", None)
+    return shared[1] if shared is not None and shared[0] is snap else None
+
+
+def publish_index(rag: "LocalRAGIndex") -> Optional[SharedIndexHandle]:
+    """Copy the current index snapshot into shared memory once; segments are unlinked
+    when that snapshot is collected (the index was rebuilt or dropped)."""
+
+    snap = rag.snapshot
+    if snap is None:
+        return None
+    existing = _published(rag, snap)
+    if existing is not None:
+        return existing
+
+    with _publish_lock:
+        existing = _published(rag, snap)
+        if existing is not None:
+            return existing
+
+        vectors = np.ascontiguousarray(snap.vectors, dtype=np.float32)
+        rows, dim = vectors.shape
+        encoded = [c.encode("utf-8") for c in snap.chunks]
+        offsets = np.zeros((rows + 1,), dtype="<i8")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        text_bytes = int(offsets[-1])
+
+        vec_shm = shared_memory.SharedMemory(create=True, size=max(1, vectors.nbytes))
+        text_shm = shared_memory.SharedMemory(create=True, size=max(1, offsets.nbytes + text_bytes))
+        weakref.finalize(snap, _release, [vec_shm, text_shm])
+
+        np.ndarray(vectors.shape, dtype=np.float32, buffer=vec_shm.buf)[:] = vectors
+        text_shm.buf[: offsets.nbytes] = offsets.tobytes()
+        text_shm.buf[offsets.nbytes: offsets.nbytes + text_bytes] = b"".join(encoded)
+
+        handle = SharedIndexHandle(
+            vectors_name=vec_shm.name,
+            text_name=text_shm.name,
+            rows=int(rows),
+            dim=int(dim),
+            text_bytes=text_bytes,
+            model_name=rag.model_name,
+        )
+        rag._shared = (snap, handle)
+        return handle
+
+
+# Worker-side attachments, newest last. Closing an evicted entry releases the mapping.
+_ATTACHED: "OrderedDict[Tuple[str, str], Tuple[Any, List[shared_memory.SharedMemory]]]" = OrderedDict()
+_ATTACHED_MAX = 8
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    # Workers share the parent's resource tracker, so attaching does not take ownership;
+    # the parent unlinks the segment.
+    return shared_memory.SharedMemory(name=name)
+
+
+def _close_segments(segments: List[shared_memory.SharedMemory]) -> None:
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            # A view is still referenced; the mapping goes away with the process.
+            pass
+
+
+def _detach_oldest() -> None:
+    _, (rag, segments) = _ATTACHED.popitem(last=False)
+    # Drop the views first so the segments can close.
+    rag.load([], None)
+    del rag
+    _close_segments(segments)
+
+
+def detach_all() -> None:
+    """Drop every attached index (worker exit)."""
+
+    while _ATTACHED:
+        _detach_oldest()
+
+
+def attach_index(handle: SharedIndexHandle) -> "LocalRAGIndex":
+    """A LocalRAGIndex whose vectors and chunks are views on the shared segments."""
+
+    from milestone3.backend.contract_pipeline import LocalRAGIndex
+
+    key = (handle.vectors_name, handle.text_name)
+    hit = _ATTACHED.get(key)
+    if hit is not None:
+        _ATTACHED.move_to_end(key)
+        return hit[0]
+
+    vec_shm = _attach_segment(handle.vectors_name)
+    text_shm = _attach_segment(handle.text_name)
+
+    vectors = np.ndarray((handle.rows, handle.dim), dtype=np.float32, buffer=vec_shm.buf)
+    vectors.flags.writeable = False
+    rag = LocalRAGIndex(model_name=handle.model_name)
+    rag.load(_SharedChunks(text_shm.buf, handle.rows), vectors)
+
+    _ATTACHED[key] = (rag, [vec_shm, text_shm])
+    while len(_ATTACHED) > _ATTACHED_MAX:
+        _detach_oldest()
+    return rag
+
+
+# ============================================================
+# CROSS-PROCESS CANCELLATION
+# ============================================================
+
+# One 1-byte segment per parent deadline that has work in the pool; the byte is set
+# when that deadline is cancelled, and workers poll it at their deadline checks.
+_cancel_flags: "weakref.WeakKeyDictionary[Deadline, str]" = weakref.WeakKeyDictionary()
+_cancel_flags_lock = threading.Lock()
+
+
+def _set_flag(shm: shared_memory.SharedMemory) -> None:
+    shm.buf[0] = 1
+
+
+def cancel_flag(deadline: Deadline) -> str:
+    """Name of the shared-memory flag that mirrors `deadline.cancel()` into workers.
+
+    The segment is unlinked when the deadline is collected.
+    """
+
+    with _cancel_flags_lock:
+        name = _cancel_flags.get(deadline)
+        if name is None:
+            shm = shared_memory.SharedMemory(create=True, size=1)
+            shm.buf[0] = 0
+            weakref.finalize(deadline, _release, [shm])
+            deadline.on_cancel(functools.partial(_set_flag, shm))
+            name = _cancel_flags[deadline] = shm.name
+        return name
+
+
+class _WorkerDeadline(Deadline):
+    """A worker's copy of the parent deadline: same remaining budget, plus the parent's
+    cancellation read from the shared flag."""
+
+    def __init__(self, budget_s: Optional[float], flag_name: str) -> None:
+        super().__init__(budget_s)
+        try:
+            self._flag: Optional[shared_memory.SharedMemory] = _attach_segment(flag_name)
+        except FileNotFoundError:
+            # The parent's deadline is gone: nobody is waiting for this result.
+            self._flag = None
+            self.cancel()
+
+    def _poll(self) -> None:
+        if self._flag is not None and self._flag.buf[0] and not self._cancelled.is_set():
+            self.cancel()
+
+    def remaining(self) -> Optional[float]:
+        self._poll()
+        return super().remaining()
+
+    @property
+    def cancelled(self) -> bool:
+        self._poll()
+        return super().cancelled
+
+    def close(self) -> None:
+        if self._flag is not None:
+            _close_segments([self._flag])
+            self._flag = None
+
+
+# ============================================================
+# WORKER ENTRY POINTS
+# ============================================================
+
+def _worker_init(model_name: str) -> None:
+    import atexit
+
+    from milestone3.backend.contract_pipeline import get_embedding_model
+
+    # Load the embedder once per worker instead of on the first request.
+    get_embedding_model(model_name)
+    atexit.register(detach_all)
+
+
+def _agent_task(
+    handle: SharedIndexHandle,
+    agent_type: str,
+    question: str,
+    remaining_s: Optional[float],
+    cancel_flag_name: Optional[str],
+    **agent_kwargs: Any,
+) -> Dict[str, Any]:
+    from milestone3.backend.contract_pipeline import run_agent
+    from milestone3.backend.deadlines import use_deadline
+
+    deadline: Optional[Deadline] = None
+    if cancel_flag_name is not None:
+        deadline = _WorkerDeadline(remaining_s, cancel_flag_name)
+    elif remaining_s is not None:
+        deadline = Deadline(remaining_s)
+    try:
+        with use_deadline(deadline):
+            result = run_agent(agent_type=agent_type, question=question, rag=attach_index(handle), **agent_kwargs)
+    finally:
+        if isinstance(deadline, _WorkerDeadline):
+            deadline.close()
+    return result
+
+
+def _executive_task(
+    handle: SharedIndexHandle,
+    question: str,
+    selected_agents: Optional[List[str]],
+    topic_top_k: int = 6,
+    retrieved: Optional["PlanResults"] = None,
+) -> Dict[str, Any]:
+    from milestone3.backend.contract_pipeline import build_executive_report_data
+
+    return build_executive_report_data(
+        rag=attach_index(handle),
+        question=question,
+        selected_agents=selected_agents,
+        topic_top_k=topic_top_k,
+        retrieved=retrieved,
+    )
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: safe with the threads FastAPI/asyncio already started, and matches Windows.
+            ctx = multiprocessing.get_context(os.getenv("AGENT_PROCESS_START_METHOD", "spawn"))
+            model_name = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+            _pool = ProcessPoolExecutor(
+                max_workers=_process_workers(),
+                mp_context=ctx,
+                initializer=_worker_init,
+                initargs=(model_name,),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def run_agent_in_process(
+    rag: "LocalRAGIndex",
+    *,
+    agent_type: str,
+    question: str,
+    deadline: Optional[Deadline] = None,
+    **agent_kwargs: Any,
+) -> Dict[str, Any]:
+    """`run_agent` in the pool. The worker gets `deadline`'s remaining budget and, through
+    a shared-memory flag, its cancellation (e.g. the client disconnected mid-run)."""
+
+    from milestone3.backend import lanes
+
+    handle = await lanes.to_thread(publish_index, rag)
+    if handle is None:
+        from milestone3.backend.contract_pipeline import run_agent
+
+        return await lanes.to_thread(run_agent, agent_type=agent_type, question=question, rag=rag, **agent_kwargs)
+    remaining_s = deadline.remaining() if deadline is not None else None
+    flag = cancel_flag(deadline) if deadline is not None else None
+    loop = asyncio.get_running_loop()
+    task = functools.partial(_agent_task, handle, agent_type, question, remaining_s, flag, **agent_kwargs)
+    return await loop.run_in_executor(get_pool(), task)
+
+
+async def build_executive_in_process(
+    rag: "LocalRAGIndex",
+    *,
+    question: str,
+    selected_agents: Optional[List[str]],
+    topic_top_k: int = 6,
+    retrieved: Optional["PlanResults"] = None,
+) -> Dict[str, Any]:
+    from milestone3.backend import lanes
+
+    handle = await lanes.to_thread(publish_index, rag)
+    if handle is None:
+        from milestone3.backend.contract_pipeline import build_executive_report_data
+
+        return await lanes.to_thread(
+            build_executive_report_data,
+            rag=rag,
+            question=question,
+            selected_agents=selected_agents,
+            topic_top_k=topic_top_k,
+            retrieved=retrieved,
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_pool(), _executive_task, handle, question, selected_agents, topic_top_k, retrieved
+    )
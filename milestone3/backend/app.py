@@ -1,20 +1,71 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+import hmac
 import io
+import itertools
+import json
+import math
 import os
+import shutil
+import tempfile
+import time
+import zipfile
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from milestone3.backend.contract_pipeline import run_full_pipeline, stable_contract_id
+from milestone3.backend import concurrency
+
+# Before numpy is imported: BLAS/OpenMP pools are sized from the env at load time.
+concurrency.apply_blas_env()
+
+from milestone3.backend import (
+    admission,
+    agent_executor,
+    bulk_analysis,
+    degradation,
+    job_queue,
+    lanes,
+    memory_store,
+    prefetch,
+    profiles,
+    query_embeddings,
+    query_planner,
+)
+from milestone3.backend.deadlines import Deadline, deadline_from_request
+from milestone3.backend.embedding_batcher import batcher_stats
+from milestone3.backend.contract_pipeline import (
+    PIPELINE_VERSION,
+    classify_request,
+    coalescing_stats,
+    lazy_agent_section,
+    run_batch_pipeline,
+    run_full_pipeline,
+    section_cache_stats,
+    stable_contract_id,
+    stream_full_pipeline,
+    warm_query_embeddings,
+)
+from milestone3.backend.result_cache import get_result_cache
 from milestone3.backend.db_sqlite import (
+    ANONYMOUS_USER,
+    anonymous_caller,
     init_db,
     create_user,
     login,
+    quota_status,
+    record_usage,
+    seconds_until_reset,
+    set_user_limits,
+    usage_report,
     user_from_token
 )
 
@@ -24,9 +75,22 @@ from milestone3.backend.db_sqlite import (
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    concurrency.configure()  # BLAS threads + agent thread pool from this worker's CPU budget
     init_db()         # create users + sessions tables
+    memory_store.init_store()  # append-only agent memory (SQLite WAL)
+    get_result_cache(PIPELINE_VERSION)  # drops cached results from older pipeline versions
+    await asyncio.to_thread(warm_query_embeddings)  # static retrieval queries, embedded once per embedder
      # optional demo accounts
+    compactor = asyncio.create_task(memory_store.compactor_loop())  # retention + compaction
+    job_queue.init_jobs()
+    job_workers = asyncio.create_task(job_queue.run_job_workers(_run_analysis_job))  # POST /jobs
+    prefetcher = asyncio.create_task(prefetch.run_prefetch_worker())  # follow-up questions, background lane
     yield
+    compactor.cancel()
+    job_workers.cancel()
+    prefetcher.cancel()
+    agent_executor.shutdown_pool()  # AGENT_EXECUTOR=process
+    lanes.shutdown_lanes()
 
 # -------------------------------------------------------------------
 # FastAPI App
@@ -76,6 +140,21 @@ def _require_user(authorization: str | None) -> dict:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     return user
 
+
+def _require_admin(authorization: str | None) -> None:
+    """Admin routes take `ADMIN_TOKEN` (from config) as their bearer token.
+
+    Session roles are chosen at sign-up, so they cannot grant admin; without a configured
+    token the admin routes are closed.
+    """
+
+    token = _bearer_token(authorization)
+    if not token:
+        raise HTTPException(status_code=401, detail="Missing Authorization")
+    expected = os.getenv("ADMIN_TOKEN", "").strip()
+    if not expected or not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 # -------------------------------------------------------------------
 # Models
 # -------------------------------------------------------------------
@@ -100,6 +179,24 @@ class AnalyzeTextRequest(BaseModel):
     contract_id: Optional[str] = None
     intent_override: Optional[str] = None
     run_all_agents: bool = False
+    deadline_ms: Optional[float] = None
+    profile: Optional[str] = None
+    lazy_agents: bool = False
+
+
+class BatchQuestion(BaseModel):
+    question: str
+    intent_override: Optional[str] = None
+
+
+class AnalyzeBatchTextRequest(BaseModel):
+    questions: List[BatchQuestion]
+    contract_text: Optional[str] = None
+    contract_id: Optional[str] = None
+    tone: str = "executive"
+    no_evidence_threshold: float = 0.25
+    run_all_agents: bool = False
+    deadline_ms: Optional[float] = None
 
 # -------------------------------------------------------------------
 # Health Check
@@ -109,6 +206,76 @@ class AnalyzeTextRequest(BaseModel):
 def health():
     return {"status": "ok", "ts": _utc_now_iso()}
 
+
+@app.get("/profiles")
+def list_analysis_profiles():
+    """Analysis profiles accepted by the `profile` field of the analysis endpoints."""
+    return {"default": profiles.default_profile_name(), "profiles": profiles.list_profiles()}
+
+# -------------------------------------------------------------------
+# Admin / Stats
+# -------------------------------------------------------------------
+
+@app.get("/admin/cache")
+def admin_cache_stats(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    cache = get_result_cache(PIPELINE_VERSION)
+    return {
+        "enabled": cache is not None,
+        "stats": cache.stats() if cache else None,
+        "sections": section_cache_stats(),
+        "coalescing": coalescing_stats(),
+        "prefetch": prefetch.prefetch_stats(),
+    }
+
+
+@app.get("/admin/admission")
+def admin_admission_stats(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    return {
+        "ok": True,
+        **admission.admission_stats(),
+        "executors": lanes.lane_stats(),
+        "degradation": degradation.degradation_stats(),
+    }
+
+
+@app.get("/admin/concurrency")
+def admin_concurrency(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    return {"ok": True, **concurrency.report()}
+
+
+@app.get("/admin/embeddings")
+def admin_embedding_stats(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    return {
+        "ok": True,
+        "batching": batcher_stats(),
+        "query_cache": query_embeddings.cache_stats(),
+        "query_planner": query_planner.planner_stats(),
+    }
+
+
+@app.get("/admin/memory")
+def admin_memory_stats(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    return {"ok": True, "store": memory_store.store_stats()}
+
+
+@app.post("/admin/memory/compact")
+async def admin_memory_compact(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    try:
+        result = await asyncio.to_thread(memory_store.try_compact_store)
+    except memory_store.CompactionBusy as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Compaction {e.reason}, retry later",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after_s)))},
+        )
+    return {"ok": True, "evicted": result, "store": await asyncio.to_thread(memory_store.store_stats)}
+
 # -------------------------------------------------------------------
 # Auth APIs
 # -------------------------------------------------------------------
@@ -135,16 +302,53 @@ def auth_me(authorization: str | None = Header(default=None)):
     user = _require_user(authorization)
     return {"ok": True, "user": user}
 
+# -------------------------------------------------------------------
+# Usage + Quota APIs
+# -------------------------------------------------------------------
+
+class UserLimitsRequest(BaseModel):
+    weight: Optional[float] = None
+    max_concurrent: Optional[int] = None
+    daily_compute_s: Optional[float] = None
+
+
+@app.get("/usage")
+def my_usage(authorization: str | None = Header(default=None)):
+    user = _require_user(authorization)
+    return {"ok": True, **quota_status(user["email"]), "resets_in_s": round(seconds_until_reset())}
+
+
+@app.get("/admin/usage")
+def admin_usage(day: Optional[str] = None, authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    return {"ok": True, **usage_report(day=day)}
+
+
+@app.put("/admin/users/{email}/limits")
+def admin_set_user_limits(email: str, req: UserLimitsRequest, authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    limits = set_user_limits(
+        email,
+        weight=req.weight,
+        max_concurrent=req.max_concurrent,
+        daily_compute_s=req.daily_compute_s,
+    )
+    return {"ok": True, "email": email.strip().lower(), "limits": limits}
+
 # -------------------------------------------------------------------
 # File Reader
 # -------------------------------------------------------------------
 
 async def _read_upload_text(upload: UploadFile) -> str:
     data = await upload.read()
+    return _extract_text(upload.filename or "", data)
+
+
+def _extract_text(filename: str, data: bytes) -> str:
     if not data:
         return ""
 
-    name = (upload.filename or "").lower()
+    name = filename.lower()
 
     if name.endswith(".pdf"):
         from PyPDF2 import PdfReader
@@ -158,12 +362,197 @@ async def _read_upload_text(upload: UploadFile) -> str:
 
     return data.decode("utf-8", errors="ignore")
 
+
+async def _run_until_disconnect(request: Request, deadline: Deadline, work):
+    """Await `work`, cancelling it (and its deadline) if the client disconnects."""
+
+    task = asyncio.ensure_future(work)
+    poll_s = float(os.getenv("DISCONNECT_POLL_S", "0.5"))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_s)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                deadline.cancel()
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            deadline.cancel()
+            task.cancel()
+
+
+def _optional_user_email(authorization: str | None, client: Optional[str] = None) -> str:
+    """Email of the signed-in caller, or an anonymous bucket per client address.
+
+    Analysis never required a session, so a missing or expired token is not an error here.
+    """
+
+    token = _bearer_token(authorization)
+    user = user_from_token(token) if token else None
+    return user["email"] if user else anonymous_caller(client)
+
+
+def _client_host(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+async def _check_quota(user_email: str) -> Dict[str, Any]:
+    """The caller's limits; 429 with Retry-After once their daily quota is spent."""
+
+    quota = await asyncio.to_thread(quota_status, user_email)
+    if quota["remaining_s"] is not None and quota["remaining_s"] <= 0:
+        asyncio.get_running_loop().run_in_executor(None, functools.partial(record_usage, user_email, rejected=1))
+        raise HTTPException(
+            status_code=429,
+            detail="Daily compute quota exhausted",
+            headers={"Retry-After": str(max(1, math.ceil(seconds_until_reset())))},
+        )
+    return quota["limits"]
+
+
+async def _admitted(deadline: Deadline, lane: Optional[str], work, *, user_email: str = ANONYMOUS_USER):
+    """Await `work` in its priority lane once the caller's quota and admission control
+    allow it (429/503 with Retry-After when shed), at the degradation level the current
+    load calls for. Compute time is charged to the caller."""
+
+    loop = asyncio.get_running_loop()
+    try:
+        limits = await _check_quota(user_email)
+        level = degradation.choose(lane)  # from the queue this request is joining
+        async with admission.admit(
+            deadline,
+            lane,
+            user=user_email,
+            weight=limits["weight"],
+            max_user_concurrent=limits["max_concurrent"],
+        ):
+            started = time.perf_counter()
+            try:
+                with lanes.use_lane(lane), degradation.use_level(level):
+                    return await work
+            finally:
+                # Not awaited: also runs when the request is being cancelled.
+                loop.run_in_executor(None, functools.partial(
+                    record_usage, user_email, compute_s=time.perf_counter() - started, requests=1
+                ))
+    except admission.AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=f"Server busy ({e.reason}), retry later",
+            headers={"Retry-After": e.retry_after},
+        )
+    finally:
+        work.close()  # never started if the request was shed
+
+
+async def _admitted_stream(
+    deadline: Deadline,
+    lane: Optional[str],
+    events,
+    *,
+    user_email: str,
+    limits: Dict[str, Any],
+):
+    """`_admitted` for a stream: `events` runs while it holds the caller's admission slot.
+
+    The quota is checked by the endpoint (`_check_quota`) before the response starts;
+    shedding happens once streaming has begun, so it arrives as an `error` event.
+    """
+
+    loop = asyncio.get_running_loop()
+    level = degradation.choose(lane)
+    try:
+        async with admission.admit(
+            deadline,
+            lane,
+            user=user_email,
+            weight=limits["weight"],
+            max_user_concurrent=limits["max_concurrent"],
+        ):
+            started = time.perf_counter()
+            try:
+                with lanes.use_lane(lane), degradation.use_level(level):
+                    async for ev in events:
+                        yield ev
+            finally:
+                loop.run_in_executor(None, functools.partial(
+                    record_usage, user_email, compute_s=time.perf_counter() - started, requests=1
+                ))
+    except admission.AdmissionRejected as e:
+        yield {
+            "event": "error",
+            "status_code": e.status_code,
+            "detail": f"Server busy ({e.reason}), retry later",
+            "retry_after": e.retry_after,
+        }
+    finally:
+        await events.aclose()
+
+
+def _profile_name(profile: Optional[str]) -> str:
+    try:
+        return profiles.get_profile(profile).name
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _analysis_response(cid: str, final_json: Dict[str, Any], report: str) -> Dict[str, Any]:
+    return {
+        "contract_id": cid,
+        "cache": final_json.get("cache"),
+        "truncated": bool(final_json.get("truncated")),
+        "degradation_level": int((final_json.get("degradation") or {}).get("level", 0)),
+        "analysis_id": (final_json.get("agent_analysis") or {}).get("analysis_id"),
+        "analysis": final_json,
+        "report": report,
+    }
+
+
+async def _remember_contract(contract_id: str, contract_text: str, user_email: str) -> None:
+    try:
+        await asyncio.to_thread(memory_store.save_contract_text, contract_id, contract_text, user_email)
+    except Exception:
+        # Only needed for later by-id calls; never fail an analysis because of it.
+        pass
+
+def _prefetch_follow_ups(
+    cid: str,
+    contract_text: str,
+    final_json: Dict[str, Any],
+    *,
+    tone: str,
+    no_evidence_threshold: float,
+    profile: str,
+    user_email: str = ANONYMOUS_USER,
+) -> None:
+    # A cut-short or degraded answer means the server is busy: no speculative work then.
+    if final_json.get("truncated") or final_json.get("degradation"):
+        return
+    prefetch.schedule(prefetch.PrefetchJob(
+        contract_text=contract_text,
+        contract_id=cid,
+        tone=tone,
+        no_evidence_threshold=no_evidence_threshold,
+        profile=profile,
+        user=user_email,
+    ))
+
+
+async def _prefetch_after_final(events, cid: str, contract_text: str, **params):
+    async for ev in events:
+        yield ev
+        if ev.get("event") == "final":
+            _prefetch_follow_ups(cid, contract_text, ev["analysis"], **params)
+
 # -------------------------------------------------------------------
 # Analysis APIs
 # -------------------------------------------------------------------
 
 @app.post("/analyze")
 async def analyze_contract(
+    request: Request,
     file: UploadFile = File(...),
     question: str = Form(...),
     tone: str = Form("executive"),
@@ -171,14 +560,24 @@ async def analyze_contract(
     contract_id: Optional[str] = Form(None),
     intent_override: Optional[str] = Form(None),
     run_all_agents: bool = Form(False),
+    deadline_ms: Optional[float] = Form(None),
+    profile: Optional[str] = Form(None),
+    lazy_agents: bool = Form(False),
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
 ):
+    deadline = deadline_from_request(x_deadline_ms, deadline_ms)
+    profile = _profile_name(profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
     contract_text = await _read_upload_text(file)
     if not contract_text.strip():
         raise HTTPException(status_code=400, detail="Empty document")
 
     cid = contract_id or stable_contract_id(contract_text)
+    await _remember_contract(cid, contract_text, user_email)
 
-    final_json, report = await run_full_pipeline(
+    lane = classify_request(question, intent_override, run_all_agents)
+    final_json, report = await _run_until_disconnect(request, deadline, _admitted(deadline, lane, run_full_pipeline(
         contract_text=contract_text,
         question=question,
         tone=tone,
@@ -186,16 +585,33 @@ async def analyze_contract(
         no_evidence_threshold=no_evidence_threshold,
         intent_override=intent_override,
         run_all_agents=run_all_agents,
-    )
+        deadline=deadline,
+        profile=profile,
+        lazy_agents=lazy_agents,
+    ), user_email=user_email))
 
-    return {"contract_id": cid, "analysis": final_json, "report": report}
+    _prefetch_follow_ups(
+        cid, contract_text, final_json,
+        tone=tone, no_evidence_threshold=no_evidence_threshold, profile=profile, user_email=user_email,
+    )
+    return _analysis_response(cid, final_json, report)
 
 
 @app.post("/analyze_text")
-async def analyze_contract_text(payload: AnalyzeTextRequest):
+async def analyze_contract_text(
+    request: Request,
+    payload: AnalyzeTextRequest,
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    deadline = deadline_from_request(x_deadline_ms, payload.deadline_ms)
+    profile = _profile_name(payload.profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
     cid = payload.contract_id or stable_contract_id(payload.contract_text)
+    await _remember_contract(cid, payload.contract_text, user_email)
 
-    final_json, report = await run_full_pipeline(
+    lane = classify_request(payload.question, payload.intent_override, payload.run_all_agents)
+    final_json, report = await _run_until_disconnect(request, deadline, _admitted(deadline, lane, run_full_pipeline(
         contract_text=payload.contract_text,
         question=payload.question,
         tone=payload.tone,
@@ -203,6 +619,528 @@ async def analyze_contract_text(payload: AnalyzeTextRequest):
         no_evidence_threshold=payload.no_evidence_threshold,
         intent_override=payload.intent_override,
         run_all_agents=payload.run_all_agents,
+        deadline=deadline,
+        profile=profile,
+        lazy_agents=payload.lazy_agents,
+    ), user_email=user_email))
+
+    _prefetch_follow_ups(
+        cid, payload.contract_text, final_json,
+        tone=payload.tone, no_evidence_threshold=payload.no_evidence_threshold, profile=profile, user_email=user_email,
     )
+    return _analysis_response(cid, final_json, report)
+
+
+@app.get("/analyses/{analysis_id}/agents/{agent_type}")
+async def get_agent_section(
+    request: Request,
+    analysis_id: str,
+    agent_type: str,
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    """One agent's section of an analysis run with `lazy_agents`, computed on first request."""
 
-    return {"contract_id": cid, "analysis": final_json, "report": report}
\ No newline at end of file
+    deadline = deadline_from_request(x_deadline_ms, None)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    lane = lanes.INTERACTIVE if lanes.lanes_enabled() else None
+    try:
+        section = await _run_until_disconnect(request, deadline, _admitted(
+            deadline, lane, lazy_agent_section(analysis_id, agent_type, deadline=deadline), user_email=user_email
+        ))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {
+        "analysis_id": analysis_id,
+        "agent_type": agent_type,
+        "truncated": bool(section.get("truncated")),
+        "section": section,
+    }
+
+@app.post("/ingest", status_code=202)
+async def ingest_contract(
+    request: Request,
+    file: UploadFile = File(...),
+    question: Optional[str] = Form(None),
+    tone: str = Form("executive"),
+    no_evidence_threshold: float = Form(0.25),
+    contract_id: Optional[str] = Form(None),
+    intent_override: Optional[str] = Form(None),
+    run_all_agents: bool = Form(False),
+    profile: Optional[str] = Form(None),
+    authorization: Optional[str] = Header(default=None),
+):
+    """Pre-ingest an upload at background priority: index it and run the analysis the client
+    will request on confirm (same fields as /analyze; without `question`, a four-agent risk analysis)."""
+
+    profile = _profile_name(profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    await _check_quota(user_email)
+    data = await file.read()
+    contract_text = await asyncio.to_thread(_extract_text, file.filename or "", data)
+    if not contract_text.strip():
+        raise HTTPException(status_code=400, detail="Empty document")
+
+    cid = contract_id or stable_contract_id(contract_text)
+    await _remember_contract(cid, contract_text, user_email)
+
+    analysis: Dict[str, Any] = {}
+    if (question or "").strip():
+        analysis = {"question": question, "intent_override": intent_override, "run_all_agents": run_all_agents}
+    queued = prefetch.schedule_ingest(prefetch.IngestJob(
+        contract_text=contract_text,
+        contract_id=cid,
+        tone=tone,
+        no_evidence_threshold=no_evidence_threshold,
+        profile=profile,
+        user=user_email,
+        **analysis,
+    ))
+    return {"contract_id": cid, "status": "queued" if queued else "skipped"}
+
+# -------------------------------------------------------------------
+# Job APIs (submit + poll)
+# -------------------------------------------------------------------
+
+async def _run_analysis_job(params: Dict[str, Any], report_progress) -> Dict[str, Any]:
+    params = dict(params)
+    user_email = params.pop("user_email", ANONYMOUS_USER)
+    stage_progress = {"plan": 0.1, "probe": 0.3, "executive": 0.5}
+    agents = {"total": 0, "done": 0}
+
+    def on_stage(stage: str, payload: Dict[str, Any]) -> None:
+        if stage == "plan":
+            agents["total"] = len(payload.get("selected_agents") or [])
+        if stage == "agent":
+            agents["done"] += 1
+            total = max(agents["total"], agents["done"])
+            report_progress(0.5 + 0.45 * agents["done"] / total, f"agent:{payload.get('agent_type')}")
+        elif stage in stage_progress:
+            report_progress(stage_progress[stage], stage)
+
+    # Jobs have no deadline of their own; admission still queues them fairly per user.
+    lane = classify_request(params["question"], params.get("intent_override"), params.get("run_all_agents", False))
+    final_json, report = await _admitted(
+        Deadline(), lane, run_full_pipeline(on_stage=on_stage, **params), user_email=user_email
+    )
+    return {"contract_id": params["contract_id"], "cache": final_json.get("cache"), "analysis": final_json, "report": report}
+
+
+def _submit_analysis_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    job_id = job_queue.submit_job("analyze", params)
+    return {"job_id": job_id, "status": job_queue.QUEUED, "contract_id": params["contract_id"]}
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    request: Request,
+    file: UploadFile = File(...),
+    question: str = Form(...),
+    tone: str = Form("executive"),
+    no_evidence_threshold: float = Form(0.25),
+    contract_id: Optional[str] = Form(None),
+    intent_override: Optional[str] = Form(None),
+    run_all_agents: bool = Form(False),
+    profile: Optional[str] = Form(None),
+    authorization: Optional[str] = Header(default=None),
+):
+    """Queue an /analyze request; poll GET /jobs/{job_id} for progress and the result."""
+
+    profile = _profile_name(profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    await _check_quota(user_email)
+    contract_text = await _read_upload_text(file)
+    if not contract_text.strip():
+        raise HTTPException(status_code=400, detail="Empty document")
+    if not question.strip():
+        raise HTTPException(status_code=400, detail="Empty question")
+
+    cid = contract_id or stable_contract_id(contract_text)
+    await _remember_contract(cid, contract_text, user_email)
+
+    return _submit_analysis_job({
+        "contract_text": contract_text,
+        "question": question,
+        "tone": tone,
+        "contract_id": cid,
+        "no_evidence_threshold": no_evidence_threshold,
+        "intent_override": intent_override,
+        "run_all_agents": run_all_agents,
+        "profile": profile,
+        "user_email": user_email,
+    })
+
+
+@app.post("/jobs/text", status_code=202)
+async def submit_text_job(request: Request, payload: AnalyzeTextRequest, authorization: Optional[str] = Header(default=None)):
+    profile = _profile_name(payload.profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    await _check_quota(user_email)
+    if not payload.contract_text.strip():
+        raise HTTPException(status_code=400, detail="Empty document")
+    if not payload.question.strip():
+        raise HTTPException(status_code=400, detail="Empty question")
+
+    cid = payload.contract_id or stable_contract_id(payload.contract_text)
+    await _remember_contract(cid, payload.contract_text, user_email)
+
+    return _submit_analysis_job({
+        "contract_text": payload.contract_text,
+        "question": payload.question,
+        "tone": payload.tone,
+        "contract_id": cid,
+        "no_evidence_threshold": payload.no_evidence_threshold,
+        "intent_override": payload.intent_override,
+        "run_all_agents": payload.run_all_agents,
+        "profile": profile,
+        "user_email": user_email,
+    })
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, request: Request, authorization: Optional[str] = Header(default=None)):
+    # Other callers' jobs look exactly like unknown ones.
+    job = job_queue.get_job(job_id, owner=_optional_user_email(authorization, _client_host(request)))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.get("/admin/jobs")
+def admin_job_stats(authorization: Optional[str] = Header(default=None)):
+    _require_admin(authorization)
+    return {"ok": True, "jobs": job_queue.job_stats()}
+
+# -------------------------------------------------------------------
+# Streaming Analysis APIs
+# -------------------------------------------------------------------
+
+def _wants_sse(accept: Optional[str]) -> bool:
+    return "text/event-stream" in (accept or "").lower()
+
+
+async def _stage_stream(events, *, sse: bool):
+    try:
+        async for ev in events:
+            data = json.dumps(ev, ensure_ascii=False)
+            yield f"event: {ev['event']}\ndata: {data}\n\n" if sse else data + "\n"
+    except ValueError as e:
+        data = json.dumps({"event": "error", "detail": str(e)})
+        yield f"event: error\ndata: {data}\n\n" if sse else data + "\n"
+
+
+def _streaming_response(events, accept: Optional[str]) -> StreamingResponse:
+    sse = _wants_sse(accept)
+    return StreamingResponse(
+        _stage_stream(events, sse=sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/analyze_stream")
+async def analyze_contract_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    question: str = Form(...),
+    tone: str = Form("executive"),
+    no_evidence_threshold: float = Form(0.25),
+    contract_id: Optional[str] = Form(None),
+    intent_override: Optional[str] = Form(None),
+    run_all_agents: bool = Form(False),
+    deadline_ms: Optional[float] = Form(None),
+    profile: Optional[str] = Form(None),
+    accept: Optional[str] = Header(default=None),
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    """Same as /analyze, streamed as NDJSON (or SSE with `Accept: text/event-stream`)."""
+
+    deadline = deadline_from_request(x_deadline_ms, deadline_ms)
+    profile = _profile_name(profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    limits = await _check_quota(user_email)
+
+    contract_text = await _read_upload_text(file)
+    if not contract_text.strip():
+        raise HTTPException(status_code=400, detail="Empty document")
+
+    cid = contract_id or stable_contract_id(contract_text)
+    await _remember_contract(cid, contract_text, user_email)
+
+    lane = classify_request(question, intent_override, run_all_agents)
+    events = _admitted_stream(deadline, lane, stream_full_pipeline(
+        contract_text=contract_text,
+        question=question,
+        tone=tone,
+        contract_id=cid,
+        no_evidence_threshold=no_evidence_threshold,
+        intent_override=intent_override,
+        run_all_agents=run_all_agents,
+        deadline=deadline,
+        profile=profile,
+    ), user_email=user_email, limits=limits)
+    events = _prefetch_after_final(
+        events, cid, contract_text,
+        tone=tone, no_evidence_threshold=no_evidence_threshold, profile=profile, user_email=user_email,
+    )
+    return _streaming_response(events, accept)
+
+
+@app.post("/analyze_text_stream")
+async def analyze_contract_text_stream(
+    request: Request,
+    payload: AnalyzeTextRequest,
+    accept: Optional[str] = Header(default=None),
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    deadline = deadline_from_request(x_deadline_ms, payload.deadline_ms)
+    profile = _profile_name(payload.profile)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    limits = await _check_quota(user_email)
+    cid = payload.contract_id or stable_contract_id(payload.contract_text)
+    await _remember_contract(cid, payload.contract_text, user_email)
+
+    lane = classify_request(payload.question, payload.intent_override, payload.run_all_agents)
+    events = _admitted_stream(deadline, lane, stream_full_pipeline(
+        contract_text=payload.contract_text,
+        question=payload.question,
+        tone=payload.tone,
+        contract_id=cid,
+        no_evidence_threshold=payload.no_evidence_threshold,
+        intent_override=payload.intent_override,
+        run_all_agents=payload.run_all_agents,
+        deadline=deadline,
+        profile=profile,
+    ), user_email=user_email, limits=limits)
+    events = _prefetch_after_final(
+        events, cid, payload.contract_text,
+        tone=payload.tone, no_evidence_threshold=payload.no_evidence_threshold, profile=profile,
+        user_email=user_email,
+    )
+    return _streaming_response(events, accept)
+
+# -------------------------------------------------------------------
+# Batch Analysis APIs
+# -------------------------------------------------------------------
+
+def _parse_batch_questions(raw: str) -> List[Dict[str, Any]]:
+    """Form field: JSON list of strings or {"question", "intent_override"} objects."""
+    try:
+        data = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="questions must be a JSON list")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="questions must be a JSON list")
+
+    out: List[Dict[str, Any]] = []
+    for item in data:
+        if isinstance(item, str):
+            out.append({"question": item, "intent_override": None})
+        elif isinstance(item, dict):
+            out.append({"question": str(item.get("question") or ""), "intent_override": item.get("intent_override")})
+        else:
+            raise HTTPException(status_code=400, detail="Each question must be a string or an object")
+    return out
+
+
+def _batch_lane() -> Optional[str]:
+    return lanes.HEAVY if lanes.lanes_enabled() else None
+
+
+async def _run_batch(
+    *,
+    contract_text: Optional[str],
+    contract_id: Optional[str],
+    questions: List[Dict[str, Any]],
+    tone: str,
+    no_evidence_threshold: float,
+    run_all_agents: bool,
+    deadline: Deadline,
+    user_email: str,
+) -> Dict[str, Any]:
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions")
+    max_questions = int(os.getenv("BATCH_MAX_QUESTIONS", "50"))
+    if len(questions) > max_questions:
+        raise HTTPException(status_code=400, detail=f"At most {max_questions} questions per batch")
+
+    if contract_text is None:
+        if not contract_id:
+            raise HTTPException(status_code=400, detail="Provide a contract file/text or a contract_id")
+        contract_text = await asyncio.to_thread(memory_store.load_contract_text, contract_id, user_email)
+        if contract_text is None:
+            raise HTTPException(status_code=404, detail="Unknown contract_id")
+    if not contract_text.strip():
+        raise HTTPException(status_code=400, detail="Empty document")
+
+    cid = contract_id or stable_contract_id(contract_text)
+    await _remember_contract(cid, contract_text, user_email)
+
+    results = await run_batch_pipeline(
+        contract_text=contract_text,
+        questions=questions,
+        tone=tone,
+        contract_id=cid,
+        no_evidence_threshold=no_evidence_threshold,
+        run_all_agents=run_all_agents,
+        max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "4")),
+        deadline=deadline,
+    )
+    return {
+        "contract_id": cid,
+        "count": len(results),
+        "truncated": any(bool((r.get("analysis") or {}).get("truncated")) for r in results),
+        "results": results,
+    }
+
+
+@app.post("/analyze_batch")
+async def analyze_batch(
+    request: Request,
+    questions: str = Form(...),
+    file: Optional[UploadFile] = File(None),
+    contract_id: Optional[str] = Form(None),
+    tone: str = Form("executive"),
+    no_evidence_threshold: float = Form(0.25),
+    run_all_agents: bool = Form(False),
+    deadline_ms: Optional[float] = Form(None),
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    deadline = deadline_from_request(x_deadline_ms, deadline_ms)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    contract_text = await _read_upload_text(file) if file is not None else None
+    # A whole batch is one heavy-lane slot for its caller.
+    return await _admitted(deadline, _batch_lane(), _run_batch(
+        contract_text=contract_text,
+        contract_id=contract_id,
+        questions=_parse_batch_questions(questions),
+        tone=tone,
+        no_evidence_threshold=no_evidence_threshold,
+        run_all_agents=run_all_agents,
+        deadline=deadline,
+        user_email=user_email,
+    ), user_email=user_email)
+
+
+@app.post("/analyze_batch_text")
+async def analyze_batch_text(
+    request: Request,
+    payload: AnalyzeBatchTextRequest,
+    x_deadline_ms: Optional[str] = Header(default=None),
+    authorization: Optional[str] = Header(default=None),
+):
+    deadline = deadline_from_request(x_deadline_ms, payload.deadline_ms)
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    return await _admitted(deadline, _batch_lane(), _run_batch(
+        contract_text=payload.contract_text,
+        contract_id=payload.contract_id,
+        questions=[q.model_dump() for q in payload.questions],
+        tone=payload.tone,
+        no_evidence_threshold=payload.no_evidence_threshold,
+        run_all_agents=payload.run_all_agents,
+        deadline=deadline,
+        user_email=user_email,
+    ), user_email=user_email)
+
+
+# -------------------------------------------------------------------
+# Multi-Contract Analysis API
+# -------------------------------------------------------------------
+
+def _spool_upload(upload: UploadFile, dest_dir: Path) -> Path:
+    # Copy in chunks so large uploads never sit in memory; the request's own
+    # temp files may be closed before a streaming response finishes.
+    dest = dest_dir / f"{len(list(dest_dir.iterdir())):05d}"
+    upload.file.seek(0)
+    with open(dest, "wb") as fh:
+        shutil.copyfileobj(upload.file, fh, length=1024 * 1024)
+    return dest
+
+
+async def _bulk_ndjson(
+    *,
+    workdir: Path,
+    uploads: List[tuple],
+    archive_path: Optional[Path],
+    pipeline_kwargs: Dict[str, Any],
+    user_email: str,
+    limits: Dict[str, Any],
+):
+    zf: Optional[zipfile.ZipFile] = None
+    try:
+        sources = [bulk_analysis.file_source(path, name=name) for name, path in uploads]
+        if archive_path is not None:
+            zf = zipfile.ZipFile(archive_path)
+            sources = itertools.chain(sources, bulk_analysis.iter_zip_sources(zf))
+
+        # Like a batch, the whole upload is one heavy-lane slot for its caller.
+        items = _admitted_stream(
+            Deadline(),
+            _batch_lane(),
+            bulk_analysis.analyze_contracts(sources, extract=_extract_text, **pipeline_kwargs),
+            user_email=user_email,
+            limits=limits,
+        )
+        async for item in items:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+    finally:
+        if zf is not None:
+            zf.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@app.post("/analyze_contracts")
+async def analyze_contracts(
+    request: Request,
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    question: str = Form(bulk_analysis.DEFAULT_BULK_QUESTION),
+    tone: str = Form("executive"),
+    intent_override: Optional[str] = Form("risk_analysis"),
+    no_evidence_threshold: float = Form(0.25),
+    run_all_agents: bool = Form(False),
+    max_workers: Optional[int] = Form(None),
+    authorization: Optional[str] = Header(default=None),
+):
+    """Analyze many contracts; streams one NDJSON line per contract as it completes."""
+
+    files = [f for f in (files or []) if f is not None and (f.filename or "")]
+    if not files and archive is None:
+        raise HTTPException(status_code=400, detail="Provide files and/or a zip archive")
+    user_email = await asyncio.to_thread(_optional_user_email, authorization, _client_host(request))
+    limits = await _check_quota(user_email)
+
+    workdir = Path(tempfile.mkdtemp(prefix="clauseai_bulk_"))
+    try:
+        uploads = []
+        for f in files:
+            uploads.append((f.filename, await asyncio.to_thread(_spool_upload, f, workdir)))
+
+        archive_path = None
+        if archive is not None:
+            archive_path = await asyncio.to_thread(_spool_upload, archive, workdir)
+            if not zipfile.is_zipfile(archive_path):
+                raise HTTPException(status_code=400, detail="archive must be a zip file")
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    stream = _bulk_ndjson(
+        workdir=workdir,
+        uploads=uploads,
+        archive_path=archive_path,
+        pipeline_kwargs={
+            "question": question,
+            "tone": tone,
+            "intent_override": intent_override or None,
+            "no_evidence_threshold": no_evidence_threshold,
+            "run_all_agents": run_all_agents,
+            "max_workers": max_workers,
+        },
+        user_email=user_email,
+        limits=limits,
+    )
+    return StreamingResponse(stream, media_type="application/x-ndjson")
@@ -0,0 +1,866 @@
+"""Benchmarks for the Milestone 3 contract pipeline.
+
+Run from the workspace root:
+
+    python -m milestone3.backend.bench_pipeline canonical [--log questions.txt]
+    python -m milestone3.backend.bench_pipeline batch [--contract file.txt] [--repeat 3]
+    python -m milestone3.backend.bench_pipeline stream [--contract file.txt]
+    python -m milestone3.backend.bench_pipeline executor [--workers 4 8 16] [--requests 32]
+    python -m milestone3.backend.bench_pipeline embed [--callers 1 8 32] [--queries 512]
+    python -m milestone3.backend.bench_pipeline threads [--blas 1 2 4] [--agents 4 8 16] [--web-workers 1 2]
+    python -m milestone3.backend.bench_pipeline admission [--burst 64] [--slots 2] [--queue 8]
+    python -m milestone3.backend.bench_pipeline degrade [--requests 16]
+    python -m milestone3.backend.bench_pipeline profiles [--repeat 5]
+    python -m milestone3.backend.bench_pipeline plan [--repeat 5]
+    python -m milestone3.backend.bench_pipeline queries [--contracts 5]
+    python -m milestone3.backend.bench_pipeline lazy [--requests 16]
+    python -m milestone3.backend.bench_pipeline prefetch [--contracts 10]
+    python -m milestone3.backend.bench_pipeline ingest [--contracts 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from milestone3.backend import (
+    admission,
+    agent_executor,
+    concurrency,
+    contract_pipeline,
+    db_sqlite,
+    degradation,
+    embedding_batcher,
+    memory_store,
+    prefetch,
+    profiles,
+    query_embeddings,
+    query_planner,
+    result_cache,
+)
+from milestone3.backend.contract_pipeline import replay_question_log
+
+SAMPLE_CONTRACT = Path(__file__).resolve().parent / "sample_contract.txt"
+BENCH_CONTRACT = Path(__file__).resolve().parent / "bench_contract.txt"
+
+# Labelled questions over bench_contract.txt: (question, intent, phrases a reviewer
+# expects to see in the returned evidence).
+PROFILE_BENCH_CASES = [
+    ("What are the payment terms?", "qa", ["within thirty (30) days of the invoice date"]),
+    ("What interest applies to late payments?", "qa", ["1.5% per month"]),
+    ("When can either party terminate?", "qa", ["not cured within thirty (30) days"]),
+    ("What uptime is guaranteed?", "qa", ["99.9% of the time"]),
+    ("How quickly must a security breach be reported?", "qa", ["within seventy-two (72) hours"]),
+    ("Is liability capped?", "qa", ["fees paid or payable in the twelve (12) months"]),
+    ("What is the governing law?", "qa", ["laws of the State of New York"]),
+    ("How long do confidentiality obligations survive?", "qa", ["survive for five (5) years"]),
+    (
+        "Provide a risk analysis of this contract",
+        "risk_analysis",
+        [
+            "within thirty (30) days of the invoice date",
+            "1.5% per month",
+            "not cured within thirty (30) days",
+            "liability is uncapped",
+            "service credits of 10%",
+            "within seventy-two (72) hours",
+            "once per year",
+            "thirty (30) days' notice of any new subprocessor",
+        ],
+    ),
+]
+
+# Paraphrased review-checklist questions, as typed by users in the dashboard.
+DEFAULT_QUESTION_LOG = [
+    "What are the payment terms?",
+    "Explain payment terms and due dates",
+    "Summarize the payment terms",
+    "What are the late fees?",
+    "Is there interest on late payments?",
+    "Summarize late fees and interest",
+    "What are the termination clauses and conditions?",
+    "Explain termination for breach",
+    "When can either party terminate?",
+    "What is the limitation of liability?",
+    "Is liability capped?",
+    "Explain the liability cap",
+    "What uptime is guaranteed?",
+    "Summarize SLA and service credits",
+    "What are the service level agreements and SLAs?",
+    "What are the data protection and privacy obligations?",
+    "Explain privacy obligations for customer data",
+    "What are the audit and reporting requirements?",
+    "Summarize audit rights",
+    "What is the governing law and jurisdiction?",
+]
+
+
+def _read_question_log(path: str | None) -> List[str]:
+    if not path:
+        return list(DEFAULT_QUESTION_LOG)
+    p = Path(path)
+    out: List[str] = []
+    for line in p.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                out.append(str(json.loads(line).get("question") or ""))
+                continue
+            except Exception:
+                pass
+        out.append(line)
+    return out
+
+
+def bench_canonical(args: argparse.Namespace) -> None:
+    stats = replay_question_log(_read_question_log(args.log), intent_override=args.intent_override)
+    print(json.dumps(stats, indent=2))
+
+
+def _disable_caches() -> None:
+    # Measure pipeline work, not cache lookups.
+    os.environ["RESULT_CACHE"] = "0"
+    os.environ["MEMORY_RECALL_THRESHOLD"] = "2"
+    contract_pipeline._SECTION_CACHE.clear()
+
+
+async def _sequential(contract_text: str, questions: List[str]) -> None:
+    for q in questions:
+        await contract_pipeline.run_full_pipeline(contract_text=contract_text, question=q, contract_id="bench")
+
+
+async def _batched(contract_text: str, questions: List[str], concurrency: int) -> None:
+    await contract_pipeline.run_batch_pipeline(
+        contract_text=contract_text,
+        questions=[{"question": q} for q in questions],
+        contract_id="bench",
+        max_concurrency=concurrency,
+    )
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    questions = _read_question_log(args.log)
+    _disable_caches()
+
+    timings = {"sequential": [], "batch": []}
+    for _ in range(max(1, args.repeat)):
+        contract_pipeline._SECTION_CACHE.clear()
+        t0 = time.perf_counter()
+        asyncio.run(_sequential(contract_text, questions))
+        timings["sequential"].append(time.perf_counter() - t0)
+
+        contract_pipeline._SECTION_CACHE.clear()
+        t0 = time.perf_counter()
+        asyncio.run(_batched(contract_text, questions, args.concurrency))
+        timings["batch"].append(time.perf_counter() - t0)
+
+    out = {"questions": len(questions), "concurrency": args.concurrency}
+    for mode, runs in timings.items():
+        best = min(runs)
+        out[mode] = {"best_s": round(best, 4), "questions_per_s": round(len(questions) / best, 2)}
+    out["speedup"] = round(out["sequential"]["best_s"] / out["batch"]["best_s"], 2)
+    print(json.dumps(out, indent=2))
+
+
+async def _stream_timings(contract_text: str, question: str) -> dict:
+    t0 = time.perf_counter()
+    stages = []
+    async for ev in contract_pipeline.stream_full_pipeline(
+        contract_text=contract_text,
+        question=question,
+        contract_id="bench",
+        intent_override="risk_analysis",
+        run_all_agents=True,
+    ):
+        stages.append((ev["event"], round((time.perf_counter() - t0) * 1000.0, 2)))
+    return {"first_event_ms": stages[0][1], "final_ms": stages[-1][1], "stages": stages}
+
+
+def bench_stream(args: argparse.Namespace) -> None:
+    """Time to first stage event vs. time to the full result (what /analyze waits for)."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+    print(json.dumps(asyncio.run(_stream_timings(contract_text, args.question)), indent=2))
+
+
+async def _risk_burst(contract_text: str, requests: int, workers: int) -> None:
+    # Thread mode uses the loop's default executor; size it like the process pool.
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    # Distinct contract bodies so no request is answered from the section cache.
+    await asyncio.gather(*[
+        contract_pipeline.run_full_pipeline(
+            contract_text=f"{contract_text}\n\nReference {i}.",
+            question="Provide a risk analysis of this contract",
+            contract_id=f"bench-{i}",
+            intent_override="risk_analysis",
+            run_all_agents=True,
+        )
+        for i in range(requests)
+    ])
+
+
+def bench_executor(args: argparse.Namespace) -> None:
+    """Risk-analysis throughput with agents on threads vs. a process pool."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+    rows = []
+    for workers in args.workers:
+        for mode in ("thread", "process"):
+            os.environ["AGENT_EXECUTOR"] = mode
+            os.environ["AGENT_PROCESS_WORKERS"] = str(workers)
+            agent_executor.shutdown_pool()
+            if mode == "process":
+                # Start the workers outside the timed section.
+                list(agent_executor.get_pool().map(abs, range(workers)))
+            contract_pipeline._SECTION_CACHE.clear()
+            t0 = time.perf_counter()
+            asyncio.run(_risk_burst(contract_text, args.requests, workers))
+            elapsed = time.perf_counter() - t0
+            rows.append({
+                "mode": mode,
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "analyses_per_s": round(args.requests / elapsed, 2),
+            })
+    agent_executor.shutdown_pool()
+    print(json.dumps({"cpu_count": os.cpu_count(), "requests": args.requests, "results": rows}, indent=2))
+
+
+def bench_embed(args: argparse.Namespace) -> None:
+    """Concurrent single-query encodes: direct model calls vs. the cross-request batcher."""
+
+    questions = list(DEFAULT_QUESTION_LOG)
+    rows = []
+    for callers in args.callers:
+        for mode in ("0", "always"):
+            os.environ["EMBED_BATCHING"] = mode
+            embedding_batcher._batchers.clear()
+            rag = contract_pipeline.LocalRAGIndex()
+            per_caller = max(1, args.queries // callers)
+
+            def caller(i: int) -> None:
+                for j in range(per_caller):
+                    rag.encode([questions[(i + j) % len(questions)]], normalize_embeddings=True)
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=callers) as pool:
+                list(pool.map(caller, range(callers)))
+            elapsed = time.perf_counter() - t0
+            stats = embedding_batcher.batcher_stats()["embedders"].get(rag.embedder_name)
+            rows.append({
+                "batching": mode,
+                "embedder": rag.embedder_name,
+                "callers": callers,
+                "encodes_per_s": round(callers * per_caller / elapsed, 1),
+                "model_calls": stats["batches"] if stats else callers * per_caller,
+                "mean_batch": stats["batch_size"]["mean"] if stats else 1,
+                "mean_queue_wait_ms": stats["queue_wait_ms"]["mean"] if stats else 0,
+            })
+    print(json.dumps({"results": rows}, indent=2))
+
+
+async def _budgeted_burst(contract_text: str, requests: int) -> tuple:
+    cfg = concurrency.configure()
+    await asyncio.gather(*[
+        contract_pipeline.run_full_pipeline(
+            contract_text=f"{contract_text}\n\nReference {i}.",
+            question="Provide a risk analysis of this contract",
+            contract_id=f"bench-{i}",
+            intent_override="risk_analysis",
+            run_all_agents=True,
+        )
+        for i in range(requests)
+    ])
+    # Pools are still up here; asyncio.run() tears the default executor down.
+    return cfg, concurrency.os_thread_count()
+
+
+def bench_threads_cell(args: argparse.Namespace) -> None:
+    """One cell of the `threads` matrix; runs in a fresh process so BLAS reads its env."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+    t0 = time.perf_counter()
+    cfg, os_threads = asyncio.run(_budgeted_burst(contract_text, args.requests))
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "seconds": round(elapsed, 3),
+        "analyses_per_s": round(args.requests / elapsed, 2),
+        "os_threads": os_threads,
+        "cpu_budget": cfg.cpu_budget,
+    }))
+
+
+def bench_threads(args: argparse.Namespace) -> None:
+    """BLAS threads x agent threads x server workers. Each cell runs `web_workers`
+    processes at once (like uvicorn --workers), each with its share of the cores."""
+
+    rows = []
+    for web_workers in args.web_workers:
+        for blas in args.blas:
+            for agents in args.agents:
+                env = dict(os.environ, WEB_CONCURRENCY=str(web_workers), BLAS_THREADS=str(blas), AGENT_THREADS=str(agents))
+                for var in concurrency.BLAS_ENV_VARS:
+                    env.pop(var, None)
+                cmd = [sys.executable, "-m", "milestone3.backend.bench_pipeline", "threads-cell", "--requests", str(args.requests)]
+                if args.contract:
+                    cmd += ["--contract", args.contract]
+                t0 = time.perf_counter()
+                procs = [subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, text=True) for _ in range(web_workers)]
+                cells = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+                elapsed = time.perf_counter() - t0
+                rows.append({
+                    "web_workers": web_workers,
+                    "blas_threads": blas,
+                    "agent_threads": agents,
+                    "analyses_per_s": round(web_workers * args.requests / elapsed, 2),
+                    "threads_total": sum(c["os_threads"] or 0 for c in cells),
+                })
+    best = max(rows, key=lambda r: r["analyses_per_s"])
+    print(json.dumps({"cpu_count": os.cpu_count(), "requests_per_worker": args.requests, "results": rows, "best": best}, indent=2))
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000.0, 1)
+
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+async def _admission_burst(contract_text: str, burst: int, ctl: Optional[admission.AdmissionController]) -> dict:
+    latencies: List[float] = []
+    rejected = 0
+
+    async def one(i: int) -> None:
+        nonlocal rejected
+        t0 = time.perf_counter()
+        kwargs = dict(
+            contract_text=f"{contract_text}\n\nReference {i}.",
+            question="Provide a risk analysis of this contract",
+            contract_id=f"bench-{i}",
+            intent_override="risk_analysis",
+            run_all_agents=True,
+        )
+        try:
+            if ctl is None:
+                await contract_pipeline.run_full_pipeline(**kwargs)
+            else:
+                async with ctl.slot():
+                    await contract_pipeline.run_full_pipeline(**kwargs)
+        except admission.AdmissionRejected:
+            rejected += 1
+            return
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(burst)])
+    return {
+        "accepted": len(latencies),
+        "rejected": rejected,
+        "seconds": round(time.perf_counter() - t0, 3),
+        **_percentiles(latencies),
+    }
+
+
+def bench_admission(args: argparse.Namespace) -> None:
+    """Latency of accepted requests in a burst, with and without admission control."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+    rows = {}
+    for mode in ("unlimited", "admission"):
+        contract_pipeline._SECTION_CACHE.clear()
+        ctl = None
+        if mode == "admission":
+            ctl = admission.AdmissionController(max_concurrent=args.slots, max_queue=args.queue, max_wait_s=args.max_wait)
+        rows[mode] = asyncio.run(_admission_burst(contract_text, args.burst, ctl))
+    print(json.dumps({"burst": args.burst, "slots": args.slots, "queue": args.queue, "results": rows}, indent=2))
+
+
+async def _degraded_runs(contract_text: str, requests: int, level: degradation.DegradationLevel) -> dict:
+    latencies: List[float] = []
+    size = 0
+    with degradation.use_level(level):
+        for i in range(requests):
+            contract_pipeline._SECTION_CACHE.clear()
+            t0 = time.perf_counter()
+            final_json, report = await contract_pipeline.run_full_pipeline(
+                contract_text=f"{contract_text}\n\nReference {i}.",
+                question="Provide a risk analysis of this contract",
+                contract_id=f"bench-{i}",
+                intent_override="risk_analysis",
+                run_all_agents=True,
+            )
+            latencies.append(time.perf_counter() - t0)
+            size = len(json.dumps(final_json))
+    return {"level": level.level, "name": level.name, "response_bytes": size, **_percentiles(latencies)}
+
+
+def bench_degrade(args: argparse.Namespace) -> None:
+    """Latency and response size of a four-agent report at each degradation level."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+    rows = [asyncio.run(_degraded_runs(contract_text, args.requests, lvl)) for lvl in degradation.levels()]
+    print(json.dumps({"requests": args.requests, "results": rows}, indent=2))
+
+
+def _evidence_texts(final_json: dict) -> List[str]:
+    texts = [e.get("text") or "" for e in (final_json.get("analysis") or {}).get("key_evidence") or []]
+    for key, section in (final_json.get("agent_analysis") or {}).items():
+        if isinstance(section, dict):
+            texts.extend(section.get("evidence") or [])
+    return [" ".join(t.split()).lower() for t in texts]
+
+
+def _recall(final_json: dict, expected: List[str]) -> float:
+    texts = _evidence_texts(final_json)
+    found = sum(1 for phrase in expected if any(phrase.lower() in t for t in texts))
+    return found / len(expected)
+
+
+async def _profile_run(contract_text: str, profile: str, repeat: int, embedded: List[int]) -> dict:
+    latencies = {"qa": [], "risk_analysis": []}
+    recalls = {"qa": [], "risk_analysis": []}
+    sizes = {"qa": [], "risk_analysis": []}
+    texts = {"qa": [], "risk_analysis": []}
+    for question, intent, expected in PROFILE_BENCH_CASES:
+        for i in range(repeat):
+            contract_pipeline._SECTION_CACHE.clear()
+            embedded[0] = 0
+            t0 = time.perf_counter()
+            final_json, _ = await contract_pipeline.run_full_pipeline(
+                contract_text=contract_text,
+                question=question,
+                contract_id=f"bench-{profile}-{i}",
+                intent_override=intent,
+                run_all_agents=intent != "qa",
+                profile=profile,
+            )
+            latencies[intent].append(time.perf_counter() - t0)
+            texts[intent].append(embedded[0])
+        recalls[intent].append(_recall(final_json, expected))
+        sizes[intent].append(sum(len(t) for t in _evidence_texts(final_json)))
+
+    def mean(values: List[float]) -> float:
+        return round(sum(values) / len(values), 3)
+
+    return {
+        "profile": profile,
+        **{
+            label: {
+                "evidence_recall": mean(recalls[intent]),
+                "evidence_chars": round(mean(sizes[intent])),
+                "texts_embedded": mean(texts[intent]),
+                **_percentiles(latencies[intent]),
+            }
+            for label, intent in (("qa", "qa"), ("report", "risk_analysis"))
+        },
+    }
+
+
+def bench_profiles(args: argparse.Namespace) -> None:
+    """Latency and evidence recall of each analysis profile on the labelled benchmark contract."""
+
+    contract_text = Path(args.contract or BENCH_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+
+    # Chunks + queries embedded per request: the model-independent part of the cost
+    # (with the hashing embedder, embedding is nearly free and wall time hides it).
+    embedded = [0]
+    encode = contract_pipeline.LocalRAGIndex.encode
+
+    def counting_encode(self, texts, **kwargs):
+        embedded[0] += len(texts)
+        return encode(self, texts, **kwargs)
+
+    contract_pipeline.LocalRAGIndex.encode = counting_encode
+    try:
+        rows = [asyncio.run(_profile_run(contract_text, name, args.repeat, embedded)) for name in profiles.PROFILES]
+    finally:
+        contract_pipeline.LocalRAGIndex.encode = encode
+    print(json.dumps({"cases": len(PROFILE_BENCH_CASES), "repeat": args.repeat, "results": rows}, indent=2))
+
+
+PLAN_BENCH_QUESTIONS = [
+    ("Provide a risk analysis of this contract", True),
+    ("What are the payment and liability risks?", False),
+    ("Review the termination, data protection and SLA risks", False),
+]
+
+
+def _comparable(final_json: dict) -> dict:
+    # Everything but timestamps, which differ between any two runs.
+    def strip(value):
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if k not in {"timestamp", "generated_at"}}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
+
+    return strip(final_json)
+
+
+async def _plan_run(contract_text: str, repeat: int, counters: dict) -> dict:
+    latencies: List[float] = []
+    searches: List[int] = []
+    embedded: List[int] = []
+    outputs = []
+    for question, all_agents in PLAN_BENCH_QUESTIONS:
+        for i in range(repeat):
+            contract_pipeline._SECTION_CACHE.clear()
+            counters["searches"] = counters["embedded"] = 0
+            t0 = time.perf_counter()
+            final_json, _ = await contract_pipeline.run_full_pipeline(
+                contract_text=contract_text,
+                question=question,
+                contract_id=f"bench-plan-{i}",
+                intent_override="risk_analysis",
+                run_all_agents=all_agents,
+            )
+            latencies.append(time.perf_counter() - t0)
+            searches.append(counters["searches"])
+            embedded.append(counters["embedded"])
+        outputs.append(_comparable(final_json))
+    return {
+        "index_searches": round(sum(searches) / len(searches), 1),
+        "texts_embedded": round(sum(embedded) / len(embedded), 1),
+        **_percentiles(latencies),
+        "_outputs": outputs,
+    }
+
+
+def bench_plan(args: argparse.Namespace) -> None:
+    """Index searches and latency per report with and without the request-wide query planner."""
+
+    contract_text = Path(args.contract or BENCH_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+
+    counters = {"searches": 0, "embedded": 0}
+    encode = contract_pipeline.LocalRAGIndex.encode
+    query_vector = contract_pipeline.LocalRAGIndex.query_vector
+
+    def counting_encode(self, texts, **kwargs):
+        counters["embedded"] += len(texts)
+        return encode(self, texts, **kwargs)
+
+    def counting_query_vector(self, query_vec, **kwargs):
+        counters["searches"] += 1
+        return query_vector(self, query_vec, **kwargs)
+
+    contract_pipeline.LocalRAGIndex.encode = counting_encode
+    contract_pipeline.LocalRAGIndex.query_vector = counting_query_vector
+    rows = {}
+    try:
+        for label, flag in (("unplanned", "0"), ("planned", "1")):
+            os.environ["QUERY_PLANNER"] = flag
+            rows[label] = asyncio.run(_plan_run(contract_text, args.repeat, counters))
+    finally:
+        contract_pipeline.LocalRAGIndex.encode = encode
+        contract_pipeline.LocalRAGIndex.query_vector = query_vector
+    same = rows["unplanned"].pop("_outputs") == rows["planned"].pop("_outputs")
+    print(json.dumps({
+        "questions": len(PLAN_BENCH_QUESTIONS),
+        "repeat": args.repeat,
+        "identical_output": same,
+        "results": rows,
+        "planner": query_planner.planner_stats(),
+    }, indent=2))
+
+
+async def _query_embed_run(contracts: List[str], counters: dict) -> dict:
+    latencies: List[float] = []
+    encoded: List[int] = []
+    for n, contract_text in enumerate(contracts):
+        for question, intent, _ in PROFILE_BENCH_CASES:
+            contract_pipeline._SECTION_CACHE.clear()
+            counters["queries"] = 0
+            t0 = time.perf_counter()
+            await contract_pipeline.run_full_pipeline(
+                contract_text=contract_text,
+                question=question,
+                contract_id=f"bench-queries-{n}",
+                intent_override=intent,
+                run_all_agents=intent != "qa",
+            )
+            latencies.append(time.perf_counter() - t0)
+            encoded.append(counters["queries"])
+    return {
+        "requests": len(latencies),
+        "query_texts_encoded": sum(encoded),
+        "per_request": round(sum(encoded) / len(encoded), 2),
+        **_percentiles(latencies),
+    }
+
+
+def bench_queries(args: argparse.Namespace) -> None:
+    """Query strings sent to the embedder with and without the query-embedding cache."""
+
+    base = Path(args.contract or BENCH_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    # Distinct contracts (no section or result reuse), same questions: the dashboard pattern.
+    contracts = [f"{base}\n\nSchedule {n}: Order Form reference CT-{n:04d}." for n in range(args.contracts)]
+    _disable_caches()
+
+    counters = {"queries": 0}
+    encode_queries = query_embeddings.encode_queries
+
+    def counting_encode_queries(embedder_name, texts, encode_fn):
+        def counted(missing):
+            counters["queries"] += len(missing)
+            return encode_fn(missing)
+
+        return encode_queries(embedder_name, texts, counted)
+
+    query_embeddings.encode_queries = counting_encode_queries
+    rows = {}
+    try:
+        for label, flag in (("uncached", "0"), ("cached", "1")):
+            os.environ["QUERY_EMBED_CACHE"] = flag
+            warm = contract_pipeline.warm_query_embeddings()
+            rows[label] = {"warm": warm, **asyncio.run(_query_embed_run(contracts, counters))}
+    finally:
+        query_embeddings.encode_queries = encode_queries
+    print(json.dumps({"contracts": args.contracts, "results": rows, "cache": query_embeddings.cache_stats()}, indent=2))
+
+
+async def _lazy_runs(contract_text: str, requests: int, lazy: bool) -> dict:
+    latencies: List[float] = []
+    sections: List[float] = []
+    sizes: List[int] = []
+    for i in range(requests):
+        contract_pipeline._SECTION_CACHE.clear()
+        t0 = time.perf_counter()
+        final_json, report = await contract_pipeline.run_full_pipeline(
+            contract_text=f"{contract_text}\n\nReference {i}.",
+            question="Provide a risk analysis of this contract",
+            contract_id=f"bench-lazy-{i}",
+            intent_override="risk_analysis",
+            run_all_agents=True,
+            lazy_agents=lazy,
+        )
+        latencies.append(time.perf_counter() - t0)
+        sizes.append(len(json.dumps({"analysis": final_json, "report": report})))
+        if lazy:
+            # The user opens one agent tab.
+            t0 = time.perf_counter()
+            await contract_pipeline.lazy_agent_section(final_json["agent_analysis"]["analysis_id"], "legal")
+            sections.append(time.perf_counter() - t0)
+    out = {"response_bytes": round(sum(sizes) / len(sizes)), **_percentiles(latencies)}
+    if lazy:
+        out["first_section"] = _percentiles(sections)
+    return out
+
+
+def bench_lazy(args: argparse.Namespace) -> None:
+    """Initial latency and payload of a four-agent report, eager vs. lazy agent sections."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    _disable_caches()
+    rows = {label: asyncio.run(_lazy_runs(contract_text, args.requests, lazy)) for label, lazy in (("eager", False), ("lazy", True))}
+    print(json.dumps({"requests": args.requests, "results": rows}, indent=2))
+
+
+async def _prefetch_runs(contract_text: str, contracts: int, prefetched: bool) -> dict:
+    follow_ups: List[float] = []
+    busy: List[float] = []
+    hits = 0
+    for i in range(contracts):
+        text = f"{contract_text}\n\nReference {int(prefetched)}-{i}."
+        cid = contract_pipeline.stable_contract_id(text)
+        await contract_pipeline.run_full_pipeline(
+            contract_text=text, question="Provide a risk analysis of this contract", contract_id=cid,
+            intent_override="risk_analysis",
+        )
+        if prefetched:
+            t0 = time.perf_counter()
+            await prefetch.run_job(prefetch.PrefetchJob(contract_text=text, contract_id=cid), yield_to_foreground=False)
+            busy.append(time.perf_counter() - t0)
+        contract_pipeline._INDEX_CACHE.clear()
+        # The user then asks the standard follow-ups, as the dashboard sends them.
+        for _, question in prefetch.FOLLOW_UP_QUESTIONS:
+            t0 = time.perf_counter()
+            final_json, _ = await contract_pipeline.run_full_pipeline(
+                contract_text=text, question=question, contract_id=cid, intent_override="qa"
+            )
+            follow_ups.append(time.perf_counter() - t0)
+            hits += final_json.get("cache") == "exact"
+    out = {"follow_up": _percentiles(follow_ups), "exact_hits": hits}
+    if prefetched:
+        out["prefetch_ms_per_contract"] = round(1000.0 * sum(busy) / len(busy), 2)
+    return out
+
+
+def bench_prefetch(args: argparse.Namespace) -> None:
+    """Latency of the standard follow-up questions after a first analysis, with and without prefetch."""
+
+    contract_text = Path(args.contract or SAMPLE_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    with tempfile.TemporaryDirectory() as tmp:
+        # The result cache is the point here; keep it and the memory store out of outputs/.
+        result_cache.RESULT_CACHE_DB_PATH = Path(tmp) / "result_cache.sqlite3"
+        memory_store.MEMORY_DB_PATH = Path(tmp) / "memory.sqlite3"
+        memory_store.MEMORY_DIR = Path(tmp)
+        db_sqlite.DB_PATH = Path(tmp) / "backend.sqlite3"
+        rows = {
+            label: asyncio.run(_prefetch_runs(contract_text, args.contracts, on))
+            for label, on in (("no_prefetch", False), ("prefetch", True))
+        }
+    print(json.dumps({"contracts": args.contracts, "results": rows}, indent=2))
+
+
+INGEST_DEFAULT_QUESTION = "Provide comprehensive contract analysis covering risks, payment terms, termination, liability, and compliance."
+
+
+async def _ingest_runs(contract_text: str, contracts: int, ingested: bool) -> dict:
+    confirm: dict = {"default": [], "custom": []}
+    busy: List[float] = []
+    for i in range(contracts):
+        for label, question in (("default", INGEST_DEFAULT_QUESTION), ("custom", "Which clauses carry the most risk?")):
+            # One upload per confirm: a fresh copy of the contract each time.
+            text = f"{contract_text}\n\nReference {int(ingested)}-{label}-{i}."
+            cid = contract_pipeline.stable_contract_id(text)
+            if ingested:
+                # Runs while the user reads the preview.
+                t0 = time.perf_counter()
+                job = prefetch.IngestJob(contract_text=text, contract_id=cid, question=INGEST_DEFAULT_QUESTION)
+                await prefetch.run_ingest(job, yield_to_foreground=False)
+                busy.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            await contract_pipeline.run_full_pipeline(
+                contract_text=text, question=question, contract_id=cid, intent_override="risk_analysis", run_all_agents=True
+            )
+            confirm[label].append(time.perf_counter() - t0)
+    out = {f"confirm_{label}": _percentiles(v) for label, v in confirm.items()}
+    if ingested:
+        out["ingest_ms_per_contract"] = round(1000.0 * sum(busy) / len(busy), 2)
+    return out
+
+
+def bench_ingest(args: argparse.Namespace) -> None:
+    """Latency of "Start Analysis" after upload, with and without background pre-ingest."""
+
+    contract_text = Path(args.contract or BENCH_CONTRACT).read_text(encoding="utf-8", errors="ignore")
+    os.environ["MEMORY_RECALL_THRESHOLD"] = "2"
+    with tempfile.TemporaryDirectory() as tmp:
+        result_cache.RESULT_CACHE_DB_PATH = Path(tmp) / "result_cache.sqlite3"
+        memory_store.MEMORY_DB_PATH = Path(tmp) / "memory.sqlite3"
+        memory_store.MEMORY_DIR = Path(tmp)
+        db_sqlite.DB_PATH = Path(tmp) / "backend.sqlite3"
+        rows = {
+            label: asyncio.run(_ingest_runs(contract_text, args.contracts, on))
+            for label, on in (("cold", False), ("pre_ingested", True))
+        }
+    print(json.dumps({"contracts": args.contracts, "results": rows}, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("canonical", help="Exact vs canonical-key cache hit rate over a question log")
+    p.add_argument("--log", help="Text file (one question per line) or JSONL with a 'question' field")
+    p.add_argument("--intent-override", default=None)
+    p.set_defaults(func=bench_canonical)
+
+    p = sub.add_parser("batch", help="Sequential run_full_pipeline calls vs one run_batch_pipeline call")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--log", help="Question log, same format as 'canonical'")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("stream", help="Time to first streamed stage vs. full result")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--question", default="Provide a risk analysis of this contract")
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("executor", help="Agent throughput: thread pool vs. process pool")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    p.add_argument("--requests", type=int, default=32)
+    p.set_defaults(func=bench_executor)
+
+    p = sub.add_parser("embed", help="Query-embedding throughput with and without micro-batching")
+    p.add_argument("--callers", type=int, nargs="+", default=[1, 8, 32])
+    p.add_argument("--queries", type=int, default=512)
+    p.set_defaults(func=bench_embed)
+
+    p = sub.add_parser("threads", help="Throughput matrix over BLAS threads, agent threads and server workers")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--blas", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--agents", type=int, nargs="+", default=[4, 8, 16])
+    p.add_argument("--web-workers", type=int, nargs="+", default=[1, 2])
+    p.add_argument("--requests", type=int, default=16)
+    p.set_defaults(func=bench_threads)
+
+    p = sub.add_parser("threads-cell")
+    p.add_argument("--contract")
+    p.add_argument("--requests", type=int, default=16)
+    p.set_defaults(func=bench_threads_cell)
+
+    p = sub.add_parser("admission", help="Burst latency with and without admission control")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--burst", type=int, default=64)
+    p.add_argument("--slots", type=int, default=2)
+    p.add_argument("--queue", type=int, default=8)
+    p.add_argument("--max-wait", type=float, default=30.0)
+    p.set_defaults(func=bench_admission)
+
+    p = sub.add_parser("degrade", help="Report latency and size at each degradation level")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--requests", type=int, default=16)
+    p.set_defaults(func=bench_degrade)
+
+    p = sub.add_parser("profiles", help="Latency and evidence recall per analysis profile")
+    p.add_argument("--contract", help="Contract text file (default: bench_contract.txt, labelled for PROFILE_BENCH_CASES)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_profiles)
+
+    p = sub.add_parser("plan", help="Index searches per report with and without the query planner")
+    p.add_argument("--contract", help="Contract text file (default: bench_contract.txt)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_plan)
+
+    p = sub.add_parser("queries", help="Query embeddings computed with and without the query-embedding cache")
+    p.add_argument("--contract", help="Contract text file (default: bench_contract.txt)")
+    p.add_argument("--contracts", type=int, default=5)
+    p.set_defaults(func=bench_queries)
+
+    p = sub.add_parser("lazy", help="Initial latency and payload with eager vs. lazy agent sections")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--requests", type=int, default=16)
+    p.set_defaults(func=bench_lazy)
+
+    p = sub.add_parser("prefetch", help="Follow-up latency with and without speculative prefetch")
+    p.add_argument("--contract", help="Contract text file (default: sample_contract.txt)")
+    p.add_argument("--contracts", type=int, default=10)
+    p.set_defaults(func=bench_prefetch)
+
+    p = sub.add_parser("ingest", help="Analysis latency after upload with and without pre-ingest")
+    p.add_argument("--contract", help="Contract text file (default: bench_contract.txt)")
+    p.add_argument("--contracts", type=int, default=10)
+    p.set_defaults(func=bench_ingest)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
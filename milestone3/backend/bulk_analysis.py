@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional
+
+from milestone3.backend.contract_pipeline import run_full_pipeline, stable_contract_id
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+SUPPORTED_SUFFIXES = (".txt", ".md", ".pdf", ".docx")
+DEFAULT_BULK_QUESTION = "Provide a risk analysis of this contract"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def max_bulk_workers() -> int:
+    return max(1, _env_int("BULK_MAX_WORKERS", 4))
+
+
+def max_entry_bytes() -> int:
+    return max(1, _env_int("BULK_MAX_ENTRY_BYTES", 25 * 1024 * 1024))
+
+
+# ============================================================
+# SOURCES
+# ============================================================
+
+@dataclass(frozen=True)
+class ContractSource:
+    """One contract in a bulk request; bytes are only read when a worker picks it up."""
+
+    name: str
+    load: Callable[[], bytes]
+    size: Optional[int] = None
+
+
+def file_source(path: Path, name: Optional[str] = None) -> ContractSource:
+    path = Path(path)
+    return ContractSource(name=name or path.name, load=path.read_bytes, size=path.stat().st_size)
+
+
+def iter_zip_sources(zf: zipfile.ZipFile) -> Iterator[ContractSource]:
+    """Yield supported entries of an open archive without decompressing them.
+
+    Only the central directory is read here; each entry is inflated by the worker
+    that analyzes it, so at most `workers` entries are held in memory at once.
+    """
+
+    for info in zf.infolist():
+        name = info.filename
+        base = name.rsplit("/", 1)[-1]
+        if info.is_dir() or not base or base.startswith(".") or name.startswith("__MACOSX/"):
+            continue
+        if not base.lower().endswith(SUPPORTED_SUFFIXES):
+            continue
+        yield ContractSource(name=name, load=lambda info=info: zf.read(info), size=info.file_size)
+
+
+# ============================================================
+# FAN-OUT
+# ============================================================
+
+async def _analyze_one(
+    index: int,
+    src: ContractSource,
+    *,
+    extract: Callable[[str, bytes], str],
+    pipeline_kwargs: Dict[str, Any],
+) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"index": index, "name": src.name}
+    t0 = time.perf_counter()
+    try:
+        if src.size is not None and src.size > max_entry_bytes():
+            out.update({"status": "skipped", "error": f"Entry larger than {max_entry_bytes()} bytes"})
+            return out
+
+        text = await asyncio.to_thread(lambda: extract(src.name, src.load()))
+        if not text.strip():
+            out.update({"status": "skipped", "error": "Empty document"})
+            return out
+
+        cid = stable_contract_id(text)
+        final_json, report = await run_full_pipeline(contract_text=text, contract_id=cid, **pipeline_kwargs)
+        out.update({
+            "status": "done",
+            "contract_id": cid,
+            "cache": final_json.get("cache"),
+            "analysis": final_json,
+            "report": report,
+        })
+    except Exception as e:
+        out.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        out["elapsed_s"] = round(time.perf_counter() - t0, 4)
+    return out
+
+
+async def analyze_contracts(
+    sources: Iterable[ContractSource],
+    *,
+    extract: Callable[[str, bytes], str],
+    question: str = DEFAULT_BULK_QUESTION,
+    tone: str = "executive",
+    intent_override: Optional[str] = "risk_analysis",
+    no_evidence_threshold: float = 0.25,
+    run_all_agents: bool = False,
+    max_workers: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run the same analysis over many contracts, yielding each result as it completes.
+
+    A fixed pool of `max_workers` tasks pulls from a queue of the same size, so the
+    producer never gets more than one queue's worth ahead of the workers. Every yielded
+    item has `index`, `name` and `status` (`done`, `error` or `skipped`); the final item
+    is a `{"status": "complete", ...}` summary.
+    """
+
+    workers = min(max_bulk_workers(), max(1, int(max_workers or max_bulk_workers())))
+    pipeline_kwargs = {
+        "question": question,
+        "tone": tone,
+        "intent_override": intent_override,
+        "no_evidence_threshold": no_evidence_threshold,
+        "run_all_agents": run_all_agents,
+    }
+
+    todo: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue(maxsize=workers)
+    done: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+    async def produce() -> None:
+        try:
+            for i, src in enumerate(sources):
+                await todo.put((i, src))
+        finally:
+            for _ in range(workers):
+                await todo.put(None)
+
+    async def work() -> None:
+        try:
+            while True:
+                job = await todo.get()
+                if job is None:
+                    return
+                i, src = job
+                await done.put(await _analyze_one(i, src, extract=extract, pipeline_kwargs=pipeline_kwargs))
+        finally:
+            await done.put(None)
+
+    t0 = time.perf_counter()
+    tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work()) for _ in range(workers)]
+    counts = {"done": 0, "error": 0, "skipped": 0}
+    try:
+        running = workers
+        while running:
+            item = await done.get()
+            if item is None:
+                running -= 1
+                continue
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+            yield item
+
+        # Report a failure in the source iterator (e.g. a corrupt archive) instead of
+        # breaking the stream.
+        producer = tasks[0]
+        if producer.done() and not producer.cancelled() and producer.exception() is not None:
+            e = producer.exception()
+            counts["error"] += 1
+            yield {"index": None, "name": None, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        yield {
+            "status": "complete",
+            "total": sum(counts.values()),
+            **counts,
+            "workers": workers,
+            "elapsed_s": round(time.perf_counter() - t0, 4),
+        }
+    finally:
+        # Client went away or the caller stopped iterating: stop the pool.
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,188 @@
+"""Per-worker CPU budget: BLAS/OpenMP threads and executor sizes.
+
+Every uvicorn worker process gets its own BLAS/OpenMP thread pool (sized to all cores
+by default) on top of the agent threads, so N workers on a 16-core node start far more
+threads than there are cores. This module splits the cores between workers and sizes
+each worker's pools from its share.
+
+`apply_blas_env()` must run before numpy is first imported (app.py does this at the top);
+after that, limits can only be changed through the optional `threadpoolctl` package.
+This module must not import numpy.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+BLAS_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class ConcurrencyConfig:
+    """Thread/process budget of one server process.
+
+    - `web_workers`: server processes on this host (`WEB_CONCURRENCY`, as read by uvicorn/gunicorn).
+    - `cpu_budget`: cores this process may use (`CPU_BUDGET`, default cores / web_workers).
+    - `blas_threads`: BLAS/OpenMP threads per process (`BLAS_THREADS`, default 1: the
+      matmuls here are small and already run from many agent threads at once).
+    - `agent_threads`: default thread pool behind `asyncio.to_thread` (`AGENT_THREADS`,
+      default cpu_budget + 4, mirroring Python's own default but per budget).
+    - `process_workers`: `AGENT_EXECUTOR=process` pool size (`AGENT_PROCESS_WORKERS`,
+      default cpu_budget).
+    - `torch_threads`: intra-op threads for a sentence-transformers model (`TORCH_THREADS`,
+      default cpu_budget; the embedding batcher makes one model call at a time).
+    """
+
+    cpu_count: int
+    web_workers: int
+    cpu_budget: int
+    blas_threads: int
+    agent_threads: int
+    process_workers: int
+    torch_threads: int
+
+
+def load_config() -> ConcurrencyConfig:
+    cpu_count = os.cpu_count() or 1
+    web_workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+    cpu_budget = _env_int("CPU_BUDGET", 0)
+    if cpu_budget <= 0:
+        cpu_budget = max(1, cpu_count // web_workers)
+
+    def positive(name: str, default: int) -> int:
+        v = _env_int(name, 0)
+        return v if v > 0 else default
+
+    return ConcurrencyConfig(
+        cpu_count=cpu_count,
+        web_workers=web_workers,
+        cpu_budget=cpu_budget,
+        blas_threads=positive("BLAS_THREADS", 1),
+        agent_threads=positive("AGENT_THREADS", cpu_budget + 4),
+        process_workers=positive("AGENT_PROCESS_WORKERS", cpu_budget),
+        torch_threads=positive("TORCH_THREADS", cpu_budget),
+    )
+
+
+# ============================================================
+# BLAS / OPENMP
+# ============================================================
+
+def apply_blas_env(cfg: Optional[ConcurrencyConfig] = None) -> None:
+    """Default the BLAS/OpenMP thread env vars (explicit settings win).
+
+    Inherited by spawned agent workers. Only effective before numpy is imported.
+    """
+
+    cfg = cfg or load_config()
+    for var in BLAS_ENV_VARS:
+        os.environ.setdefault(var, str(cfg.blas_threads))
+
+
+def _maybe_threadpoolctl():
+    try:
+        import threadpoolctl  # type: ignore
+
+        return threadpoolctl
+    except Exception:
+        return None
+
+
+_blas_limiter: Any = None
+
+
+def limit_blas_threads(n: int) -> bool:
+    """Resize already-loaded BLAS/OpenMP pools; needs threadpoolctl (optional)."""
+
+    global _blas_limiter
+    threadpoolctl = _maybe_threadpoolctl()
+    if threadpoolctl is None:
+        return False
+    # Keep the limiter alive: the limit holds for the life of the process.
+    _blas_limiter = threadpoolctl.threadpool_limits(limits=int(n))
+    return True
+
+
+def apply_torch_threads(cfg: Optional[ConcurrencyConfig] = None) -> None:
+    """Size torch's intra-op pool once it has been imported (by sentence-transformers)."""
+
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    cfg = cfg or load_config()
+    try:
+        torch.set_num_threads(cfg.torch_threads)
+    except Exception:
+        pass
+
+
+def blas_pools() -> List[Dict[str, Any]]:
+    threadpoolctl = _maybe_threadpoolctl()
+    if threadpoolctl is None:
+        return []
+    return [
+        {k: info.get(k) for k in ("user_api", "internal_api", "num_threads", "version")}
+        for info in threadpoolctl.threadpool_info()
+    ]
+
+
+def os_thread_count() -> Optional[int]:
+    """Threads in this process (Linux /proc), including BLAS and torch pools."""
+
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+# ============================================================
+# STARTUP
+# ============================================================
+
+def configure(loop: Optional[asyncio.AbstractEventLoop] = None) -> ConcurrencyConfig:
+    """Apply the budget to this process: BLAS limits and the loop's default executor."""
+
+    cfg = load_config()
+    apply_blas_env(cfg)
+    limit_blas_threads(cfg.blas_threads)
+    apply_torch_threads(cfg)
+    loop = loop or asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=cfg.agent_threads, thread_name_prefix="agent"))
+    return cfg
+
+
+def report() -> Dict[str, Any]:
+    torch = sys.modules.get("torch")
+    return {
+        "config": asdict(load_config()),
+        "blas_env": {var: os.environ.get(var) for var in BLAS_ENV_VARS},
+        "blas_pools": blas_pools(),
+        "torch_threads": torch.get_num_threads() if torch is not None else None,
+        "os_threads": os_thread_count(),
+    }
@@ -1,17 +1,40 @@
 from __future__ import annotations
 
 import asyncio
+import copy
 import hashlib
 import json
 import os
 import re
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
+from milestone3.backend import (
+    agent_executor,
+    degradation,
+    lanes,
+    memory_store,
+    profiles,
+    query_embeddings,
+    query_planner,
+)
+from milestone3.backend.concurrency import apply_torch_threads
+from milestone3.backend.deadlines import Deadline, current_deadline, use_deadline
+from milestone3.backend.embedding_batcher import get_batcher
+from milestone3.backend.result_cache import (
+    LRUCache,
+    SingleFlight,
+    analysis_fingerprint,
+    get_result_cache,
+    normalize_question,
+)
+
 
 def _maybe_load_sentence_transformer():
     """Lazy-load SentenceTransformer.
@@ -31,12 +54,17 @@ def _maybe_load_sentence_transformer():
         return None
 
 
+# Bump whenever a change alters pipeline output; cached results from other
+# versions are invalidated (result cache) or ignored (memory recall).
+PIPELINE_VERSION = "m3-2026.10.1"
+
+
 # Base folder for Milestone 3
 MILESTONE3_DIR = Path(__file__).resolve().parents[1]
 OUTPUTS_DIR = MILESTONE3_DIR / "outputs"
 OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
 
-MEMORY_DIR = OUTPUTS_DIR / "api_memory"
+MEMORY_DIR = memory_store.MEMORY_DIR
 MEMORY_DIR.mkdir(parents=True, exist_ok=True)
 
 
@@ -91,6 +119,19 @@ COMMON_RISK_TERMS = [
 
 RISK_ORDER = {"low": 0, "medium": 1, "high": 2, "unknown": 1}
 
+# Identical requests running at the same time share one pipeline run.
+_SINGLE_FLIGHT = SingleFlight()
+
+# on_stage(stage, payload) hook for streaming intermediate results.
+StageCallback = Callable[[str, Dict[str, Any]], None]
+
+# Sanitized QA answers / executive sections keyed by contract + canonical question key.
+_SECTION_CACHE = LRUCache(max_entries=int(os.getenv("SECTION_CACHE_MAX_ENTRIES", "512")))
+
+# Built indexes keyed by (contract_sha, embedder, chunk_size, overlap): later requests,
+# lazy agent sections, follow-up prefetch and pre-ingested uploads skip chunking/embedding.
+_INDEX_CACHE = LRUCache(max_entries=int(os.getenv("INDEX_CACHE_MAX_ENTRIES", "8")))
+
 
 def detect_intent(question: str) -> str:
     """Determine user intent from the question.
@@ -154,16 +195,54 @@ def _heading_for_fact_summary(question: str) -> str:
     return "Answer"
 
 
-def format_fact_summary_report(question: str, matches: List[RetrievalMatch]) -> str:
+def format_fact_summary_report(
+    question: str,
+    matches: List[RetrievalMatch],
+    *,
+    cache_key: Optional[Tuple[Any, ...]] = None,
+    rewrite: bool = True,
+) -> str:
     """Section A answer formatting (fact_summary/qa).
 
     Rules:
     - Include only clauses that answer the question
     - No risk/confidence language
     - Clean bullets, no paragraph dumps
+
+    With a `cache_key` (see `canonical_question_key`), the rendered answer, including
+    any LLM rewrite, is reused for paraphrases that retrieved the same evidence.
+    `rewrite=False` skips the optional LLM rewrite (see `degradation.py`).
     """
 
-    sa = build_sanitized_answer(question, matches)
+    report_key = None
+    if cache_key is not None:
+        report_key = cache_key + (
+            "report",
+            _probe_signature(matches),
+            os.getenv("QA_REWRITE_PROVIDER", "none").strip().lower() if rewrite else "none",
+            os.getenv("QA_REWRITE_URL"),
+            os.getenv("QA_REWRITE_MODEL"),
+        )
+        cached = _SECTION_CACHE.get(report_key)
+        if cached is not None:
+            return cached
+
+    report = _format_fact_summary_report(question, matches, cache_key=cache_key, rewrite=rewrite)
+    deadline = current_deadline()
+    # A deadline may have cut the rewrite short; only cache complete answers.
+    if report_key is not None and not (deadline is not None and deadline.truncated):
+        _SECTION_CACHE.put(report_key, report)
+    return report
+
+
+def _format_fact_summary_report(
+    question: str,
+    matches: List[RetrievalMatch],
+    *,
+    cache_key: Optional[Tuple[Any, ...]],
+    rewrite: bool = True,
+) -> str:
+    sa = _sanitized_answer_cached(question, matches, cache_key=cache_key)
     sections = sa.get("sections") or []
     if not sections:
         return "Answer\n• No relevant evidence found in the provided document for this question."
@@ -177,16 +256,22 @@ def format_fact_summary_report(question: str, matches: List[RetrievalMatch]) ->
         from qa_llm_rewriter import load_rewrite_config_from_env, rewrite_clause_to_bullet  # type: ignore
 
         cfg = load_rewrite_config_from_env()
-        if cfg.provider not in {"", "none", "off", "disabled"}:
+        deadline = current_deadline()
+        if rewrite and cfg.provider not in {"", "none", "off", "disabled"}:
             for sec in sections:
                 heading = (sec.get("heading") or "Answer").strip()
                 new_bullets: List[str] = []
                 for b in (sec.get("bullets") or []):
+                    # Out of budget: keep the remaining deterministic bullets.
+                    if deadline is not None and deadline.expired():
+                        deadline.mark_truncated()
+                        new_bullets.append(b)
+                        continue
                     rewritten = rewrite_clause_to_bullet(
                         question=question,
                         heading=heading,
                         clause_text=b,
-                        config=cfg,
+                        config=replace(cfg, timeout_s=deadline.clamp_timeout(cfg.timeout_s)) if deadline else cfg,
                     )
                     new_bullets.append(rewritten or b)
                 sec["bullets"] = new_bullets
@@ -242,6 +327,64 @@ def cosine_sim_matrix(query_vec: np.ndarray, doc_vecs: np.ndarray) -> np.ndarray
     return (d @ q) / (dn * qn)
 
 
+_EMBEDDING_MODELS: Dict[str, Tuple[Any, str]] = {}
+_EMBEDDING_MODELS_LOCK = threading.Lock()
+# One lock per loaded model: tokenizers/torch modules are not safe to call concurrently.
+_MODEL_LOCKS: Dict[int, threading.Lock] = {}
+
+
+def _model_lock(model: Any) -> threading.Lock:
+    with _EMBEDDING_MODELS_LOCK:
+        return _MODEL_LOCKS.setdefault(id(model), threading.Lock())
+
+
+def get_embedding_model(model_name: str) -> Tuple[Any, str]:
+    """Return (model, embedder_name), loading each model at most once per process.
+
+    `model` is None when the deterministic hashing embedder is in use.
+    """
+
+    with _EMBEDDING_MODELS_LOCK:
+        cached = _EMBEDDING_MODELS.get(model_name)
+        if cached is not None:
+            return cached
+
+        model, embedder_name = None, "hashing"
+        SentenceTransformer = _maybe_load_sentence_transformer()
+        if SentenceTransformer is not None:
+            try:
+                model = SentenceTransformer(model_name)
+                embedder_name = f"sentence-transformers:{model_name}"
+                apply_torch_threads()
+            except Exception:
+                # Any failure -> fallback.
+                model, embedder_name = None, "hashing"
+
+        _EMBEDDING_MODELS[model_name] = (model, embedder_name)
+        return model, embedder_name
+
+
+def _hash_embed(texts: List[str], *, dim: int, salt: str, normalize_embeddings: bool = True) -> np.ndarray:
+    """Deterministic hashing embedder (no torch)."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+
+    for row_idx, text in enumerate(texts):
+        tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
+        if not tokens:
+            continue
+
+        for tok in tokens:
+            h = hashlib.md5(f"{salt}:{tok}".encode("utf-8", errors="ignore")).digest()
+            idx = int.from_bytes(h[:2], "little") % dim
+            sign = 1.0 if (h[2] & 1) == 0 else -1.0
+            out[row_idx, idx] += sign
+
+    if normalize_embeddings:
+        norms = np.linalg.norm(out, axis=1, keepdims=True) + 1e-12
+        out = out / norms
+    return out
+
+
 @dataclass
 class RetrievalMatch:
     score: float
@@ -249,76 +392,128 @@ class RetrievalMatch:
     text: str
 
 
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """Immutable chunks + embeddings of one built index.
+
+    `vectors` and `norms` are read-only arrays, so any number of threads can score
+    against a snapshot without locking. Rebuilding an index swaps in a new snapshot.
+    """
+
+    chunks: Sequence[str]
+    vectors: np.ndarray
+    norms: np.ndarray
+
+    @classmethod
+    def create(cls, chunks: Sequence[str], vectors: np.ndarray) -> "IndexSnapshot":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.flags.writeable:
+            vectors = vectors.copy() if not vectors.flags.owndata else vectors
+            vectors.flags.writeable = False
+        norms = np.linalg.norm(vectors, axis=1) + 1e-12
+        norms.flags.writeable = False
+        return cls(chunks=chunks, vectors=vectors, norms=norms)
+
+    def score(self, query_vec: np.ndarray) -> np.ndarray:
+        """Cosine similarity of one query against every chunk (same as `cosine_sim_matrix`)."""
+        q = np.asarray(query_vec, dtype=np.float32)
+        return (self.vectors @ q) / (self.norms * (np.linalg.norm(q) + 1e-12))
+
+    def top_k(self, query_vec: np.ndarray, top_k: int) -> List[RetrievalMatch]:
+        sims = self.score(query_vec)
+        idxs = np.argsort(-sims)[: max(1, int(top_k))]
+        return [RetrievalMatch(score=float(sims[int(i)]), chunk_index=int(i), text=self.chunks[int(i)]) for i in idxs]
+
+
 class LocalRAGIndex:
     """Minimal local RAG index (in-memory).
 
     Prefers SentenceTransformers embeddings when available; falls back to a
     deterministic hashing embedder (no torch) when not.
+
+    Thread-safe and read-mostly: `build`/`load` publish a new `IndexSnapshot` with a
+    single reference swap, and queries read whichever snapshot is current, so concurrent
+    agents and requests can share one index. Calls into a (non-thread-safe) model are
+    serialized per model; the hashing embedder needs no lock.
     """
 
     def __init__(self, *, model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> None:
         self.model_name = model_name
-        self.model = None
-        self.embedder_name = "hashing"
+        self.model, self.embedder_name = get_embedding_model(model_name)
 
         self._hash_dim = 384
         self._hash_salt = "m3"
 
-        SentenceTransformer = _maybe_load_sentence_transformer()
-        if SentenceTransformer is not None:
-            try:
-                self.model = SentenceTransformer(model_name)
-                self.embedder_name = f"sentence-transformers:{model_name}"
-            except Exception:
-                # Any failure -> fallback.
-                self.model = None
-                self.embedder_name = "hashing"
-        self.chunks: List[str] = []
-        self.vectors: Optional[np.ndarray] = None
+        self._snapshot: Optional[IndexSnapshot] = None
+
+    @property
+    def snapshot(self) -> Optional[IndexSnapshot]:
+        return self._snapshot
+
+    @property
+    def chunks(self) -> Sequence[str]:
+        snap = self._snapshot
+        return snap.chunks if snap is not None else []
+
+    @property
+    def vectors(self) -> Optional[np.ndarray]:
+        snap = self._snapshot
+        return snap.vectors if snap is not None else None
 
     def _hash_embed(self, texts: List[str], *, normalize_embeddings: bool = True) -> np.ndarray:
-        dim = int(self._hash_dim)
-        out = np.zeros((len(texts), dim), dtype=np.float32)
+        return _hash_embed(texts, dim=int(self._hash_dim), salt=self._hash_salt, normalize_embeddings=normalize_embeddings)
 
-        for row_idx, text in enumerate(texts):
-            tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
-            if not tokens:
-                continue
+    def _encode_fn(self):
+        """Encoder that doesn't keep this index alive (shared by the embedding batcher)."""
+        model, dim, salt = self.model, int(self._hash_dim), self._hash_salt
+        if model is not None:
+            lock = _model_lock(model)
 
-            for tok in tokens:
-                h = hashlib.md5(f"{self._hash_salt}:{tok}".encode("utf-8", errors="ignore")).digest()
-                idx = int.from_bytes(h[:2], "little") % dim
-                sign = 1.0 if (h[2] & 1) == 0 else -1.0
-                out[row_idx, idx] += sign
+            def encode_model(texts: List[str], normalize: bool) -> np.ndarray:
+                with lock:
+                    return np.asarray(model.encode(texts, normalize_embeddings=normalize), dtype=np.float32)
 
-        if normalize_embeddings:
-            norms = np.linalg.norm(out, axis=1, keepdims=True) + 1e-12
-            out = out / norms
-        return out
+            return encode_model
+        return lambda texts, normalize: _hash_embed(texts, dim=dim, salt=salt, normalize_embeddings=normalize)
 
     def encode(self, texts: List[str], *, normalize_embeddings: bool = True) -> np.ndarray:
-        if self.model is not None:
-            vecs = self.model.encode(texts, normalize_embeddings=normalize_embeddings)
-            return np.asarray(vecs, dtype=np.float32)
-        return self._hash_embed(texts, normalize_embeddings=normalize_embeddings)
-
-    def build(self, contract_text: str) -> None:
-        self.chunks = chunk_text(contract_text)
-        if not self.chunks:
-            self.vectors = None
+        # Small encodes (queries) from concurrent requests are merged into one model call;
+        # large ones (index builds) are already a batch.
+        encode_fn = self._encode_fn()
+        batcher = get_batcher(self.embedder_name, encode_fn, uses_model=self.model is not None)
+        if batcher is not None and len(texts) < batcher.max_batch:
+            return batcher.encode(texts, normalize_embeddings=normalize_embeddings)
+        return encode_fn(texts, normalize_embeddings)
+
+    def encode_queries(self, texts: List[str]) -> np.ndarray:
+        """Normalized query embeddings; precomputed and recently seen strings skip the model."""
+        return query_embeddings.encode_queries(
+            self.embedder_name, texts, lambda missing: self.encode(missing, normalize_embeddings=True)
+        )
+
+    def load(self, chunks: Sequence[str], vectors: Optional[np.ndarray]) -> None:
+        """Publish prebuilt chunks/vectors (e.g. views on shared memory) as the current snapshot."""
+        if vectors is None or not len(chunks):
+            self._snapshot = None
             return
-        self.vectors = self.encode(self.chunks, normalize_embeddings=True)
+        self._snapshot = IndexSnapshot.create(chunks, vectors)
+
+    def build(self, contract_text: str, *, chunk_size: int = 900, overlap: int = 120) -> None:
+        chunks = tuple(chunk_text(contract_text, chunk_size=chunk_size, overlap=overlap))
+        self.load(chunks, self.encode(list(chunks), normalize_embeddings=True) if chunks else None)
 
     def query(self, query_text: str, *, top_k: int = 5) -> List[RetrievalMatch]:
-        if not (query_text or "").strip() or self.vectors is None or not self.chunks:
+        if not (query_text or "").strip() or self._snapshot is None:
             return []
-        qv = self.encode([query_text], normalize_embeddings=True)[0]
-        sims = cosine_sim_matrix(np.asarray(qv, dtype=np.float32), self.vectors)
-        idxs = np.argsort(-sims)[: max(1, int(top_k))]
-        out: List[RetrievalMatch] = []
-        for i in idxs:
-            out.append(RetrievalMatch(score=float(sims[int(i)]), chunk_index=int(i), text=self.chunks[int(i)]))
-        return out
+        qv = self.encode_queries([query_text])[0]
+        return self.query_vector(qv, top_k=top_k)
+
+    def query_vector(self, query_vec: np.ndarray, *, top_k: int = 5) -> List[RetrievalMatch]:
+        """Like `query`, for a question that was already embedded (e.g. batch-encoded)."""
+        snap = self._snapshot
+        if snap is None:
+            return []
+        return snap.top_k(query_vec, top_k)
 
 
 def infer_risk_from_text(text: str) -> str:
@@ -443,6 +638,33 @@ def _should_run_all_agents(question: str) -> bool:
     return any(m in q for m in broad_markers)
 
 
+def resolve_intent(question: str, intent_override: Optional[str]) -> str:
+    override = (intent_override or "").strip().lower()
+    allowed = {"fact_summary", "clause_extraction", "qa", "risk_analysis", "executive_review"}
+    return override if override in allowed else detect_intent(question)
+
+
+def plan_agents(question: str, intent: str, run_all_agents: bool) -> Optional[List[str]]:
+    """Agents for a risk/executive request (None for other intents)."""
+    if intent not in {"risk_analysis", "executive_review"}:
+        return None
+    if run_all_agents:
+        return ["legal", "compliance", "finance", "operations"]
+    return select_agents_for_question(question)
+
+
+def classify_request(question: str, intent_override: Optional[str] = None, run_all_agents: bool = False) -> Optional[str]:
+    """Priority lane for a request: `heavy` for multi-agent reports, else `interactive`.
+
+    None when lanes are disabled (`PRIORITY_LANES=0`).
+    """
+
+    if not lanes.lanes_enabled():
+        return None
+    agents = plan_agents(question, resolve_intent(question, intent_override), run_all_agents)
+    return lanes.HEAVY if agents is not None and len(agents) >= lanes.heavy_min_agents() else lanes.INTERACTIVE
+
+
 def select_agents_for_question(question: str) -> List[str]:
     """Pick only the agents relevant to the question.
 
@@ -608,19 +830,10 @@ def _clause_matches_topic(clause: str, topic: str) -> bool:
     return False
 
 
-def build_sanitized_answer(question: str, matches: List[RetrievalMatch]) -> Dict[str, Any]:
-    """Answer sanitization:
-    - Only clauses that directly answer the question
-    - Exclude unrelated sections even if in the same chunk
-    - Bullets are separate (no paragraph concatenation)
-    """
+def _answer_topics(question: str) -> List[str]:
+    """Topics that drive the sanitized answer (after single-topic narrowing)."""
 
-    q = (question or "").strip()
-    if not q or not matches:
-        return {"question": q, "sections": []}
-
-    topics = _requested_topics(q)
-    keywords = _question_keywords(q)
+    topics = _requested_topics(question)
 
     # Topic filter rule: if question is about privacy/data protection, restrict to privacy only.
     if "privacy" in topics:
@@ -634,6 +847,79 @@ def build_sanitized_answer(question: str, matches: List[RetrievalMatch]) -> Dict
     if "termination" in topics:
         topics = ["termination"]
 
+    return topics
+
+
+def canonical_question_key(
+    question: str,
+    *,
+    intent: Optional[str] = None,
+    selected_agents: Optional[List[str]] = None,
+) -> str:
+    """Routing-level identity of a question.
+
+    Built from the same signals the pipeline routes on (intent, answer topics, agents),
+    so "What are the payment terms?" and "Explain payment terms and due dates" share a key.
+    Questions without a known topic fall back to their heading and keyword set, which is
+    what the sanitized answer filters on in that case.
+    """
+
+    intent = intent or detect_intent(question)
+    topics = _answer_topics(question)
+    if topics:
+        focus = "topics=" + ",".join(sorted(set(topics)))
+    else:
+        kws = ",".join(sorted(set(_question_keywords(question))))
+        focus = f"heading={_heading_for_fact_summary(question)};kw={kws}"
+    if selected_agents is None:
+        selected_agents = select_agents_for_question(question)
+    agents = ",".join(sorted(set(selected_agents)))
+    return f"intent={intent};{focus};agents={agents}"
+
+
+def _probe_signature(matches: List[RetrievalMatch]) -> Tuple[int, ...]:
+    # build_sanitized_answer only reads the top-3 retrieved chunks.
+    return tuple(m.chunk_index for m in matches[:3])
+
+
+def _sanitized_answer_cached(
+    question: str,
+    matches: List[RetrievalMatch],
+    *,
+    cache_key: Optional[Tuple[Any, ...]] = None,
+) -> Dict[str, Any]:
+    if cache_key is None:
+        return build_sanitized_answer(question, matches)
+
+    key = cache_key + ("sanitized", _probe_signature(matches))
+    sa = _SECTION_CACHE.get(key)
+    if sa is None:
+        sa = build_sanitized_answer(question, matches)
+        _SECTION_CACHE.put(key, sa)
+
+    out = copy.deepcopy(sa)
+    out["question"] = (question or "").strip()
+    return out
+
+
+def section_cache_stats() -> Dict[str, Any]:
+    return _SECTION_CACHE.stats()
+
+
+def build_sanitized_answer(question: str, matches: List[RetrievalMatch]) -> Dict[str, Any]:
+    """Answer sanitization:
+    - Only clauses that directly answer the question
+    - Exclude unrelated sections even if in the same chunk
+    - Bullets are separate (no paragraph concatenation)
+    """
+
+    q = (question or "").strip()
+    if not q or not matches:
+        return {"question": q, "sections": []}
+
+    topics = _answer_topics(q)
+    keywords = _question_keywords(q)
+
     top_texts = [m.text for m in matches[:3] if (m.text or "").strip()]
     blob = "\n".join(top_texts)
     candidates: List[str] = []
@@ -686,7 +972,12 @@ def build_sanitized_answer(question: str, matches: List[RetrievalMatch]) -> Dict
     return {"question": q, "sections": sections}
 
 
-def build_question_answer(question: str, matches: List[RetrievalMatch]) -> Dict[str, Any]:
+def build_question_answer(
+    question: str,
+    matches: List[RetrievalMatch],
+    *,
+    cache_key: Optional[Tuple[Any, ...]] = None,
+) -> Dict[str, Any]:
     """Backwards compatible answer helper.
 
     Produces:
@@ -694,7 +985,7 @@ def build_question_answer(question: str, matches: List[RetrievalMatch]) -> Dict[
     - `answer`: human-readable string with headings + • bullets
     """
 
-    sa = build_sanitized_answer(question, matches)
+    sa = _sanitized_answer_cached(question, matches, cache_key=cache_key)
     sections = sa.get("sections") or []
     lines: List[str] = []
     for sec in sections:
@@ -725,41 +1016,34 @@ def _evidence_snippets(matches: List[RetrievalMatch], *, max_items: int = 5) ->
     return out
 
 
+# Extra queries per agent after the user's question; "{question}" is filled in per request,
+# the rest are fixed strings (embedded once, see `static_queries`).
+AGENT_QUERY_TEMPLATES: Dict[str, List[str]] = {
+    "legal": ["termination breach {question}", "indemnification liability {question}", "confidentiality NDA"],
+    "compliance": ["privacy data protection {question}", "audit reporting", "security incident breach notification"],
+    "finance": [
+        "payment terms fees invoices billing",
+        "late fees interest penalties",
+        "limitation of liability indemnification",
+    ],
+    "operations": ["deliverables milestones timelines", "SLA uptime service credits", "performance standards support"],
+}
+
+
 def _agent_plan(agent_type: str, user_question: str) -> List[str]:
     base = (user_question or "").strip()
     if not base:
         return []
+    return [base] + [t.replace("{question}", base) for t in AGENT_QUERY_TEMPLATES.get(agent_type, [])]
 
-    if agent_type == "legal":
-        return [
-            base,
-            f"termination breach {base}",
-            f"indemnification liability {base}",
-            "confidentiality NDA",
-        ]
-    if agent_type == "compliance":
-        return [
-            base,
-            f"privacy data protection {base}",
-            "audit reporting",
-            "security incident breach notification",
-        ]
-    if agent_type == "finance":
-        return [
-            base,
-            "payment terms fees invoices billing",
-            "late fees interest penalties",
-            "limitation of liability indemnification",
-        ]
-    if agent_type == "operations":
-        return [
-            base,
-            "deliverables milestones timelines",
-            "SLA uptime service credits",
-            "performance standards support",
-        ]
 
-    return [base]
+def agent_queries(agent_type: str, question: str, max_queries: Optional[int] = None) -> List[str]:
+    """The queries `run_agent` issues, in order."""
+    queries = _agent_plan(agent_type, question)
+    if max_queries is not None:
+        # Primary query (the user's question) first; the rest broaden recall.
+        queries = queries[: max(1, max_queries)]
+    return queries
 
 
 def run_agent(
@@ -768,13 +1052,27 @@ def run_agent(
     question: str,
     rag: LocalRAGIndex,
     top_k_per_query: int = 5,
+    max_queries: Optional[int] = None,
+    evidence_items: int = 5,
+    retrieved: Optional[query_planner.PlanResults] = None,
 ) -> Dict[str, Any]:
-    queries = _agent_plan(agent_type, question)
+    queries = agent_queries(agent_type, question, max_queries)
     per_query: List[Dict[str, Any]] = []
     all_matches: List[RetrievalMatch] = []
+    deadline = current_deadline()
+    truncated = False
 
     for q in queries:
-        ms = rag.query(q, top_k=top_k_per_query)
+        # Cooperative stop: the request ran out of time or the client went away.
+        if deadline is not None and deadline.expired():
+            deadline.mark_truncated()
+            truncated = True
+            break
+        ms = retrieved.get(q, top_k_per_query) if retrieved is not None else None
+        if ms is None:
+            # Only a real search is worth pausing for; planned results are a lookup.
+            lanes.yield_to_interactive()
+            ms = rag.query(q, top_k=top_k_per_query)
         per_query.append(
             {
                 "query": q,
@@ -815,7 +1113,7 @@ def run_agent(
             "Confirm support and escalation requirements.",
         ]
 
-    return {
+    result = {
         "agent_type": agent_type,
         "question": question,
         "timestamp": utc_now_iso(),
@@ -825,9 +1123,12 @@ def run_agent(
             "top_k_per_query": top_k_per_query,
             "per_query": per_query,
         },
-        "evidence": _evidence_snippets(all_matches, max_items=5),
+        "evidence": _evidence_snippets(all_matches, max_items=evidence_items),
         "findings": findings,
     }
+    if truncated:
+        result["truncated"] = True
+    return result
 
 
 def overall_risk(per_agent: Dict[str, str]) -> str:
@@ -927,8 +1228,19 @@ def _clause_matches_compliance(clause: str) -> bool:
     )
 
 
-def _extract_topic_statements(rag: LocalRAGIndex, *, query: str, topic: str, max_items: int = 5) -> List[str]:
-    matches = rag.query(query, top_k=6)
+def _extract_topic_statements(
+    rag: LocalRAGIndex,
+    *,
+    query: str,
+    topic: str,
+    max_items: int = 5,
+    top_k: int = 6,
+    retrieved: Optional[query_planner.PlanResults] = None,
+) -> List[str]:
+    matches = retrieved.get(query, top_k) if retrieved is not None else None
+    if matches is None:
+        lanes.yield_to_interactive()
+        matches = rag.query(query, top_k=top_k)
     out: List[str] = []
     seen: set[str] = set()
 
@@ -1158,19 +1470,38 @@ def _compliance_risk(compliance: List[str]) -> Tuple[str, List[str], List[Tuple[
     return risk, points, evidence
 
 
-def build_executive_report_data(
-    *,
-    contract_text: str,
-    rag: LocalRAGIndex,
-    question: Optional[str] = None,
-    selected_agents: Optional[List[str]] = None,
-) -> Dict[str, Any]:
-    """Build contract-specific executive risk analysis backed by explicit clause evidence.
+# (agent section, topic, query, max statements) for the executive report, in report order.
+EXECUTIVE_TOPIC_QUERIES: List[Tuple[str, str, str, int]] = [
+    ("finance", "payment", "payment terms invoice due within days undisputed amounts", 3),
+    ("finance", "late", "late fees interest overdue per month penalty", 3),
+    ("legal", "termination", "termination terminate material breach cure notice", 3),
+    ("legal", "liability", "limitation of liability liability cap capped uncapped", 2),
+    ("operations", "availability", "service availability availability uptime % of the time scheduled maintenance", 2),
+    ("operations", "sla", "SLA uptime service credits service level", 2),
+    ("compliance", "compliance", "privacy data protection security breach notification incident retention subprocessor audit", 3),
+]
+
+
+def static_queries() -> List[str]:
+    """Retrieval queries that don't depend on the request: embedded once per embedder."""
+    fixed = [t for templates in AGENT_QUERY_TEMPLATES.values() for t in templates if "{question}" not in t]
+    return sorted(set(fixed + [query for _, _, query, _ in EXECUTIVE_TOPIC_QUERIES]))
 
-    If a question is specific (e.g., about payment terms), only the relevant agent sections
-    are generated to avoid unrelated content in the executive report.
-    """
 
+def warm_query_embeddings(model_name: Optional[str] = None) -> Dict[str, Any]:
+    """Load (or compute and persist) the static query embeddings for the default embedder."""
+
+    if not query_embeddings.cache_enabled():
+        return {"static": 0, "encoded": 0}
+    model_name = model_name or os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    rag = LocalRAGIndex(model_name=model_name)
+    out = query_embeddings.warm(
+        rag.embedder_name, static_queries(), lambda texts: rag.encode(texts, normalize_embeddings=True)
+    )
+    return {"embedder": rag.embedder_name, **out}
+
+
+def _executive_agent_set(question: Optional[str], selected_agents: Optional[List[str]]) -> set[str]:
     all_agents = ["legal", "compliance", "finance", "operations"]
     if selected_agents is None:
         selected_agents = select_agents_for_question(question) if (question or "").strip() else all_agents
@@ -1179,67 +1510,42 @@ def build_executive_report_data(
     # If something goes wrong with selection, default to all.
     if not selected_set:
         selected_set = set(all_agents)
+    return selected_set
 
-    def _skipped_section() -> Tuple[str, List[str], List[Tuple[str, str]]]:
-        return "n/a", ["Skipped (not relevant to the question)."], []
 
-    payment_terms: List[str] = []
-    late_fees: List[str] = []
-    termination: List[str] = []
-    liability: List[str] = []
-    availability: List[str] = []
-    sla: List[str] = []
-    compliance: List[str] = []
+def build_executive_report_data(
+    *,
+    rag: LocalRAGIndex,
+    question: Optional[str] = None,
+    selected_agents: Optional[List[str]] = None,
+    topic_top_k: int = 6,
+    retrieved: Optional[query_planner.PlanResults] = None,
+) -> Dict[str, Any]:
+    """Build contract-specific executive risk analysis backed by explicit clause evidence.
 
-    if "finance" in selected_set:
-        payment_terms = _extract_topic_statements(
-            rag,
-            query="payment terms invoice due within days undisputed amounts",
-            topic="payment",
-            max_items=3,
-        )
-        late_fees = _extract_topic_statements(
-            rag,
-            query="late fees interest overdue per month penalty",
-            topic="late",
-            max_items=3,
-        )
+    If a question is specific (e.g., about payment terms), only the relevant agent sections
+    are generated to avoid unrelated content in the executive report.
+    `topic_top_k` is how many chunks each topic query retrieves; `retrieved` holds
+    matches already fetched by a request-wide query plan.
+    """
 
-    if "legal" in selected_set:
-        termination = _extract_topic_statements(
-            rag,
-            query="termination terminate material breach cure notice",
-            topic="termination",
-            max_items=3,
-        )
-        liability = _extract_topic_statements(
-            rag,
-            query="limitation of liability liability cap capped uncapped",
-            topic="liability",
-            max_items=2,
-        )
+    selected_set = _executive_agent_set(question, selected_agents)
 
-    if "operations" in selected_set:
-        availability = _extract_topic_statements(
-            rag,
-            query="service availability availability uptime % of the time scheduled maintenance",
-            topic="availability",
-            max_items=2,
-        )
-        sla = _extract_topic_statements(
-            rag,
-            query="SLA uptime service credits service level",
-            topic="sla",
-            max_items=2,
-        )
+    def _skipped_section() -> Tuple[str, List[str], List[Tuple[str, str]]]:
+        return "n/a", ["Skipped (not relevant to the question)."], []
 
-    if "compliance" in selected_set:
-        compliance = _extract_topic_statements(
-            rag,
-            query="privacy data protection security breach notification incident retention subprocessor audit",
-            topic="compliance",
-            max_items=3,
+    topics: Dict[str, List[str]] = {}
+    for agent, topic, query, max_items in EXECUTIVE_TOPIC_QUERIES:
+        if agent not in selected_set:
+            topics[topic] = []
+            continue
+        topics[topic] = _extract_topic_statements(
+            rag, top_k=topic_top_k, query=query, topic=topic, max_items=max_items, retrieved=retrieved
         )
+    payment_terms, late_fees = topics["payment"], topics["late"]
+    termination, liability = topics["termination"], topics["liability"]
+    availability, sla = topics["availability"], topics["sla"]
+    compliance = topics["compliance"]
 
     if "finance" in selected_set:
         finance_risk, finance_points, finance_ev = _finance_risk(payment_terms, late_fees)
@@ -1336,6 +1642,161 @@ def build_executive_report_data(
     return analysis
 
 
+def plan_retrieval(
+    *,
+    question: str,
+    question_vec: Optional[np.ndarray],
+    agents: Sequence[str],
+    agent_top_k: int,
+    max_agent_queries: Optional[int],
+    executive_agents: Optional[set[str]] = None,
+    topic_top_k: int = 6,
+) -> query_planner.QueryPlan:
+    """Every query the agents (and, if `executive_agents` is given, the executive
+    sections) of one request will issue, merged into a single plan."""
+
+    plan = query_planner.QueryPlan()
+    base = (question or "").strip()
+    for agent_type in agents:
+        for q in agent_queries(agent_type, question, max_agent_queries):
+            plan.add(q, agent_top_k, agent_type, vector=question_vec if q == base else None)
+    for agent, topic, query, _ in EXECUTIVE_TOPIC_QUERIES:
+        if executive_agents is not None and agent in executive_agents:
+            plan.add(query, topic_top_k, f"executive.{topic}")
+    return plan
+
+
+def _execute_plan(plan: query_planner.QueryPlan, rag: LocalRAGIndex) -> query_planner.PlanResults:
+    # The stage's one heavy-lane checkpoint: every search it replaces would have paused.
+    lanes.yield_to_interactive()
+    return plan.execute(rag)
+
+
+def _executive_report_cached(
+    *,
+    contract_sha: str,
+    rag: LocalRAGIndex,
+    question: str,
+    selected_agents: List[str],
+    profile: profiles.AnalysisProfile,
+    retrieved: Optional[query_planner.PlanResults] = None,
+) -> Dict[str, Any]:
+    """`build_executive_report_data` memoized per contract, agent set and profile.
+
+    The executive sections only depend on which agents run, not on the question wording.
+    """
+
+    key = _executive_cache_key(contract_sha, rag, selected_agents, profile)
+    analysis = _SECTION_CACHE.get(key)
+    if analysis is None:
+        analysis = build_executive_report_data(
+            rag=rag,
+            question=question,
+            selected_agents=selected_agents,
+            topic_top_k=profile.topic_top_k,
+            retrieved=retrieved,
+        )
+        _SECTION_CACHE.put(key, analysis)
+    return copy.deepcopy(analysis)
+
+
+def _executive_cache_key(
+    contract_sha: str,
+    rag: LocalRAGIndex,
+    selected_agents: List[str],
+    profile: profiles.AnalysisProfile,
+) -> Tuple[Any, ...]:
+    return (
+        PIPELINE_VERSION,
+        contract_sha,
+        rag.embedder_name,
+        "executive",
+        tuple(sorted(set(selected_agents))),
+        profile.name,
+    )
+
+
+async def _executive_report_async(
+    *,
+    contract_sha: str,
+    rag: LocalRAGIndex,
+    question: str,
+    selected_agents: List[str],
+    profile: profiles.AnalysisProfile,
+    retrieved: Optional[query_planner.PlanResults] = None,
+) -> Dict[str, Any]:
+    """`_executive_report_cached` off the event loop, in the configured agent executor."""
+
+    if not agent_executor.process_mode():
+        return await lanes.to_thread(
+            _executive_report_cached,
+            contract_sha=contract_sha,
+            rag=rag,
+            question=question,
+            selected_agents=selected_agents,
+            profile=profile,
+            retrieved=retrieved,
+        )
+
+    key = _executive_cache_key(contract_sha, rag, selected_agents, profile)
+    analysis = _SECTION_CACHE.get(key)
+    if analysis is None:
+        analysis = await agent_executor.build_executive_in_process(
+            rag,
+            question=question,
+            selected_agents=selected_agents,
+            topic_top_k=profile.topic_top_k,
+            retrieved=retrieved,
+        )
+        _SECTION_CACHE.put(key, analysis)
+    return copy.deepcopy(analysis)
+
+
+def _unknown_executive_analysis(message: str) -> Dict[str, Any]:
+    return {
+        "legal": {"risk_level": "unknown", "findings": [], "evidence": []},
+        "compliance": {"risk_level": "unknown", "findings": [], "evidence": []},
+        "finance": {"risk_level": "unknown", "findings": [], "evidence": []},
+        "operations": {"risk_level": "unknown", "findings": [], "evidence": []},
+        "overall_risk": "unknown",
+        "executive_summary_points": [message],
+        "key_evidence": [],
+    }
+
+
+def replay_question_log(questions: List[str], *, intent_override: Optional[str] = None) -> Dict[str, Any]:
+    """Cache hit-rate statistics for a replayed question log (single contract).
+
+    Compares the exact-match key (normalized text) with the canonical routing key;
+    a question is a hit when an earlier question in the log had the same key.
+    """
+
+    seen_exact: set[str] = set()
+    seen_canonical: set[str] = set()
+    exact_hits = 0
+    canonical_hits = 0
+    total = 0
+    for q in questions:
+        if not (q or "").strip():
+            continue
+        total += 1
+        intent = (intent_override or "").strip().lower() or detect_intent(q)
+        exact = normalize_question(q)
+        canonical = canonical_question_key(q, intent=intent)
+        exact_hits += exact in seen_exact
+        canonical_hits += canonical in seen_canonical
+        seen_exact.add(exact)
+        seen_canonical.add(canonical)
+
+    return {
+        "questions": total,
+        "unique_exact": len(seen_exact),
+        "unique_canonical": len(seen_canonical),
+        "exact_hit_rate": (exact_hits / total) if total else None,
+        "canonical_hit_rate": (canonical_hits / total) if total else None,
+    }
+
+
 def _sanitize_evidence_text(text: str) -> Optional[str]:
     """Evidence sanitization.
 
@@ -1424,49 +1885,131 @@ def format_report(final_json: Dict[str, Any], *, tone: str = "executive") -> str
     return "\n".join(lines).strip()
 
 
-def _memory_path(contract_id: str) -> Path:
-    return MEMORY_DIR / f"{contract_id}.json"
+def _load_memory(contract_id: str, *, limit: int = 50) -> List[Dict[str, Any]]:
+    """Latest memory records for a contract (newest first), from the append-only store."""
+    try:
+        return memory_store.latest_records(contract_id, limit=limit)
+    except Exception:
+        return []
 
 
-def _load_memory(contract_id: str) -> List[Dict[str, Any]]:
-    p = _memory_path(contract_id)
-    if not p.exists():
-        return []
+def _append_memory(
+    contract_id: str,
+    *,
+    question: str,
+    question_embedding: Optional[np.ndarray],
+    embedder: str,
+    final_json: Dict[str, Any],
+    report: str,
+    tone: str,
+    contract_sha: str,
+) -> None:
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        memory_store.append_record(
+            contract_id=contract_id,
+            contract_sha=contract_sha,
+            pipeline_version=PIPELINE_VERSION,
+            question=question,
+            final_json=final_json,
+            report=report,
+            intent=final_json.get("intent"),
+            tone=tone,
+            embedder=embedder,
+            embedding=question_embedding,
+        )
     except Exception:
-        return []
+        # Memory is best-effort; never fail an analysis because of it.
+        pass
+
 
+def _top_sim(vec: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Cosine similarity of `vec` against every row of a stacked (n, dim) matrix."""
+    if vec is None or others is None or others.size == 0:
+        return np.zeros((0,), dtype=np.float32)
+    return cosine_sim_matrix(np.asarray(vec, dtype=np.float32), others)
 
-def _save_memory(contract_id: str, records: List[Dict[str, Any]]) -> None:
-    p = _memory_path(contract_id)
-    p.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
 
+def _memory_recall_threshold() -> float:
+    """Minimum question similarity for a memory hit. Set above 1 to disable recall."""
+    try:
+        return float(os.getenv("MEMORY_RECALL_THRESHOLD", "0.92"))
+    except ValueError:
+        return 0.92
 
-def _vec_to_list(v: np.ndarray) -> List[float]:
-    return [float(x) for x in v.tolist()]
 
+def _recall_from_memory(
+    *,
+    contract_id: str,
+    contract_sha: str,
+    question_vec: np.ndarray,
+    embedder: str,
+    intent: str,
+    tone: str,
+    selected_agents: Optional[List[str]],
+    profile: str = profiles.DEFAULT_PROFILE,
+    no_evidence_threshold: float = 0.25,
+) -> Optional[Tuple[Dict[str, Any], str]]:
+    """Return a stored (final_json, report) for the nearest prior question, if close enough.
 
-def _list_to_vec(v: Any) -> Optional[np.ndarray]:
-    if not isinstance(v, list) or not v:
+    Only records from the same contract body, pipeline version, embedder, intent,
+    tone, agent set, profile and no-evidence threshold are eligible.
+    """
+
+    threshold = _memory_recall_threshold()
+    if threshold > 1.0:
         return None
+
+    window = int(os.getenv("MEMORY_RECALL_WINDOW", "200"))
     try:
-        return np.asarray(v, dtype=np.float32)
+        records = memory_store.latest_records(contract_id, limit=window, include_payload=False)
     except Exception:
         return None
 
-
-def _top_sim(vec: np.ndarray, others: List[np.ndarray]) -> Optional[float]:
-    if vec is None or not others:
+    tone_n = (tone or "executive").strip().lower()
+    dim = int(question_vec.shape[-1])
+    candidates = [
+        r
+        for r in records
+        if r.get("contract_sha") == contract_sha
+        and r.get("pipeline_version") == PIPELINE_VERSION
+        and r.get("embedder") == embedder
+        and r.get("intent") == intent
+        and (r.get("tone") or "").strip().lower() == tone_n
+        and r.get("question_embedding") is not None
+        and r["question_embedding"].shape[0] == dim
+    ]
+    if not candidates:
         return None
-    v = vec / (np.linalg.norm(vec) + 1e-12)
-    sims = []
-    for o in others:
-        if getattr(o, "shape", None) != getattr(vec, "shape", None):
+
+    sims = _top_sim(question_vec, np.stack([r["question_embedding"] for r in candidates]))
+    wanted_agents = sorted(selected_agents) if selected_agents is not None else None
+
+    for i in np.argsort(-sims):
+        score = float(sims[int(i)])
+        if score < threshold:
+            break
+        rec = memory_store.get_record(candidates[int(i)]["id"])
+        if not rec or not rec.get("report"):
+            continue
+        final_json = rec.get("final_json") or {}
+        stored_agents = (final_json.get("agent_analysis") or {}).get("selected_agents")
+        if (sorted(stored_agents) if stored_agents is not None else None) != wanted_agents:
+            continue
+        # Records from before profiles existed were produced by the default one.
+        if (final_json.get("profile") or profiles.DEFAULT_PROFILE) != profile:
             continue
-        on = o / (np.linalg.norm(o) + 1e-12)
-        sims.append(float(np.dot(v, on)))
-    return max(sims) if sims else None
+        # The threshold decides whether an answer is grounded at all; records stored
+        # without it can't be matched safely.
+        stored_threshold = final_json.pop("no_evidence_threshold", None)
+        if stored_threshold is None or round(float(stored_threshold), 6) != round(float(no_evidence_threshold), 6):
+            continue
+
+        final_json["cache"] = "semantic"
+        final_json["cache_similarity"] = score
+        final_json["recalled_question"] = rec.get("question")
+        return final_json, rec["report"]
+
+    return None
 
 
 async def run_full_pipeline(
@@ -1479,67 +2022,353 @@ async def run_full_pipeline(
     no_evidence_threshold: float = 0.25,
     intent_override: Optional[str] = None,
     run_all_agents: bool = False,
+    index: Optional[LocalRAGIndex] = None,
+    question_vec: Optional[np.ndarray] = None,
+    on_stage: Optional[StageCallback] = None,
+    deadline: Optional[Deadline] = None,
+    profile: Optional[str] = None,
+    lazy_agents: bool = False,
 ) -> Tuple[Dict[str, Any], str]:
     """End-to-end pipeline.
 
-    1) RAG retrieval (local embeddings)
-    2) Parallel agents (async)
-    3) Memory lookup/refinement (local disk)
+    `index` (already built for `contract_text`) and `question_vec` let batch callers
+    share one index and one batched question encode across many questions.
+    `on_stage(stage, payload)` is called on the event loop as intermediate results
+    become available (see `stream_full_pipeline`); cached and coalesced results
+    produce no stage events.
+    `deadline` (default: the current request's, see `deadlines.use_deadline`) bounds every
+    stage; work cut short yields a partial result with `truncated: true`, which is never
+    cached. Cancelling the call cancels the deadline so worker threads stop early.
+    The current `degradation.use_level` level may skip optional work; such results carry
+    a `degradation` block and are not cached either.
+    `profile` names an analysis profile (see `profiles.py`; default `ANALYSIS_PROFILE`).
+    It sets retrieval depth and chunking; a prebuilt `index` keeps its own chunking.
+    With `lazy_agents`, report intents skip the agents: `agent_analysis` only names them
+    and carries an `analysis_id` for `lazy_agent_section`, which computes each on demand.
+
+    0) Exact-match result cache (request fingerprint; no index work on a hit),
+       then single-flight: identical in-flight requests await the first one
+    1) Memory recall (nearest prior question for this contract)
+    2) RAG retrieval (local embeddings)
+    3) Parallel agents (async)
     4) Final JSON
-    5) Report formatting
+    5) Report formatting + memory append
     """
     if not (contract_text or "").strip():
         raise ValueError("Empty contract_text")
     if not (question or "").strip():
         raise ValueError("Empty question")
+    analysis_profile = profiles.get_profile(profile)
 
     contract_id = contract_id or stable_contract_id(contract_text)
+    if index is not None:
+        model_name = index.model_name
+    model_name = model_name or os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    _, embedder = get_embedding_model(model_name)
+
+    fingerprint = analysis_fingerprint(
+        contract_text=contract_text,
+        contract_id=contract_id,
+        question=question,
+        tone=tone,
+        intent_override=intent_override,
+        run_all_agents=run_all_agents,
+        no_evidence_threshold=no_evidence_threshold,
+        embedder=embedder,
+        pipeline_version=PIPELINE_VERSION,
+        profile=analysis_profile.name,
+        lazy_agents=lazy_agents,
+    )
+    cache = get_result_cache(PIPELINE_VERSION)
+    if cache is not None:
+        # Only the LRU tier is checked on the loop; SQLite runs in a worker thread.
+        hit = cache.peek(fingerprint)
+        if hit is None:
+            hit = await lanes.to_thread(cache.load, fingerprint)
+        if hit is not None:
+            final_json, report = hit
+            final_json["question"] = question
+            final_json["cache"] = "exact"
+            return final_json, report
+
+    deadline = deadline or current_deadline() or Deadline()
+
+    def run() -> Any:
+        return _run_pipeline(
+            contract_text=contract_text,
+            question=question,
+            tone=tone,
+            contract_id=contract_id,
+            model_name=model_name,
+            no_evidence_threshold=no_evidence_threshold,
+            intent_override=intent_override,
+            run_all_agents=run_all_agents,
+            index=index,
+            question_vec=question_vec,
+            on_stage=on_stage,
+            profile=analysis_profile,
+            lazy_agents=lazy_agents,
+        )
 
-    override = (intent_override or "").strip().lower()
-    allowed = {"fact_summary", "clause_extraction", "qa", "risk_analysis", "executive_review"}
-    intent = override if override in allowed else detect_intent(question)
+    lane = lanes.current_lane() or classify_request(question, intent_override, run_all_agents)
+    level = degradation.current_level()
+    try:
+        with use_deadline(deadline), lanes.use_lane(lane), lanes.track_request(lane):
+            if deadline.bounded:
+                # A budgeted run may be cut short; don't hand its result to other callers.
+                (final_json, report), shared = await run(), False
+            else:
+                (final_json, report), shared = await _SINGLE_FLIGHT.do(fingerprint, lambda: _shared_run(run))
+    except asyncio.CancelledError:
+        # Client went away: let agent/rewrite threads stop at their next check.
+        deadline.cancel()
+        raise
+
+    if shared:
+        final_json = copy.deepcopy(final_json)
+        final_json["question"] = question
+        final_json["cache"] = "coalesced"
+        return final_json, report
 
-    selected_agents_for_exec: Optional[List[str]] = None
-    if intent in {"risk_analysis", "executive_review"}:
-        if run_all_agents:
-            selected_agents_for_exec = ["legal", "compliance", "finance", "operations"]
-        else:
-            selected_agents_for_exec = select_agents_for_question(question)
+    if level.level and final_json.get("cache") is None:
+        final_json["degradation"] = level.describe()
 
-    model_name = model_name or os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
-    rag = LocalRAGIndex(model_name=model_name)
-    rag.build(contract_text)
+    # Memory-recalled results are already served from the memory store; degraded ones
+    # are for this moment's load only.
+    if cache is not None and final_json.get("cache") is None and not final_json.get("truncated") and not level.level:
+        cache.remember(fingerprint, final_json, report)
+        with lanes.use_lane(lane):
+            await lanes.to_thread(cache.persist, fingerprint, final_json, report)
+
+    return final_json, report
+
+
+async def _shared_run(run: Callable[[], Any], shared_deadline: Optional[Deadline] = None) -> Any:
+    # Coalesced work outlives any one caller, so it gets its own deadline instead of the
+    # leader's (whose client may disconnect); it is cancelled only when every caller has gone.
+    shared_deadline = shared_deadline or Deadline()
+    with use_deadline(shared_deadline):
+        try:
+            return await run()
+        except asyncio.CancelledError:
+            shared_deadline.cancel()
+            raise
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    return _SINGLE_FLIGHT.stats()
+
+
+async def stream_full_pipeline(**kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+    """`run_full_pipeline` as a stream of stage events.
+
+    Yields `{"event": stage, "elapsed_ms": ..., **payload}` for `plan`, `probe`,
+    `executive` and each `agent` as they complete, then one `final` event with
+    `analysis`, `report` and `cache`. Errors from the pipeline are raised.
+    """
+
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    t0 = time.perf_counter()
+
+    def _elapsed_ms() -> float:
+        return round((time.perf_counter() - t0) * 1000.0, 2)
+
+    def on_stage(stage: str, payload: Dict[str, Any]) -> None:
+        queue.put_nowait({"event": stage, "elapsed_ms": _elapsed_ms(), **payload})
+
+    task = asyncio.create_task(run_full_pipeline(on_stage=on_stage, **kwargs))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+
+        final_json, report = task.result()
+        yield {
+            "event": "final",
+            "elapsed_ms": _elapsed_ms(),
+            "cache": final_json.get("cache"),
+            "truncated": bool(final_json.get("truncated")),
+            "analysis": final_json,
+            "report": report,
+        }
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _run_pipeline(
+    *,
+    contract_text: str,
+    question: str,
+    tone: str,
+    contract_id: str,
+    model_name: str,
+    no_evidence_threshold: float,
+    intent_override: Optional[str],
+    run_all_agents: bool,
+    index: Optional[LocalRAGIndex] = None,
+    question_vec: Optional[np.ndarray] = None,
+    on_stage: Optional[StageCallback] = None,
+    profile: Optional[profiles.AnalysisProfile] = None,
+    lazy_agents: bool = False,
+) -> Tuple[Dict[str, Any], str]:
+    def emit(stage: str, payload: Dict[str, Any]) -> None:
+        if on_stage is not None:
+            on_stage(stage, payload)
+
+    deadline = current_deadline() or Deadline()
+    level = degradation.current_level()
+    profile = profile or profiles.get_profile()
+    effective = profile.degraded(level)
+
+    contract_sha = hashlib.sha256((contract_text or "").encode("utf-8", errors="ignore")).hexdigest()
+
+    intent = resolve_intent(question, intent_override)
+    selected_agents_for_exec = plan_agents(question, intent, run_all_agents)
+
+    rag = index
+    index_key = (contract_sha, get_embedding_model(model_name)[1], profile.chunk_size, profile.chunk_overlap)
+    if rag is None:
+        # Warm when the contract was pre-ingested (`/ingest`) or recently analysed.
+        rag = _INDEX_CACHE.get(index_key)
+    index_warm = rag is not None
+    rag = rag or LocalRAGIndex(model_name=model_name)
+    if question_vec is not None:
+        q_vec_np = np.asarray(question_vec, dtype=np.float32)
+    else:
+        # Off the loop: with embedding batching this waits for the batch window.
+        q_vec_np = (await lanes.to_thread(rag.encode_queries, [question]))[0]
+
+    # Recalled results carry every agent section inline, which lazy callers didn't ask for.
+    # The similarity scan and record reads are SQLite + numpy: off the loop.
+    recalled = None if lazy_agents else await lanes.to_thread(
+        _recall_from_memory,
+        contract_id=contract_id,
+        contract_sha=contract_sha,
+        question_vec=q_vec_np,
+        embedder=rag.embedder_name,
+        intent=intent,
+        tone=tone,
+        selected_agents=selected_agents_for_exec,
+        profile=profile.name,
+        no_evidence_threshold=no_evidence_threshold,
+    )
+    if recalled is not None:
+        final_json, report = recalled
+        final_json["question"] = question  # as asked; `recalled_question` keeps the stored one
+        return final_json, report
+
+    async def _remember(final_json: Dict[str, Any], report: str) -> None:
+        if deadline.truncated:
+            # Partial results are returned but never recalled later.
+            final_json["truncated"] = True
+            return
+        if level.level:
+            # Neither are degraded ones: later requests under normal load get the full answer.
+            return
+        if lazy_agents:
+            # Nor ones whose agent sections are still to be computed.
+            return
+        await lanes.to_thread(
+            _append_memory,
+            contract_id,
+            question=question,
+            question_embedding=q_vec_np,
+            embedder=rag.embedder_name,
+            # Stored for recall matching only; not part of the response.
+            final_json={**final_json, "no_evidence_threshold": round(float(no_evidence_threshold), 6)},
+            report=report,
+            tone=tone,
+            contract_sha=contract_sha,
+        )
+
+    emit("plan", {"intent": intent, "selected_agents": selected_agents_for_exec})
+
+    if not index_warm:
+        await lanes.to_thread(rag.build, contract_text, chunk_size=profile.chunk_size, overlap=profile.chunk_overlap)
+        _INDEX_CACHE.put(index_key, rag)
+
+    # Paraphrases with the same routing share sanitized answers / executive sections.
+    section_key = (
+        PIPELINE_VERSION,
+        contract_sha,
+        rag.embedder_name,
+        canonical_question_key(question, intent=intent, selected_agents=selected_agents_for_exec),
+        profile.name,
+    )
 
     # Evidence probe for safe grounding.
-    probe = rag.query(question, top_k=3)
+    probe = rag.query_vector(q_vec_np, top_k=3)
     best_score = max([m.score for m in probe], default=None)
+    emit("probe", {
+        "evidence": [{"text": m.text, "score": m.score} for m in probe],
+        "evidence_score": best_score,
+    })
+
+    retrieved: Optional[query_planner.PlanResults] = None
+    if intent not in {"fact_summary", "qa", "clause_extraction"} and query_planner.planner_enabled():
+        # One pass over the index for every agent and executive-topic query of this request.
+        planned_agents = selected_agents_for_exec or select_agents_for_question(question)
+        exec_cached = _executive_cache_key(contract_sha, rag, planned_agents, profile) in _SECTION_CACHE
+        plan = plan_retrieval(
+            question=question,
+            question_vec=q_vec_np,
+            agents=[] if lazy_agents else planned_agents,
+            agent_top_k=effective.agent_top_k,
+            max_agent_queries=effective.agent_queries,
+            executive_agents=None if exec_cached else _executive_agent_set(question, planned_agents),
+            topic_top_k=profile.topic_top_k,
+        )
+        retrieved = await lanes.to_thread(_execute_plan, plan, rag)
 
     # For risk_analysis/executive_review, use clause-extraction evidence as the gate.
     # This avoids false negatives when the user's phrasing ("risk analysis") doesn't
     # appear in the contract text but relevant clauses do.
     executive_analysis: Optional[Dict[str, Any]] = None
     if intent in {"risk_analysis", "executive_review"}:
-        executive_analysis = build_executive_report_data(
-            contract_text=contract_text,
-            rag=rag,
-            question=question,
-            selected_agents=selected_agents_for_exec,
-        )
-        has_exec_evidence = bool(executive_analysis.get("key_evidence"))
-        no_evidence = not has_exec_evidence
+        # Off the event loop so the probe event can be flushed meanwhile.
+        try:
+            executive_analysis = await asyncio.wait_for(
+                _executive_report_async(
+                    contract_sha=contract_sha,
+                    rag=rag,
+                    question=question,
+                    selected_agents=selected_agents_for_exec,
+                    profile=profile,
+                    retrieved=retrieved,
+                ),
+                timeout=deadline.remaining(),
+            )
+        except asyncio.TimeoutError:
+            # Out of budget; the thread still fills the section cache for the next request.
+            deadline.mark_truncated()
+            executive_analysis = None
+        if executive_analysis is not None:
+            emit("executive", {"analysis": executive_analysis})
+            has_exec_evidence = bool(executive_analysis.get("key_evidence"))
+            no_evidence = not has_exec_evidence
+        else:
+            no_evidence = best_score is None or best_score < float(no_evidence_threshold)
     else:
         no_evidence = best_score is None or best_score < float(no_evidence_threshold)
 
     # Strict minimal output unless user explicitly asked for risk/review/analysis.
     if intent in {"fact_summary", "qa", "clause_extraction"}:
-        qa = build_question_answer(question, probe)
-        report = format_fact_summary_report(question, probe)
+        qa = build_question_answer(question, probe, cache_key=section_key)
+        # The optional LLM rewrite blocks on HTTP; keep it off the event loop.
+        report = await lanes.to_thread(
+            format_fact_summary_report, question, probe, cache_key=section_key, rewrite=effective.llm_rewrite
+        )
         # Populate minimal analysis object so frontend can find evidence for highlighting
         final_json = {
             "contract_id": contract_id,
             "generated_at": utc_now_iso(),
             "intent": intent,
             "question": question,
+            "profile": profile.name,
             "qa": qa,
             "analysis": {
                 "key_evidence": [{"text": m.text, "score": m.score} for m in probe]
@@ -1550,28 +2379,25 @@ async def run_full_pipeline(
             "evidence_score": best_score,
             "message": "No relevant evidence found in the provided document for this question." if no_evidence else None,
         }
+        if not no_evidence:
+            await _remember(final_json, report)
+        elif deadline.truncated:
+            final_json["truncated"] = True
         return final_json, report
 
     # For risk_analysis/executive_review, still avoid hallucinations.
     if no_evidence:
-        qa = build_question_answer(question, probe)
+        qa = build_question_answer(question, probe, cache_key=section_key)
         if executive_analysis is None:
-            executive_analysis = {
-                "legal": {"risk_level": "unknown", "findings": [], "evidence": []},
-                "compliance": {"risk_level": "unknown", "findings": [], "evidence": []},
-                "finance": {"risk_level": "unknown", "findings": [], "evidence": []},
-                "operations": {"risk_level": "unknown", "findings": [], "evidence": []},
-                "overall_risk": "unknown",
-                "executive_summary_points": [
-                    "No relevant supporting contract language was retrieved for the requested analysis.",
-                ],
-                "key_evidence": [],
-            }
+            executive_analysis = _unknown_executive_analysis(
+                "No relevant supporting contract language was retrieved for the requested analysis."
+            )
         final_json = {
             "contract_id": contract_id,
             "generated_at": utc_now_iso(),
             "intent": intent,
             "question": question,
+            "profile": profile.name,
             "qa": qa,
             "analysis": executive_analysis,
             "agent_analysis": {
@@ -1584,27 +2410,64 @@ async def run_full_pipeline(
             "evidence_score": best_score,
             "message": "No relevant evidence found in the provided document for this question.",
         }
+        if deadline.truncated:
+            final_json["truncated"] = True
         report = format_report(final_json, tone=tone)
         return final_json, report
 
-    mem = _load_memory(contract_id)
-    q_vec_np = rag.encode([question], normalize_embeddings=True)[0]
-
     selected_agents = selected_agents_for_exec or select_agents_for_question(question)
-    tasks: List[asyncio.Future] = []
-    task_types: List[str] = []
-    for agent_type in selected_agents:
-        tasks.append(asyncio.to_thread(run_agent, agent_type=agent_type, question=question, rag=rag))
-        task_types.append(agent_type)
 
-    results: List[Dict[str, Any]] = []
-    if tasks:
-        results = await asyncio.gather(*tasks)
+    agent_kwargs: Dict[str, Any] = {
+        "top_k_per_query": effective.agent_top_k,
+        "max_queries": effective.agent_queries,
+        "evidence_items": effective.evidence_items,
+        "retrieved": retrieved,
+    }
 
-    agent_map: Dict[str, Dict[str, Any]] = {t: r for t, r in zip(task_types, results)}
+    lazy_id: Optional[str] = None
+    if lazy_agents:
+        # Agents run later, one by one, when a client asks for their section.
+        lazy_id = await lanes.to_thread(
+            _save_lazy_analysis,
+            contract_text=contract_text,
+            contract_id=contract_id,
+            contract_sha=contract_sha,
+            question=question,
+            agents=selected_agents,
+            model_name=rag.model_name,
+            embedder=rag.embedder_name,
+            profile=profile,
+            agent_kwargs=agent_kwargs,
+            retrieval_detail=level.retrieval_detail,
+        )
+
+    async def _agent(agent_type: str) -> Dict[str, Any]:
+        if agent_executor.process_mode():
+            result = await agent_executor.run_agent_in_process(
+                rag, agent_type=agent_type, question=question, deadline=deadline, **agent_kwargs
+            )
+        else:
+            result = await lanes.to_thread(run_agent, agent_type=agent_type, question=question, rag=rag, **agent_kwargs)
+        if not level.retrieval_detail:
+            result = {k: v for k, v in result.items() if k != "retrieval"}
+        emit("agent", {"agent_type": agent_type, "result": result})
+        return result
+
+    tasks: Dict[str, asyncio.Task] = {} if lazy_id else {t: asyncio.ensure_future(_agent(t)) for t in selected_agents}
+    if tasks:
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline.remaining())
+        if pending:
+            # Agents still running at the deadline are dropped; their threads stop at the next query.
+            deadline.mark_truncated()
+            for task in pending:
+                task.cancel()
+
+    agent_map: Dict[str, Dict[str, Any]] = {
+        t: task.result() for t, task in tasks.items() if task.done() and not task.cancelled()
+    }
 
     def _skipped(agent_type: str) -> Dict[str, Any]:
-        return {
+        result = {
             "agent_type": agent_type,
             "question": question,
             "timestamp": utc_now_iso(),
@@ -1615,11 +2478,19 @@ async def run_full_pipeline(
             "findings": [],
             "skipped": True,
         }
+        if not level.retrieval_detail:
+            del result["retrieval"]
+        return result
 
-    legal = agent_map.get("legal") or _skipped("legal")
-    compliance = agent_map.get("compliance") or _skipped("compliance")
-    finance = agent_map.get("finance") or _skipped("finance")
-    operations = agent_map.get("operations") or _skipped("operations")
+    def _missing(agent_type: str) -> Dict[str, Any]:
+        if agent_type in tasks:
+            return {**_skipped(agent_type), "truncated": True}
+        return _skipped(agent_type)
+
+    legal = agent_map.get("legal") or _missing("legal")
+    compliance = agent_map.get("compliance") or _missing("compliance")
+    finance = agent_map.get("finance") or _missing("finance")
+    operations = agent_map.get("operations") or _missing("operations")
 
     per_agent_risk = {
         "legal": (legal or {}).get("risk_level"),
@@ -1652,20 +2523,31 @@ async def run_full_pipeline(
         seen_evidence.add(k)
         deduped_evidence.append(ev)
 
+    if executive_analysis is None and deadline.truncated:
+        executive_analysis = _unknown_executive_analysis(
+            "The analysis ran out of time before the executive sections were complete."
+        )
+    elif executive_analysis is None:
+        # Off the event loop, in the configured agent executor, like the risk path above.
+        executive_analysis = await _executive_report_async(
+            contract_sha=contract_sha,
+            rag=rag,
+            question=question,
+            selected_agents=selected_agents,
+            profile=profile,
+            retrieved=retrieved,
+        )
+        emit("executive", {"analysis": executive_analysis})
+
     final_json = {
         "contract_id": contract_id,
         "generated_at": utc_now_iso(),
         "intent": intent,
         "question": question,
-        "qa": build_question_answer(question, probe),
+        "profile": profile.name,
+        "qa": build_question_answer(question, probe, cache_key=section_key),
         # Executive report analysis is generated from extracted clauses only (no filler).
-        "analysis": executive_analysis
-        or build_executive_report_data(
-            contract_text=contract_text,
-            rag=rag,
-            question=question,
-            selected_agents=selected_agents,
-        ),
+        "analysis": executive_analysis,
         # Keep agent outputs for debugging, but do not use them to format the executive report.
         "agent_analysis": {
             "selected_agents": selected_agents,
@@ -1673,6 +2555,10 @@ async def run_full_pipeline(
             "compliance": compliance,
             "finance": finance,
             "operations": operations,
+        } if lazy_id is None else {
+            "selected_agents": selected_agents,
+            "lazy": True,
+            "analysis_id": lazy_id,
         },
         "confidence": {
             "overall_avg": overall_conf,
@@ -1685,15 +2571,196 @@ async def run_full_pipeline(
 
     report = format_report(final_json, tone=tone)
 
-    mem.append(
-        {
-            "type": "final",
-            "timestamp": utc_now_iso(),
-            "question": question,
-            "question_embedding": _vec_to_list(q_vec_np),
-            "final_json": final_json,
-        }
-    )
-    _save_memory(contract_id, mem)
+    await _remember(final_json, report)
 
     return final_json, report
+
+
+# ============================================================
+# LAZY AGENT SECTIONS
+# ============================================================
+
+def _save_lazy_analysis(
+    *,
+    contract_text: str,
+    contract_id: str,
+    contract_sha: str,
+    question: str,
+    agents: List[str],
+    model_name: str,
+    embedder: str,
+    profile: profiles.AnalysisProfile,
+    agent_kwargs: Dict[str, Any],
+    retrieval_detail: bool,
+) -> str:
+    """Persist what `lazy_agent_section` needs; the id is stable for identical requests."""
+
+    params = {
+        "question": question,
+        "agents": list(agents),
+        "model_name": model_name,
+        "embedder": embedder,
+        "profile": profile.name,
+        "chunk_size": profile.chunk_size,
+        "chunk_overlap": profile.chunk_overlap,
+        "top_k_per_query": agent_kwargs["top_k_per_query"],
+        "max_queries": agent_kwargs["max_queries"],
+        "evidence_items": agent_kwargs["evidence_items"],
+        "retrieval_detail": retrieval_detail,
+    }
+    blob = json.dumps([PIPELINE_VERSION, contract_sha, contract_id, params], sort_keys=True, separators=(",", ":"))
+    analysis_id = hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+    # Under no caller: only this analysis (by content hash) reads it back.
+    memory_store.save_contract_text(contract_id, contract_text, owner=memory_store.ANALYSIS_OWNER)
+    memory_store.save_analysis(analysis_id, contract_id=contract_id, contract_sha=contract_sha, params=params)
+    return analysis_id
+
+
+async def lazy_agent_section(
+    analysis_id: str, agent_type: str, *, deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    """One agent's section of a `lazy_agents` analysis: computed on first request, then stored.
+
+    A section cut short by `deadline` is returned with `truncated: true` and not stored.
+    Raises LookupError for an unknown analysis, an agent it didn't select, or a contract
+    that is no longer stored under its id.
+    """
+
+    stored = await lanes.to_thread(memory_store.get_analysis_section, analysis_id, agent_type)
+    if stored is not None:
+        return stored
+    caller = deadline or current_deadline() or Deadline()
+    shared = Deadline(caller.remaining())  # the leader's budget, not its cancellation
+    result, _ = await _SINGLE_FLIGHT.do(
+        f"agent-section:{analysis_id}:{agent_type}",
+        lambda: _shared_run(lambda: _compute_agent_section(analysis_id, agent_type, shared), shared),
+    )
+    return copy.deepcopy(result)
+
+
+async def _compute_agent_section(analysis_id: str, agent_type: str, deadline: Deadline) -> Dict[str, Any]:
+    record = await lanes.to_thread(memory_store.get_analysis, analysis_id)
+    if record is None:
+        raise LookupError("Unknown analysis_id")
+    params = record["params"]
+    if agent_type not in params["agents"]:
+        raise LookupError(f"Agent {agent_type!r} is not part of this analysis")
+
+    key = (record["contract_sha"], params["embedder"], params["chunk_size"], params["chunk_overlap"])
+    rag = _INDEX_CACHE.get(key)
+    if rag is None:
+        # Another worker ran the analysis, or the index was evicted: rebuild from the stored text.
+        contract_text = await lanes.to_thread(memory_store.load_contract_text_by_sha, record["contract_sha"])
+        if contract_text is None:
+            raise LookupError("The contract of this analysis is no longer stored")
+        rag = LocalRAGIndex(model_name=params["model_name"])
+        await lanes.to_thread(rag.build, contract_text, chunk_size=params["chunk_size"], overlap=params["chunk_overlap"])
+        _INDEX_CACHE.put(key, rag)
+
+    agent_kwargs = {k: params[k] for k in ("top_k_per_query", "max_queries", "evidence_items")}
+    with use_deadline(deadline):
+        if agent_executor.process_mode():
+            result = await agent_executor.run_agent_in_process(
+                rag, agent_type=agent_type, question=params["question"], deadline=deadline, **agent_kwargs
+            )
+        else:
+            result = await lanes.to_thread(
+                run_agent, agent_type=agent_type, question=params["question"], rag=rag, **agent_kwargs
+            )
+    if not params["retrieval_detail"]:
+        result = {k: v for k, v in result.items() if k != "retrieval"}
+    if deadline.truncated:
+        return {**result, "truncated": True}
+    await lanes.to_thread(memory_store.save_analysis_section, analysis_id, agent_type, result)
+    return result
+
+
+async def cached_contract_index(
+    contract_text: str, *, model_name: Optional[str] = None, profile: Optional[str] = None
+) -> LocalRAGIndex:
+    """Index of `contract_text` chunked as `profile` specifies, shared through the index LRU.
+
+    Passing it as `index` to `run_full_pipeline` gives the same result as letting the
+    pipeline build its own, since both use the profile's chunking.
+    """
+
+    analysis_profile = profiles.get_profile(profile)
+    model_name = model_name or os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    _, embedder = get_embedding_model(model_name)
+    sha = hashlib.sha256((contract_text or "").encode("utf-8", errors="ignore")).hexdigest()
+    key = (sha, embedder, analysis_profile.chunk_size, analysis_profile.chunk_overlap)
+    rag = _INDEX_CACHE.get(key)
+    if rag is None:
+        rag = LocalRAGIndex(model_name=model_name)
+        await lanes.to_thread(
+            rag.build, contract_text, chunk_size=analysis_profile.chunk_size, overlap=analysis_profile.chunk_overlap
+        )
+        _INDEX_CACHE.put(key, rag)
+    return rag
+
+
+async def run_batch_pipeline(
+    *,
+    contract_text: str,
+    questions: List[Dict[str, Any]],
+    tone: str = "executive",
+    contract_id: Optional[str] = None,
+    no_evidence_threshold: float = 0.25,
+    run_all_agents: bool = False,
+    max_concurrency: int = 4,
+    deadline: Optional[Deadline] = None,
+    profile: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Answer many questions about one contract.
+
+    The index is built once with `profile`'s chunking (or reused from the index LRU), all
+    questions are embedded in one `encode` call, and the per-question pipelines run
+    concurrently (bounded by `max_concurrency`). Each item of `questions` is
+    `{"question": str, "intent_override": Optional[str]}`. Results keep the input order; a
+    failing question yields an `error` entry instead of failing the batch. One `deadline`,
+    if given, bounds the whole batch.
+    """
+
+    if not (contract_text or "").strip():
+        raise ValueError("Empty contract_text")
+
+    contract_id = contract_id or stable_contract_id(contract_text)
+    rag = await cached_contract_index(contract_text, profile=profile)
+
+    texts = [str(item.get("question") or "") for item in questions]
+    encodable = [i for i, t in enumerate(texts) if t.strip()]
+    vecs: Dict[int, np.ndarray] = {}
+    if encodable:
+        mat = await lanes.to_thread(rag.encode_queries, [texts[i] for i in encodable])
+        vecs = {i: mat[row] for row, i in enumerate(encodable)}
+
+    sem = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+    async def _one(i: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "index": i,
+            "question": texts[i],
+            "intent_override": item.get("intent_override"),
+        }
+        async with sem:
+            try:
+                final_json, report = await run_full_pipeline(
+                    contract_text=contract_text,
+                    question=texts[i],
+                    tone=tone,
+                    contract_id=contract_id,
+                    no_evidence_threshold=no_evidence_threshold,
+                    intent_override=item.get("intent_override"),
+                    run_all_agents=run_all_agents,
+                    index=rag,
+                    question_vec=vecs.get(i),
+                    deadline=deadline,
+                    profile=profile,
+                )
+            except ValueError as e:
+                out["error"] = str(e)
+                return out
+        out.update({"cache": final_json.get("cache"), "analysis": final_json, "report": report})
+        return out
+
+    return list(await asyncio.gather(*[_one(i, item) for i, item in enumerate(questions)]))
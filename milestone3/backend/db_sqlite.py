@@ -54,6 +54,29 @@ def init_db() -> None:
             )
         """)
 
+        # Per-user scheduling overrides; NULL columns fall back to the env defaults.
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS user_quotas (
+                email TEXT PRIMARY KEY,
+                weight REAL,
+                max_concurrent INTEGER,
+                daily_compute_s REAL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+
+        # Pipeline compute seconds per user and UTC day.
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS compute_usage (
+                email TEXT NOT NULL,
+                day TEXT NOT NULL,
+                compute_s REAL NOT NULL DEFAULT 0,
+                requests INTEGER NOT NULL DEFAULT 0,
+                rejected INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY(email, day)
+            )
+        """)
+
         con.commit()
 
 
@@ -206,4 +229,174 @@ def user_from_token(token: str) -> Optional[Dict[str, Any]]:
               AND s.expires_at > ?
         """, (token, _utc_now_iso())).fetchone()
 
-    return dict(row) if row else None
\ No newline at end of file
+    return dict(row) if row else None
+
+
+# ============================================================
+# QUOTAS + USAGE
+# ============================================================
+
+ANONYMOUS_USER = "anonymous"
+
+
+def anonymous_caller(client: Optional[str]) -> str:
+    """Usage key of a caller without a session: one per client address."""
+    return f"{ANONYMOUS_USER}:{client}" if client else ANONYMOUS_USER
+
+
+def is_anonymous(email: str) -> bool:
+    email_n = _norm_email(email)
+    return email_n == ANONYMOUS_USER or email_n.startswith(f"{ANONYMOUS_USER}:")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def default_user_limits(*, anonymous: bool = False) -> Dict[str, Any]:
+    """`USER_WEIGHT` (1), `USER_MAX_CONCURRENT` (2, 0 = unlimited) and
+    `USER_DAILY_COMPUTE_S` (0 = unlimited).
+
+    Callers without a session use `ANONYMOUS_MAX_CONCURRENT` and `ANONYMOUS_DAILY_COMPUTE_S`
+    instead (both 0 = unlimited): one client address may front many people (a proxy, the UI).
+    """
+
+    prefix = "ANONYMOUS" if anonymous else "USER"
+    return {
+        "weight": max(0.01, _env_float("USER_WEIGHT", 1.0)),
+        "max_concurrent": int(_env_float(f"{prefix}_MAX_CONCURRENT", 0 if anonymous else 2)) or None,
+        "daily_compute_s": _env_float(f"{prefix}_DAILY_COMPUTE_S", 0) or None,
+    }
+
+
+def _today() -> str:
+    return _utc_now().date().isoformat()
+
+
+def seconds_until_reset() -> float:
+    """Seconds until the next UTC midnight, when daily usage starts over."""
+    now = _utc_now()
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+def set_user_limits(
+    email: str,
+    *,
+    weight: Optional[float] = None,
+    max_concurrent: Optional[int] = None,
+    daily_compute_s: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Store per-user overrides (None keeps the env default for that field)."""
+
+    init_db()
+    email_n = _norm_email(email)
+
+    with _connect() as con:
+        con.execute("""
+            INSERT INTO user_quotas(email, weight, max_concurrent, daily_compute_s, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(email) DO UPDATE SET
+                weight = excluded.weight,
+                max_concurrent = excluded.max_concurrent,
+                daily_compute_s = excluded.daily_compute_s,
+                updated_at = excluded.updated_at
+        """, (email_n, weight, max_concurrent, daily_compute_s, _utc_now_iso()))
+
+        con.commit()
+
+    return get_user_limits(email_n)
+
+
+def get_user_limits(email: str) -> Dict[str, Any]:
+    """Limits for `email`; an anonymous caller without its own overrides takes `anonymous`'s."""
+
+    init_db()
+    email_n = _norm_email(email)
+    anonymous = is_anonymous(email_n)
+    limits = default_user_limits(anonymous=anonymous)
+
+    with _connect() as con:
+        row = con.execute(
+            """
+            SELECT weight, max_concurrent, daily_compute_s FROM user_quotas
+            WHERE email IN (?, ?)
+            ORDER BY email = ? DESC
+            LIMIT 1
+            """,
+            (email_n, ANONYMOUS_USER if anonymous else email_n, email_n)
+        ).fetchone()
+
+    if row:
+        if row["weight"] is not None:
+            limits["weight"] = max(0.01, float(row["weight"]))
+        for key in ("max_concurrent", "daily_compute_s"):
+            if row[key] is not None:
+                # An explicit 0 means unlimited.
+                limits[key] = row[key] or None
+    return limits
+
+
+def record_usage(email: str, *, compute_s: float = 0.0, requests: int = 0, rejected: int = 0) -> None:
+    init_db()
+
+    with _connect() as con:
+        con.execute("""
+            INSERT INTO compute_usage(email, day, compute_s, requests, rejected)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(email, day) DO UPDATE SET
+                compute_s = compute_s + excluded.compute_s,
+                requests = requests + excluded.requests,
+                rejected = rejected + excluded.rejected
+        """, (_norm_email(email), _today(), float(compute_s), int(requests), int(rejected)))
+
+        con.commit()
+
+
+def quota_status(email: str, *, day: Optional[str] = None) -> Dict[str, Any]:
+    """Limits, usage for `day` (default today, UTC) and remaining compute seconds."""
+
+    email_n = _norm_email(email)
+    day = day or _today()
+    limits = get_user_limits(email_n)
+
+    with _connect() as con:
+        row = con.execute(
+            "SELECT compute_s, requests, rejected FROM compute_usage WHERE email = ? AND day = ?",
+            (email_n, day)
+        ).fetchone()
+
+    used = dict(row) if row else {"compute_s": 0.0, "requests": 0, "rejected": 0}
+    cap = limits["daily_compute_s"]
+    return {
+        "email": email_n,
+        "day": day,
+        **used,
+        "limits": limits,
+        "remaining_s": None if cap is None else max(0.0, cap - used["compute_s"]),
+    }
+
+
+def usage_report(*, day: Optional[str] = None) -> Dict[str, Any]:
+    """Usage of every user with activity on `day`, plus everyone with overrides."""
+
+    init_db()
+    day = day or _today()
+
+    with _connect() as con:
+        emails = [r["email"] for r in con.execute("""
+            SELECT email FROM compute_usage WHERE day = ?
+            UNION
+            SELECT email FROM user_quotas
+            ORDER BY email
+        """, (day,)).fetchall()]
+
+    return {
+        "day": day,
+        "defaults": default_user_limits(),
+        "anonymous_defaults": default_user_limits(anonymous=True),
+        "users": [quota_status(e, day=day) for e in emails],
+    }
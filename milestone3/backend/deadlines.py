@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+# ============================================================
+# REQUEST DEADLINE
+# ============================================================
+
+class DeadlineExceeded(Exception):
+    """Raised by `Deadline.check()` once the budget is spent or the request was cancelled."""
+
+
+class Deadline:
+    """Time budget for one request, shared by every stage and worker thread it starts.
+
+    Stages check it cooperatively. Work that stops early calls `mark_truncated()` so the
+    pipeline can flag the result as partial. `cancel()` (client disconnected) makes
+    every later check fail immediately.
+    """
+
+    def __init__(self, budget_s: Optional[float] = None) -> None:
+        self.budget_s = budget_s
+        self.expires_at = (time.monotonic() + budget_s) if budget_s is not None else None
+        self._cancelled = threading.Event()
+        self._truncated = threading.Event()
+        self._lock = threading.Lock()
+        self._on_cancel: List[Callable[[], None]] = []
+
+    @property
+    def bounded(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None when unbounded."""
+        if self._cancelled.is_set():
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        rem = self.remaining()
+        return rem is not None and rem <= 0.0
+
+    def check(self) -> None:
+        if self.expired():
+            self.mark_truncated()
+            raise DeadlineExceeded("cancelled" if self.cancelled else "deadline exceeded")
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled.set()
+            callbacks, self._on_cancel = self._on_cancel, []
+        for fn in callbacks:
+            fn()
+
+    def on_cancel(self, fn: Callable[[], None]) -> None:
+        """Call `fn` once when the deadline is cancelled (now, if it already was).
+
+        For checks this object cannot reach, e.g. agents running in worker processes.
+        """
+
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._on_cancel.append(fn)
+                return
+        fn()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def mark_truncated(self) -> None:
+        self._truncated.set()
+
+    @property
+    def truncated(self) -> bool:
+        return self._truncated.is_set()
+
+    def clamp_timeout(self, timeout_s: float) -> float:
+        """A per-call timeout (e.g. an HTTP request) that does not outlive the deadline."""
+        rem = self.remaining()
+        return timeout_s if rem is None else max(0.0, min(timeout_s, rem))
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("clauseai_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being processed (propagates into `asyncio.to_thread`)."""
+    return _current.get()
+
+
+@contextmanager
+def use_deadline(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def deadline_from_request(header_ms: Optional[str], param_ms: Optional[float]) -> Deadline:
+    """Build a request deadline from `X-Deadline-Ms`, a `deadline_ms` parameter, or
+    `REQUEST_DEADLINE_MS` (default `0` = none). The tightest positive value wins."""
+
+    candidates = []
+    for raw in (header_ms, param_ms, os.getenv("REQUEST_DEADLINE_MS", "0")):
+        try:
+            v = float(raw) if raw is not None and str(raw).strip() != "" else 0.0
+        except ValueError:
+            continue
+        if v > 0:
+            candidates.append(v)
+    return Deadline(min(candidates) / 1000.0 if candidates else None)
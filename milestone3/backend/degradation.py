@@ -0,0 +1,206 @@
+"""Load-adaptive degradation of the analysis pipeline.
+
+Shedding (see `admission.py`) turns requests away once the queue is full. Before that
+point, each admitted request can instead be made cheaper: when the lane's queue is
+deep or its pipelines are slow, the request runs at a higher degradation level.
+
+Levels are cumulative:
+
+- 0 `full`: everything.
+- 1 `no_rewrite`: no LLM rewrite of Q&A bullets; `agent_analysis.<agent>.retrieval`
+  (per-query match dumps, debug output) is omitted.
+- 2 `reduced`: agents retrieve `DEGRADE_TOP_K` (default 3) matches per query at most (`balanced` uses 5).
+- 3 `minimal`: agents run only their primary query (the user's question).
+
+The level is chosen on arrival from the lane's admission controller: queue depth in
+"rounds" (queued / slots) and the moving average of pipeline service time against
+`DEGRADE_LATENCY_TARGET_MS`. It is a contextvar set around the run, like the lane and
+deadline. Degraded results are returned with a `degradation` block, but never cached
+or written to memory, so a later request under normal load gets the full answer.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_steps(name: str, default: List[float]) -> List[float]:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return list(default)
+    try:
+        return sorted(float(x) for x in raw.split(",") if x.strip())
+    except ValueError:
+        return list(default)
+
+
+def degradation_enabled() -> bool:
+    return os.getenv("DEGRADATION", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def latency_target_ms(lane: Optional[str]) -> float:
+    """`DEGRADE_LATENCY_TARGET_MS` (interactive/default lane, 2000) and
+    `DEGRADE_HEAVY_LATENCY_TARGET_MS` (heavy lane, 10000)."""
+
+    if lane == "heavy":
+        return _env_float("DEGRADE_HEAVY_LATENCY_TARGET_MS", 10000.0)
+    return _env_float("DEGRADE_LATENCY_TARGET_MS", 2000.0)
+
+
+# ============================================================
+# LEVELS
+# ============================================================
+
+@dataclass(frozen=True)
+class DegradationLevel:
+    """What a pipeline run may skip. `None` means the pipeline default."""
+
+    level: int
+    name: str
+    llm_rewrite: bool = True
+    retrieval_detail: bool = True
+    top_k_per_query: Optional[int] = None
+    max_agent_queries: Optional[int] = None
+    signals: Dict[str, Any] = field(default_factory=dict, compare=False)
+
+    def describe(self) -> Dict[str, Any]:
+        skipped: List[str] = []
+        if not self.llm_rewrite:
+            skipped.append("llm_rewrite")
+        if not self.retrieval_detail:
+            skipped.append("agent_retrieval")
+        if self.top_k_per_query is not None:
+            skipped.append(f"top_k_per_query={self.top_k_per_query}")
+        if self.max_agent_queries is not None:
+            skipped.append(f"agent_queries={self.max_agent_queries}")
+        return {"level": self.level, "name": self.name, "skipped": skipped, "signals": dict(self.signals)}
+
+
+def levels() -> List[DegradationLevel]:
+    top_k = max(1, _env_int("DEGRADE_TOP_K", 3))
+    return [
+        DegradationLevel(0, "full"),
+        DegradationLevel(1, "no_rewrite", llm_rewrite=False, retrieval_detail=False),
+        DegradationLevel(2, "reduced", llm_rewrite=False, retrieval_detail=False, top_k_per_query=top_k),
+        DegradationLevel(
+            3, "minimal", llm_rewrite=False, retrieval_detail=False, top_k_per_query=top_k, max_agent_queries=1
+        ),
+    ]
+
+
+FULL = DegradationLevel(0, "full")
+
+# ============================================================
+# CHOOSING A LEVEL
+# ============================================================
+
+_stats_lock = threading.Lock()
+_applied: Dict[str, Dict[int, int]] = {}
+
+
+def _step(value: Optional[float], steps: List[float]) -> int:
+    if value is None:
+        return 0
+    return sum(1 for s in steps if value >= s)
+
+
+def choose(lane: Optional[str] = None) -> DegradationLevel:
+    """Level for a request arriving now in `lane`, from that lane's admission controller.
+
+    Queue steps (`DEGRADE_QUEUE_STEPS`, default `1,2,3`) are in rounds of waiting:
+    queued / slots. Latency steps (`DEGRADE_LATENCY_STEPS`, default `1,1.5,2`) are
+    multiples of the lane's latency target. The higher of the two wins, capped at
+    `DEGRADE_MAX_LEVEL` (default 3).
+    """
+
+    from milestone3.backend import admission
+
+    if not degradation_enabled() or not admission.admission_enabled():
+        return FULL
+    ctl = admission.get_controller(lane)
+
+    rounds = ctl.queued / ctl.max_concurrent
+    service_ms = ctl.service_s * 1000.0 if ctl.service_s is not None else None
+    target = latency_target_ms(lane)
+    latency_ratio = service_ms / target if service_ms is not None and target > 0 else None
+
+    by_queue = _step(rounds, _env_steps("DEGRADE_QUEUE_STEPS", [1.0, 2.0, 3.0]))
+    by_latency = _step(latency_ratio, _env_steps("DEGRADE_LATENCY_STEPS", [1.0, 1.5, 2.0]))
+    table = levels()
+    n = min(max(by_queue, by_latency), max(0, _env_int("DEGRADE_MAX_LEVEL", 3)), len(table) - 1)
+
+    with _stats_lock:
+        per_lane = _applied.setdefault(lane or "default", {})
+        per_lane[n] = per_lane.get(n, 0) + 1
+    if n == 0:
+        return FULL
+    signals = {
+        "lane": lane or "default",
+        "queued": ctl.queued,
+        "queue_rounds": round(rounds, 2),
+        "service_ms_ewma": round(service_ms, 2) if service_ms is not None else None,
+        "latency_target_ms": target,
+        "reason": "queue_depth" if by_queue >= by_latency else "latency",
+    }
+    lvl = table[n]
+    return DegradationLevel(
+        lvl.level,
+        lvl.name,
+        llm_rewrite=lvl.llm_rewrite,
+        retrieval_detail=lvl.retrieval_detail,
+        top_k_per_query=lvl.top_k_per_query,
+        max_agent_queries=lvl.max_agent_queries,
+        signals=signals,
+    )
+
+
+def degradation_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        applied = {lane: {str(k): v for k, v in sorted(c.items())} for lane, c in _applied.items()}
+    return {
+        "enabled": degradation_enabled(),
+        "levels": [lvl.describe() for lvl in levels()],
+        "applied": applied,
+    }
+
+
+# ============================================================
+# CURRENT LEVEL
+# ============================================================
+
+_current: contextvars.ContextVar[DegradationLevel] = contextvars.ContextVar("clauseai_degradation", default=FULL)
+
+
+def current_level() -> DegradationLevel:
+    return _current.get()
+
+
+@contextmanager
+def use_level(level: Optional[DegradationLevel]) -> Iterator[DegradationLevel]:
+    token = _current.set(level or FULL)
+    try:
+        yield level or FULL
+    finally:
+        _current.reset(token)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EncodeFn = Callable[[List[str], bool], np.ndarray]
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def batching_mode() -> str:
+    """`EMBED_BATCHING`: `1` (default, model embedders only), `always` (hashing too), `0` (off)."""
+    raw = os.getenv("EMBED_BATCHING", "1").strip().lower()
+    if raw in {"0", "false", "no", "off"}:
+        return "off"
+    if raw == "always":
+        return "always"
+    return "model"
+
+
+# ============================================================
+# HISTOGRAM
+# ============================================================
+
+class Histogram:
+    """Fixed-bucket histogram; `bounds` are inclusive upper edges, plus an overflow bucket."""
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.total,
+            "mean": (self.sum / self.total) if self.total else None,
+            "max": self.max if self.total else None,
+        }
+
+
+# ============================================================
+# BATCHER
+# ============================================================
+
+@dataclass
+class _Pending:
+    texts: List[str]
+    normalize: bool
+    enqueued_at: float
+    future: "Future[np.ndarray]" = field(default_factory=Future)
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent `encode` calls into one model call.
+
+    Callers (agent threads, pipelines) block on a future while a single background
+    thread gathers requests until `max_batch` texts are queued or `max_wait_ms` has
+    passed since the first one, encodes them together and hands each caller its rows.
+    The model is only ever called from that thread.
+    """
+
+    def __init__(self, encode_fn: EncodeFn, *, max_batch: int = 64, max_wait_ms: float = 5.0, name: str = "") -> None:
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.texts = 0
+        self.batch_size = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.queue_wait_ms = Histogram([0.1, 0.5, 1, 2, 5, 10, 20, 50, 100])
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"embed-batcher:{self.name}", daemon=True)
+                self._thread.start()
+
+    def encode(self, texts: List[str], *, normalize_embeddings: bool = True) -> np.ndarray:
+        if not texts:
+            return self.encode_fn([], normalize_embeddings)
+        self._ensure_thread()
+        pending = _Pending(texts=list(texts), normalize=bool(normalize_embeddings), enqueued_at=time.perf_counter())
+        self._queue.put(pending)
+        return pending.future.result()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            n = len(first.texts)
+            flush_at = time.perf_counter() + self.max_wait_s
+            while n < self.max_batch:
+                timeout = flush_at - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                n += len(item.texts)
+            self._flush(batch)
+
+    def _flush(self, batch: List[_Pending]) -> None:
+        started = time.perf_counter()
+        for normalize in (True, False):
+            group = [p for p in batch if p.normalize is normalize]
+            if not group:
+                continue
+            texts = [t for p in group for t in p.texts]
+            try:
+                vecs = np.asarray(self.encode_fn(texts, normalize), dtype=np.float32)
+            except BaseException as e:
+                for p in group:
+                    p.future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.texts += len(texts)
+                self.batch_size.observe(len(texts))
+                for p in group:
+                    self.queue_wait_ms.observe((started - p.enqueued_at) * 1000.0)
+
+            row = 0
+            for p in group:
+                p.future.set_result(vecs[row: row + len(p.texts)])
+                row += len(p.texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "queued": self._queue.qsize(),
+                "batches": self.batches,
+                "texts": self.texts,
+                "batch_size": self.batch_size.snapshot(),
+                "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            }
+
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(embedder_name: str, encode_fn: EncodeFn, *, uses_model: bool) -> Optional[EmbeddingBatcher]:
+    """Process-wide batcher for one embedder, or None when batching is off for it.
+
+    `encode_fn` must not hold on to a particular index (it lives as long as the process).
+    """
+
+    mode = batching_mode()
+    if mode == "off" or (mode == "model" and not uses_model):
+        return None
+
+    with _batchers_lock:
+        batcher = _batchers.get(embedder_name)
+        if batcher is None:
+            batcher = EmbeddingBatcher(
+                encode_fn,
+                max_batch=int(_env_float("EMBED_BATCH_MAX", 64)),
+                max_wait_ms=_env_float("EMBED_BATCH_WAIT_MS", 5.0),
+                name=embedder_name,
+            )
+            _batchers[embedder_name] = batcher
+        return batcher
+
+
+def batcher_stats() -> Dict[str, Any]:
+    with _batchers_lock:
+        items: List[Tuple[str, EmbeddingBatcher]] = list(_batchers.items())
+    return {"mode": batching_mode(), "embedders": {name: b.stats() for name, b in items}}
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# ============================================================
+# QUEUE LOCATION
+# ============================================================
+
+MILESTONE3_DIR = Path(__file__).resolve().parents[1]
+JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH") or (MILESTONE3_DIR / "outputs" / "jobs.sqlite3"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+_init_lock = threading.Lock()
+_initialized_paths: set[str] = set()
+
+# Set by run_job_workers so submit_job can wake an idle worker immediately.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+
+ProgressFn = Callable[[float, Optional[str]], None]
+JobHandler = Callable[[Dict[str, Any], ProgressFn], Awaitable[Dict[str, Any]]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def job_retention_s() -> float:
+    """How long finished jobs (and their results) are kept."""
+    return _env_float("JOB_RETENTION_S", 24 * 3600)
+
+
+# ============================================================
+# DB CONNECTION
+# ============================================================
+
+def _connect() -> sqlite3.Connection:
+    JOB_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(JOB_DB_PATH, timeout=30.0, isolation_level=None)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+
+def init_jobs() -> None:
+    key = str(JOB_DB_PATH)
+    if key in _initialized_paths:
+        return
+
+    with _init_lock:
+        if key in _initialized_paths:
+            return
+
+        with closing(_connect()) as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    stage TEXT,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    heartbeat_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+
+        _initialized_paths.add(key)
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc_now_iso() -> str:
+    return _utc_now().isoformat()
+
+
+def _row_to_job(row: sqlite3.Row, *, include_params: bool = False) -> Dict[str, Any]:
+    job: Dict[str, Any] = {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "progress": float(row["progress"] or 0.0),
+        "stage": row["stage"],
+        "attempts": int(row["attempts"] or 0),
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+    }
+    if include_params:
+        job["params"] = json.loads(row["params"])
+    return job
+
+
+def _notify() -> None:
+    if _loop is not None and _wakeup is not None and not _loop.is_closed():
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+# ============================================================
+# QUEUE OPERATIONS
+# ============================================================
+
+def submit_job(kind: str, params: Dict[str, Any]) -> str:
+    init_jobs()
+    job_id = uuid.uuid4().hex
+    with closing(_connect()) as con:
+        con.execute(
+            "INSERT INTO jobs(id, kind, status, params, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(params, ensure_ascii=False), _utc_now_iso()),
+        )
+    _notify()
+    return job_id
+
+
+def get_job(job_id: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Job status/progress/result, or None when unknown, past retention, or (when `owner`
+    is given) submitted by a different user (`params["user_email"]`)."""
+
+    init_jobs()
+    with closing(_connect()) as con:
+        row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if not row:
+        return None
+    if owner is not None and json.loads(row["params"]).get("user_email") != owner:
+        return None
+
+    job = _row_to_job(row)
+    if job["finished_at"]:
+        expires = datetime.fromisoformat(job["finished_at"]) + timedelta(seconds=job_retention_s())
+        if expires < _utc_now():
+            return None
+        job["expires_at"] = expires.isoformat()
+    return job
+
+
+def claim_next_job(worker_id: str) -> Optional[Dict[str, Any]]:
+    """Atomically move the oldest queued job to `running` and return it (with params)."""
+
+    init_jobs()
+    now = _utc_now_iso()
+    with closing(_connect()) as con:
+        # IMMEDIATE takes the write lock up front so two workers cannot claim the same row.
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            row = con.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if not row:
+                con.execute("COMMIT")
+                return None
+            con.execute("""
+                UPDATE jobs
+                SET status = ?, worker_id = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, (RUNNING, worker_id, now, now, row["id"]))
+            job = con.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+    return _row_to_job(job, include_params=True)
+
+
+def update_progress(job_id: str, progress: float, stage: Optional[str] = None) -> None:
+    with closing(_connect()) as con:
+        con.execute(
+            "UPDATE jobs SET progress = ?, stage = COALESCE(?, stage), heartbeat_at = ? WHERE id = ? AND status = ?",
+            (max(0.0, min(1.0, float(progress))), stage, _utc_now_iso(), job_id, RUNNING),
+        )
+
+
+def heartbeat(job_id: str) -> None:
+    with closing(_connect()) as con:
+        con.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?", (_utc_now_iso(), job_id, RUNNING))
+
+
+def finish_job(job_id: str, *, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+    with closing(_connect()) as con:
+        con.execute("""
+            UPDATE jobs
+            SET status = ?, progress = ?, stage = ?, result = ?, error = ?, finished_at = ?, heartbeat_at = NULL
+            WHERE id = ?
+        """, (
+            ERROR if error is not None else DONE,
+            1.0,
+            "failed" if error is not None else "done",
+            json.dumps(result, ensure_ascii=False) if result is not None else None,
+            error,
+            _utc_now_iso(),
+            job_id,
+        ))
+
+
+def requeue_job(job_id: str) -> None:
+    """Put a running job back in the queue (worker shutting down)."""
+
+    with closing(_connect()) as con:
+        con.execute(
+            "UPDATE jobs SET status = ?, progress = 0, stage = NULL, worker_id = NULL WHERE id = ? AND status = ?",
+            (QUEUED, job_id, RUNNING),
+        )
+
+
+def requeue_stale_jobs(stale_s: Optional[float] = None, max_attempts: Optional[int] = None) -> Dict[str, int]:
+    """Recover jobs whose worker died: requeue them, or fail them after `max_attempts`."""
+
+    init_jobs()
+    if stale_s is None:
+        stale_s = _env_float("JOB_STALE_S", 120)
+    if max_attempts is None:
+        max_attempts = int(_env_float("JOB_MAX_ATTEMPTS", 3))
+    cutoff = (_utc_now() - timedelta(seconds=stale_s)).isoformat()
+    with closing(_connect()) as con:
+        failed = con.execute("""
+            UPDATE jobs
+            SET status = ?, stage = 'failed', error = 'Worker stopped responding', finished_at = ?, heartbeat_at = NULL
+            WHERE status = ? AND heartbeat_at < ? AND attempts >= ?
+        """, (ERROR, _utc_now_iso(), RUNNING, cutoff, max_attempts)).rowcount
+        requeued = con.execute("""
+            UPDATE jobs
+            SET status = ?, progress = 0, stage = NULL, worker_id = NULL
+            WHERE status = ? AND heartbeat_at < ?
+        """, (QUEUED, RUNNING, cutoff)).rowcount
+    if requeued:
+        _notify()
+    return {"requeued": int(requeued or 0), "failed": int(failed or 0)}
+
+
+def purge_expired_jobs(retention_s: Optional[float] = None) -> int:
+    init_jobs()
+    if retention_s is None:
+        retention_s = job_retention_s()
+    cutoff = (_utc_now() - timedelta(seconds=retention_s)).isoformat()
+    with closing(_connect()) as con:
+        n = con.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (DONE, ERROR, cutoff),
+        ).rowcount
+    return int(n or 0)
+
+
+def job_stats() -> Dict[str, Any]:
+    init_jobs()
+    with closing(_connect()) as con:
+        rows = con.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+    counts = {QUEUED: 0, RUNNING: 0, DONE: 0, ERROR: 0}
+    counts.update({r["status"]: int(r["n"]) for r in rows})
+    return counts
+
+
+# ============================================================
+# WORKER POOL
+# ============================================================
+
+async def _run_one(handler: JobHandler, job: Dict[str, Any]) -> None:
+    job_id = job["job_id"]
+
+    def report(progress: float, stage: Optional[str] = None) -> None:
+        try:
+            update_progress(job_id, progress, stage)
+        except Exception:
+            # Progress is informational; never fail the job because of it.
+            pass
+
+    async def beat() -> None:
+        interval = _env_float("JOB_HEARTBEAT_S", 15)
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(heartbeat, job_id)
+
+    beater = asyncio.create_task(beat())
+    try:
+        result = await handler(job["params"], report)
+    except asyncio.CancelledError:
+        # Shutdown: hand the job to the next worker instead of losing it.
+        await asyncio.to_thread(requeue_job, job_id)
+        raise
+    except Exception as e:
+        await asyncio.to_thread(finish_job, job_id, error=f"{type(e).__name__}: {e}")
+    else:
+        await asyncio.to_thread(finish_job, job_id, result=result)
+    finally:
+        beater.cancel()
+
+
+async def _worker(handler: JobHandler, worker_id: str, poll_s: float) -> None:
+    assert _wakeup is not None
+    while True:
+        _wakeup.clear()
+        try:
+            job = await asyncio.to_thread(claim_next_job, worker_id)
+        except Exception:
+            job = None
+        if job is None:
+            # Other processes may enqueue too, so poll as well as waiting for a local submit.
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=poll_s)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        # Let another idle worker look at the queue too.
+        _wakeup.set()
+        await _run_one(handler, job)
+
+
+async def _maintenance(interval_s: float) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(requeue_stale_jobs)
+            await asyncio.to_thread(purge_expired_jobs)
+        except Exception:
+            # Maintenance is retried next interval.
+            pass
+        await asyncio.sleep(interval_s)
+
+
+async def run_job_workers(handler: JobHandler, workers: Optional[int] = None) -> None:
+    """Background task: `JOB_WORKERS` (default 2) workers draining the queue with `handler`.
+
+    Cancelling this task requeues any job still running.
+    """
+
+    global _loop, _wakeup
+
+    init_jobs()
+    if workers is None:
+        workers = int(_env_float("JOB_WORKERS", 2))
+    if workers <= 0:
+        return
+
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    poll_s = _env_float("JOB_POLL_S", 2.0)
+    prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    tasks = [asyncio.create_task(_worker(handler, f"{prefix}-{i}", poll_s)) for i in range(workers)]
+    tasks.append(asyncio.create_task(_maintenance(_env_float("JOB_MAINTENANCE_INTERVAL_S", 60))))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _loop = None
+        _wakeup = None
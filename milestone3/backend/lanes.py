@@ -0,0 +1,216 @@
+"""Priority lanes: interactive Q&A and heavy reports on separate executors.
+
+Without lanes every pipeline's blocking work (index build, agents, QA report) goes
+through the loop's one default thread pool, so a follow-up question queues behind the
+four agents of every report that arrived before it. With lanes each request class has
+its own pool (and its own admission slots, see `admission.py`), so cheap requests only
+ever wait for other cheap requests. A third, `background` lane (one thread by default)
+runs speculative work such as follow-up prefetch (`prefetch.py`).
+
+The lane is a contextvar set around a pipeline run; `to_thread` submits to that lane's
+pool and falls back to `asyncio.to_thread` outside a lane.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+from milestone3.backend.embedding_batcher import Histogram
+
+T = TypeVar("T")
+
+INTERACTIVE = "interactive"
+HEAVY = "heavy"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, HEAVY, BACKGROUND)
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def lanes_enabled() -> bool:
+    return os.getenv("PRIORITY_LANES", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def heavy_min_agents() -> int:
+    """Risk/executive requests with at least this many agents go to the heavy lane."""
+    return max(1, _env_int("LANE_HEAVY_MIN_AGENTS", 2))
+
+
+def lane_threads(lane: str) -> int:
+    """`LANE_INTERACTIVE_THREADS` (default AGENT_THREADS) / `LANE_HEAVY_THREADS` (default max(2, CPU_BUDGET))
+    / `LANE_BACKGROUND_THREADS` (default 1)."""
+
+    from milestone3.backend.concurrency import load_config
+
+    if lane == BACKGROUND:
+        default = 1
+    else:
+        cfg = load_config()
+        default = cfg.agent_threads if lane == INTERACTIVE else max(2, cfg.cpu_budget)
+    n = _env_int(f"LANE_{lane.upper()}_THREADS", 0)
+    return n if n > 0 else default
+
+
+# ============================================================
+# CURRENT LANE
+# ============================================================
+
+_current: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("clauseai_lane", default=None)
+
+
+def current_lane() -> Optional[str]:
+    return _current.get()
+
+
+@contextmanager
+def use_lane(lane: Optional[str]) -> Iterator[Optional[str]]:
+    token = _current.set(lane)
+    try:
+        yield lane
+    finally:
+        _current.reset(token)
+
+
+# ============================================================
+# EXECUTORS
+# ============================================================
+
+class _LaneStats:
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.completed = 0
+        self.in_flight = 0
+        self.active_requests = 0
+        self.yields = 0
+        self.queue_wait_ms = Histogram([0.1, 1, 5, 10, 50, 100, 500, 1000, 5000])
+
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_stats: Dict[str, _LaneStats] = {lane: _LaneStats() for lane in LANES}
+_lock = threading.Lock()
+_interactive_idle = threading.Condition(_lock)
+
+
+def get_executor(lane: str) -> ThreadPoolExecutor:
+    with _lock:
+        ex = _executors.get(lane)
+        if ex is None:
+            ex = ThreadPoolExecutor(max_workers=lane_threads(lane), thread_name_prefix=f"lane-{lane}")
+            _executors[lane] = ex
+        return ex
+
+
+def shutdown_lanes() -> None:
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for ex in executors:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_tracked(lane: str, submitted_at: float, call: Callable[[], T]) -> T:
+    stats = _stats[lane]
+    with _lock:
+        stats.queue_wait_ms.observe((time.perf_counter() - submitted_at) * 1000.0)
+        stats.in_flight += 1
+    try:
+        return call()
+    finally:
+        with _lock:
+            stats.in_flight -= 1
+            stats.completed += 1
+
+
+@contextmanager
+def track_request(lane: Optional[str]) -> Iterator[None]:
+    """Count a pipeline run as active in its lane (what heavy work yields to)."""
+
+    if lane is None:
+        yield
+        return
+    stats = _stats[lane]
+    with _lock:
+        stats.active_requests += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            stats.active_requests -= 1
+            if lane == INTERACTIVE and stats.active_requests == 0:
+                _interactive_idle.notify_all()
+
+
+def yield_to_interactive() -> None:
+    """Checkpoint for heavy-lane work: pause while interactive requests are running.
+
+    Separate pools stop Q&A from queueing behind reports, but all threads still share
+    the GIL (and often the cores). Heavy stages call this before each index search (once
+    per planned retrieval pass, not per lookup into its results) and wait up to
+    `LANE_HEAVY_YIELD_MS` (default 50) for active interactive requests to finish.
+    """
+
+    if current_lane() != HEAVY:
+        return
+    wait_s = max(0, _env_int("LANE_HEAVY_YIELD_MS", 50)) / 1000.0
+    if wait_s <= 0:
+        return
+    with _interactive_idle:
+        if _stats[INTERACTIVE].active_requests:
+            _stats[HEAVY].yields += 1
+            _interactive_idle.wait_for(lambda: _stats[INTERACTIVE].active_requests == 0, timeout=wait_s)
+
+
+def foreground_active() -> int:
+    """Interactive and heavy requests running now (background work waits for zero)."""
+    with _lock:
+        return _stats[INTERACTIVE].active_requests + _stats[HEAVY].active_requests
+
+
+async def to_thread(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """`asyncio.to_thread` on the current lane's pool (context, e.g. the deadline, propagates)."""
+
+    lane = current_lane()
+    if lane is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    with _lock:
+        _stats[lane].submitted += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(lane), _run_tracked, lane, time.perf_counter(), call)
+
+
+def lane_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "enabled": lanes_enabled(),
+            "heavy_min_agents": heavy_min_agents(),
+            "lanes": {
+                lane: {
+                    "threads": _executors[lane]._max_workers if lane in _executors else lane_threads(lane),
+                    "submitted": s.submitted,
+                    "completed": s.completed,
+                    "in_flight": s.in_flight,
+                    "active_requests": s.active_requests,
+                    "yields": s.yields,
+                    "queue_wait_ms": s.queue_wait_ms.snapshot(),
+                }
+                for lane, s in _stats.items()
+            },
+        }
@@ -0,0 +1,761 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# ============================================================
+# STORE LOCATION
+# ============================================================
+
+MILESTONE3_DIR = Path(__file__).resolve().parents[1]
+MEMORY_DIR = MILESTONE3_DIR / "outputs" / "api_memory"
+MEMORY_DB_PATH = Path(os.getenv("MEMORY_DB_PATH") or (MEMORY_DIR / "memory.sqlite3"))
+
+_init_lock = threading.Lock()
+_initialized_paths: set[str] = set()
+
+
+# ============================================================
+# DB CONNECTION
+# ============================================================
+
+def _connect() -> sqlite3.Connection:
+    """Open a WAL-mode connection.
+
+    WAL lets readers proceed while a writer appends; concurrent writers are
+    serialized by SQLite (busy timeout) instead of overwriting each other.
+    """
+
+    MEMORY_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(MEMORY_DB_PATH, timeout=30.0)
+    con.row_factory = sqlite3.Row
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+
+def init_store() -> None:
+    key = str(MEMORY_DB_PATH)
+    if key in _initialized_paths:
+        return
+
+    with _init_lock:
+        if key in _initialized_paths:
+            return
+
+        with closing(_connect()) as con, con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS memory_records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    contract_id TEXT NOT NULL,
+                    contract_sha TEXT,
+                    pipeline_version TEXT,
+                    record_type TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    intent TEXT,
+                    tone TEXT,
+                    embedder TEXT,
+                    embedding BLOB,
+                    embedding_dim INTEGER,
+                    final_json TEXT NOT NULL,
+                    report TEXT,
+                    compacted INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+            _ensure_columns(con, "memory_records", {
+                "contract_sha": "TEXT",
+                "pipeline_version": "TEXT",
+                "compacted": "INTEGER NOT NULL DEFAULT 0",
+            })
+
+            con.execute("""
+                CREATE INDEX IF NOT EXISTS idx_memory_contract_latest
+                ON memory_records(contract_id, id DESC)
+            """)
+
+            # One row per (caller, contract_id, text): a reused id never overwrites another
+            # caller's contract, nor a text an earlier analysis still points at.
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS contract_texts (
+                    owner TEXT NOT NULL,
+                    contract_id TEXT NOT NULL,
+                    contract_sha TEXT NOT NULL,
+                    contract_text TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (owner, contract_id, contract_sha)
+                )
+            """)
+            con.execute("""
+                CREATE INDEX IF NOT EXISTS idx_contract_texts_sha
+                ON contract_texts(contract_sha)
+            """)
+            if con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contracts'").fetchone():
+                # Texts stored before ownership was tracked belong to the anonymous bucket.
+                con.execute("""
+                    INSERT OR IGNORE INTO contract_texts(owner, contract_id, contract_sha, contract_text, updated_at)
+                    SELECT ?, contract_id, contract_sha, contract_text, updated_at FROM contracts
+                """, (ANONYMOUS_OWNER,))
+                con.execute("DROP TABLE contracts")
+
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    contract_id TEXT NOT NULL,
+                    contract_sha TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    params TEXT NOT NULL
+                )
+            """)
+
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_sections (
+                    analysis_id TEXT NOT NULL,
+                    agent_type TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (analysis_id, agent_type)
+                )
+            """)
+
+        _initialized_paths.add(key)
+
+    _import_legacy_json_files()
+
+
+def _ensure_columns(con: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
+    """Add columns introduced after a database file was first created."""
+
+    existing = {r["name"] for r in con.execute(f"PRAGMA table_info({table})").fetchall()}
+    for name, decl in columns.items():
+        if name not in existing:
+            con.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _vec_to_blob(vec: Optional[np.ndarray]) -> Optional[bytes]:
+    if vec is None:
+        return None
+    return np.asarray(vec, dtype=np.float32).tobytes()
+
+
+def _blob_to_vec(blob: Optional[bytes], dim: Optional[int]) -> Optional[np.ndarray]:
+    if not blob:
+        return None
+    v = np.frombuffer(blob, dtype=np.float32)
+    if dim is not None and v.shape[0] != int(dim):
+        return None
+    return v
+
+
+def _list_to_vec(v: Any) -> Optional[np.ndarray]:
+    if not isinstance(v, list) or not v:
+        return None
+    try:
+        return np.asarray(v, dtype=np.float32)
+    except Exception:
+        return None
+
+
+def _row_to_record(row: sqlite3.Row, *, include_payload: bool) -> Dict[str, Any]:
+    rec: Dict[str, Any] = {
+        "id": row["id"],
+        "contract_id": row["contract_id"],
+        "contract_sha": row["contract_sha"],
+        "pipeline_version": row["pipeline_version"],
+        "type": row["record_type"],
+        "timestamp": row["created_at"],
+        "question": row["question"],
+        "intent": row["intent"],
+        "tone": row["tone"],
+        "embedder": row["embedder"],
+        "question_embedding": _blob_to_vec(row["embedding"], row["embedding_dim"]),
+    }
+    if include_payload:
+        try:
+            rec["final_json"] = json.loads(row["final_json"])
+        except Exception:
+            rec["final_json"] = {}
+        rec["report"] = row["report"]
+    return rec
+
+
+# ============================================================
+# WRITE / READ
+# ============================================================
+
+_SUMMARY_COLUMNS = (
+    "id, contract_id, contract_sha, pipeline_version, record_type, created_at, question, "
+    "intent, tone, embedder, embedding, embedding_dim"
+)
+
+
+def append_record(
+    *,
+    contract_id: str,
+    question: str,
+    final_json: Dict[str, Any],
+    report: Optional[str] = None,
+    intent: Optional[str] = None,
+    tone: Optional[str] = None,
+    embedder: Optional[str] = None,
+    embedding: Optional[np.ndarray] = None,
+    contract_sha: Optional[str] = None,
+    pipeline_version: Optional[str] = None,
+    record_type: str = "final",
+    created_at: Optional[str] = None,
+) -> int:
+    """Append one memory record. Never rewrites earlier records."""
+
+    init_store()
+    blob = _vec_to_blob(embedding)
+    dim = int(np.asarray(embedding).shape[-1]) if embedding is not None else None
+
+    with closing(_connect()) as con, con:
+        cur = con.execute("""
+            INSERT INTO memory_records(
+                contract_id, contract_sha, pipeline_version, record_type, created_at, question,
+                intent, tone, embedder, embedding, embedding_dim,
+                final_json, report
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            contract_id,
+            contract_sha,
+            pipeline_version,
+            record_type,
+            created_at or _utc_now_iso(),
+            question or "",
+            intent,
+            tone,
+            embedder,
+            blob,
+            dim,
+            json.dumps(final_json, ensure_ascii=False, separators=(",", ":")),
+            report,
+        ))
+        return int(cur.lastrowid)
+
+
+def latest_records(
+    contract_id: str,
+    *,
+    limit: int = 50,
+    include_payload: bool = True,
+) -> List[Dict[str, Any]]:
+    """Return up to `limit` most recent records for a contract, newest first."""
+
+    init_store()
+    cols = _SUMMARY_COLUMNS
+    if include_payload:
+        cols += ", final_json, report"
+
+    with closing(_connect()) as con:
+        rows = con.execute(f"""
+            SELECT {cols}
+            FROM memory_records
+            WHERE contract_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (contract_id, max(0, int(limit)))).fetchall()
+
+    return [_row_to_record(r, include_payload=include_payload) for r in rows]
+
+
+def get_record(record_id: int) -> Optional[Dict[str, Any]]:
+    init_store()
+    with closing(_connect()) as con:
+        row = con.execute(f"""
+            SELECT {_SUMMARY_COLUMNS}, final_json, report
+            FROM memory_records
+            WHERE id = ?
+        """, (int(record_id),)).fetchone()
+    return _row_to_record(row, include_payload=True) if row else None
+
+
+def count_records(contract_id: Optional[str] = None) -> int:
+    init_store()
+    with closing(_connect()) as con:
+        if contract_id is None:
+            row = con.execute("SELECT COUNT(*) AS n FROM memory_records").fetchone()
+        else:
+            row = con.execute(
+                "SELECT COUNT(*) AS n FROM memory_records WHERE contract_id = ?",
+                (contract_id,)
+            ).fetchone()
+    return int(row["n"]) if row else 0
+
+
+# ============================================================
+# CONTRACT TEXTS
+# ============================================================
+
+ANONYMOUS_OWNER = "anonymous"
+ANALYSIS_OWNER = ""  # texts kept for lazy analyses; no caller's by-id lookup sees them
+
+_known_contracts: set[tuple] = set()
+
+
+def save_contract_text(contract_id: str, contract_text: str, owner: str = ANONYMOUS_OWNER) -> None:
+    """Remember the text behind `owner`'s contract_id so their later calls can refer to it by id.
+
+    Texts are keyed by owner, id and content hash; the newest one wins a by-id lookup.
+    """
+
+    sha = hashlib.sha256((contract_text or "").encode("utf-8", errors="ignore")).hexdigest()
+    known_key = (str(MEMORY_DB_PATH), owner, contract_id, sha)
+    if known_key in _known_contracts:
+        return
+
+    init_store()
+    with closing(_connect()) as con, con:
+        con.execute("""
+            INSERT INTO contract_texts(owner, contract_id, contract_sha, contract_text, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(owner, contract_id, contract_sha) DO UPDATE SET
+                updated_at = excluded.updated_at
+        """, (owner, contract_id, sha, contract_text, _utc_now_iso()))
+    _known_contracts.add(known_key)
+
+
+def load_contract_text(contract_id: str, owner: str = ANONYMOUS_OWNER) -> Optional[str]:
+    """The newest text `owner` stored under `contract_id`; other callers' ids are invisible."""
+
+    init_store()
+    with closing(_connect()) as con:
+        row = con.execute("""
+            SELECT contract_text FROM contract_texts
+            WHERE owner = ? AND contract_id = ?
+            ORDER BY updated_at DESC
+            LIMIT 1
+        """, (owner, contract_id)).fetchone()
+    return row["contract_text"] if row else None
+
+
+def load_contract_text_by_sha(contract_sha: str) -> Optional[str]:
+    """A stored text with this content hash, whoever stored it (for analyses that recorded it)."""
+
+    init_store()
+    with closing(_connect()) as con:
+        row = con.execute(
+            "SELECT contract_text FROM contract_texts WHERE contract_sha = ? LIMIT 1",
+            (contract_sha,)
+        ).fetchone()
+    return row["contract_text"] if row else None
+
+
+# ============================================================
+# LAZY ANALYSES
+# ============================================================
+
+def save_analysis(analysis_id: str, *, contract_id: str, contract_sha: str, params: Dict[str, Any]) -> None:
+    """Remember what an analysis with deferred agent sections needs to compute them later."""
+
+    init_store()
+    with closing(_connect()) as con, con:
+        con.execute("""
+            INSERT OR IGNORE INTO analyses(analysis_id, contract_id, contract_sha, created_at, params)
+            VALUES (?, ?, ?, ?, ?)
+        """, (analysis_id, contract_id, contract_sha, _utc_now_iso(), json.dumps(params, separators=(",", ":"))))
+
+
+def get_analysis(analysis_id: str) -> Optional[Dict[str, Any]]:
+    init_store()
+    with closing(_connect()) as con:
+        row = con.execute(
+            "SELECT contract_id, contract_sha, created_at, params FROM analyses WHERE analysis_id = ?",
+            (analysis_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "analysis_id": analysis_id,
+        "contract_id": row["contract_id"],
+        "contract_sha": row["contract_sha"],
+        "created_at": row["created_at"],
+        "params": json.loads(row["params"]),
+    }
+
+
+def save_analysis_section(analysis_id: str, agent_type: str, result: Dict[str, Any]) -> None:
+    init_store()
+    with closing(_connect()) as con, con:
+        con.execute("""
+            INSERT OR REPLACE INTO analysis_sections(analysis_id, agent_type, created_at, result)
+            VALUES (?, ?, ?, ?)
+        """, (analysis_id, agent_type, _utc_now_iso(), json.dumps(result, ensure_ascii=False, separators=(",", ":"))))
+
+
+def get_analysis_section(analysis_id: str, agent_type: str) -> Optional[Dict[str, Any]]:
+    init_store()
+    with closing(_connect()) as con:
+        row = con.execute(
+            "SELECT result FROM analysis_sections WHERE analysis_id = ? AND agent_type = ?",
+            (analysis_id, agent_type)
+        ).fetchone()
+    return json.loads(row["result"]) if row else None
+
+
+# ============================================================
+# LEGACY MIGRATION
+# ============================================================
+
+_LEGACY_CLAIM_SUFFIXES = (".json.importing", ".json.reimporting")
+
+
+def _import_legacy_json_files() -> None:
+    """One-time import of the old per-contract `api_memory/<contract_id>.json` files.
+
+    A file is claimed by renaming it to `*.json.importing` and renamed to `*.json.imported`
+    once all its records are in. A claim left behind by a crash is taken over on a later
+    startup once it is older than `MEMORY_IMPORT_STALE_S` (default 60); records already
+    imported are skipped, so the retry does not duplicate them.
+    """
+
+    if not MEMORY_DIR.exists():
+        return
+
+    for p in sorted(MEMORY_DIR.glob("*.json")):
+        # Claim the file first so concurrent workers do not import it twice.
+        claimed = p.with_suffix(".json.importing")
+        try:
+            p.rename(claimed)
+        except OSError:
+            continue
+        _import_legacy_file(claimed, p.stem)
+
+    stale_s = float(os.getenv("MEMORY_IMPORT_STALE_S", "60"))
+    now = datetime.now(timezone.utc).timestamp()
+    for suffix, retake_suffix in zip(_LEGACY_CLAIM_SUFFIXES, reversed(_LEGACY_CLAIM_SUFFIXES)):
+        for leftover in sorted(MEMORY_DIR.glob(f"*{suffix}")):
+            contract_id = leftover.name[: -len(suffix)]
+            retaken = MEMORY_DIR / f"{contract_id}{retake_suffix}"
+            try:
+                # A rename updates ctime, so a claim that is still moving belongs to a live worker.
+                if now - leftover.stat().st_ctime < stale_s:
+                    continue
+                leftover.rename(retaken)
+            except OSError:
+                continue
+            _import_legacy_file(retaken, contract_id)
+
+
+def _import_legacy_file(claimed: Path, contract_id: str) -> None:
+    try:
+        records = json.loads(claimed.read_text(encoding="utf-8"))
+        # Untimestamped records get the file's mtime, so a retry recognizes them too.
+        file_ts = datetime.fromtimestamp(claimed.stat().st_mtime, timezone.utc).isoformat()
+    except Exception:
+        records, file_ts = [], None
+    if not isinstance(records, list):
+        records = []
+
+    with closing(_connect()) as con:
+        imported = {
+            (r["created_at"], r["question"], r["record_type"])
+            for r in con.execute(
+                "SELECT created_at, question, record_type FROM memory_records WHERE contract_id = ?",
+                (contract_id,)
+            )
+        }
+
+    for rec in records:
+        if not isinstance(rec, dict):
+            continue
+        final_json = rec.get("final_json") or {}
+        key = (rec.get("timestamp") or file_ts, rec.get("question") or "", rec.get("type") or "final")
+        if key in imported:
+            continue
+        append_record(
+            contract_id=contract_id,
+            question=key[1],
+            final_json=final_json,
+            intent=final_json.get("intent") if isinstance(final_json, dict) else None,
+            embedding=_list_to_vec(rec.get("question_embedding")),
+            record_type=key[2],
+            created_at=key[0],
+        )
+        imported.add(key)
+
+    try:
+        claimed.rename(MEMORY_DIR / f"{contract_id}.json.imported")
+    except OSError:
+        pass
+
+
+# ============================================================
+# RETENTION / COMPACTION
+# ============================================================
+
+# Per-agent debug payloads that dominate record size and are never read back.
+BULKY_AGENT_FIELDS = ["retrieval"]
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Limits applied by `compact_store`. Zero disables a limit."""
+
+    max_records_per_contract: int = 200
+    max_age_days: float = 90.0
+    max_total_bytes: int = 512 * 1024 * 1024
+
+
+def load_retention_policy_from_env() -> RetentionPolicy:
+    return RetentionPolicy(
+        max_records_per_contract=int(os.getenv("MEMORY_MAX_RECORDS_PER_CONTRACT", "200")),
+        max_age_days=float(os.getenv("MEMORY_MAX_AGE_DAYS", "90")),
+        max_total_bytes=int(os.getenv("MEMORY_MAX_TOTAL_BYTES", str(512 * 1024 * 1024))),
+    )
+
+
+_stats_lock = threading.Lock()
+_eviction_stats: Dict[str, Any] = {
+    "runs": 0,
+    "last_run_at": None,
+    "evicted_age": 0,
+    "evicted_per_contract": 0,
+    "evicted_duplicates": 0,
+    "evicted_bytes_budget": 0,
+    "stripped_records": 0,
+}
+
+_PAYLOAD_BYTES_SQL = "LENGTH(final_json) + IFNULL(LENGTH(embedding), 0) + IFNULL(LENGTH(report), 0)"
+
+
+def _strip_bulky_fields(final_json: Dict[str, Any]) -> Dict[str, Any]:
+    agents = final_json.get("agent_analysis")
+    if isinstance(agents, dict):
+        for sec in agents.values():
+            if isinstance(sec, dict):
+                for field in BULKY_AGENT_FIELDS:
+                    sec.pop(field, None)
+    return final_json
+
+
+def _delete_ids(con: sqlite3.Connection, ids: List[int]) -> int:
+    n = 0
+    for i in range(0, len(ids), 500):
+        batch = ids[i : i + 500]
+        marks = ",".join("?" for _ in batch)
+        n += con.execute(f"DELETE FROM memory_records WHERE id IN ({marks})", batch).rowcount or 0
+    return n
+
+
+# One pass at a time per process (background loop or manual trigger), and manual
+# passes at most every MEMORY_COMPACT_MIN_INTERVAL_S seconds.
+_compact_lock = threading.Lock()
+_last_compact_at = [float("-inf")]  # time.monotonic() at the end of the last pass
+
+
+class CompactionBusy(Exception):
+    """A manual compaction was refused: one is running, or one ran too recently."""
+
+    def __init__(self, reason: str, retry_after_s: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+def compact_store(policy: Optional[RetentionPolicy] = None) -> Dict[str, int]:
+    """Apply retention limits, drop duplicate questions and strip bulky fields.
+
+    Order: max age (records and lazy analyses) -> duplicates (newest kept) ->
+    max records per contract -> total byte budget (oldest first) ->
+    strip `agent_analysis.*.retrieval`. Waits for a pass already running.
+    """
+
+    with _compact_lock:
+        return _compact_locked(policy)
+
+
+def try_compact_store(min_interval_s: Optional[float] = None) -> Dict[str, int]:
+    """Manual trigger: `compact_store`, unless a pass is running or the last one ended less
+    than `min_interval_s` (MEMORY_COMPACT_MIN_INTERVAL_S, default 60) ago."""
+
+    if min_interval_s is None:
+        min_interval_s = float(os.getenv("MEMORY_COMPACT_MIN_INTERVAL_S", "60"))
+    if not _compact_lock.acquire(blocking=False):
+        raise CompactionBusy("already running", 1.0)
+    try:
+        since = time.monotonic() - _last_compact_at[0]
+        if since < min_interval_s:
+            raise CompactionBusy("ran recently", min_interval_s - since)
+        return _compact_locked(None)
+    finally:
+        _compact_lock.release()
+
+
+def _compact_locked(policy: Optional[RetentionPolicy]) -> Dict[str, int]:
+    try:
+        return _compact(policy)
+    finally:
+        _last_compact_at[0] = time.monotonic()
+
+
+def _compact(policy: Optional[RetentionPolicy]) -> Dict[str, int]:
+    init_store()
+    policy = policy or load_retention_policy_from_env()
+    result = {"age": 0, "duplicates": 0, "per_contract": 0, "bytes_budget": 0, "stripped": 0}
+
+    with closing(_connect()) as con, con:
+        if policy.max_age_days > 0:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=policy.max_age_days)).isoformat()
+            result["age"] = con.execute(
+                "DELETE FROM memory_records WHERE created_at < ?",
+                (cutoff,)
+            ).rowcount or 0
+            con.execute("DELETE FROM analysis_sections WHERE created_at < ?", (cutoff,))
+            con.execute("DELETE FROM analyses WHERE created_at < ?", (cutoff,))
+            if con.execute("""
+                DELETE FROM contract_texts
+                WHERE updated_at < ?
+                  AND contract_id NOT IN (SELECT DISTINCT contract_id FROM memory_records)
+                  AND contract_sha NOT IN (SELECT DISTINCT contract_sha FROM analyses)
+            """, (cutoff,)).rowcount:
+                _known_contracts.clear()
+
+        rows = con.execute("""
+            SELECT id, contract_id, contract_sha, pipeline_version, question, intent, tone, embedder
+            FROM memory_records
+            ORDER BY id DESC
+        """).fetchall()
+        seen: set[tuple] = set()
+        dupes: List[int] = []
+        for r in rows:
+            key = (
+                r["contract_id"],
+                r["contract_sha"],
+                r["pipeline_version"],
+                " ".join((r["question"] or "").split()).casefold(),
+                r["intent"],
+                r["tone"],
+                r["embedder"],
+            )
+            if key in seen:
+                dupes.append(int(r["id"]))
+            else:
+                seen.add(key)
+        result["duplicates"] = _delete_ids(con, dupes)
+
+        if policy.max_records_per_contract > 0:
+            result["per_contract"] = con.execute("""
+                DELETE FROM memory_records WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY contract_id ORDER BY id DESC) AS rn
+                        FROM memory_records
+                    )
+                    WHERE rn > ?
+                )
+            """, (policy.max_records_per_contract,)).rowcount or 0
+
+        for r in con.execute(
+            "SELECT id, final_json FROM memory_records WHERE compacted = 0"
+        ).fetchall():
+            try:
+                fj = _strip_bulky_fields(json.loads(r["final_json"]))
+            except Exception:
+                continue
+            con.execute(
+                "UPDATE memory_records SET final_json = ?, compacted = 1 WHERE id = ?",
+                (json.dumps(fj, ensure_ascii=False, separators=(",", ":")), r["id"])
+            )
+            result["stripped"] += 1
+
+        if policy.max_total_bytes > 0:
+            total = con.execute(f"SELECT IFNULL(SUM({_PAYLOAD_BYTES_SQL}), 0) AS n FROM memory_records").fetchone()["n"]
+            excess = int(total) - int(policy.max_total_bytes)
+            if excess > 0:
+                victims: List[int] = []
+                for r in con.execute(f"SELECT id, {_PAYLOAD_BYTES_SQL} AS n FROM memory_records ORDER BY id ASC"):
+                    if excess <= 0:
+                        break
+                    victims.append(int(r["id"]))
+                    excess -= int(r["n"] or 0)
+                result["bytes_budget"] = _delete_ids(con, victims)
+
+    with closing(_connect()) as con:
+        # Hand freed pages back to the filesystem once deletions pile up.
+        pages = con.execute("PRAGMA page_count").fetchone()[0]
+        free = con.execute("PRAGMA freelist_count").fetchone()[0]
+        if pages and free * 2 > pages:
+            con.execute("VACUUM")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    with _stats_lock:
+        _eviction_stats["runs"] += 1
+        _eviction_stats["last_run_at"] = _utc_now_iso()
+        _eviction_stats["evicted_age"] += result["age"]
+        _eviction_stats["evicted_duplicates"] += result["duplicates"]
+        _eviction_stats["evicted_per_contract"] += result["per_contract"]
+        _eviction_stats["evicted_bytes_budget"] += result["bytes_budget"]
+        _eviction_stats["stripped_records"] += result["stripped"]
+
+    return result
+
+
+def store_stats() -> Dict[str, Any]:
+    """Store size and cumulative eviction counters (for the admin endpoint)."""
+
+    init_store()
+    with closing(_connect()) as con:
+        row = con.execute(f"""
+            SELECT COUNT(*) AS records,
+                   COUNT(DISTINCT contract_id) AS contracts,
+                   IFNULL(SUM({_PAYLOAD_BYTES_SQL}), 0) AS payload_bytes
+            FROM memory_records
+        """).fetchone()
+
+    file_bytes = 0
+    for suffix in ("", "-wal", "-shm"):
+        p = Path(str(MEMORY_DB_PATH) + suffix)
+        if p.exists():
+            file_bytes += p.stat().st_size
+
+    with _stats_lock:
+        evictions = dict(_eviction_stats)
+
+    return {
+        "path": str(MEMORY_DB_PATH),
+        "records": int(row["records"]),
+        "contracts": int(row["contracts"]),
+        "payload_bytes": int(row["payload_bytes"]),
+        "file_bytes": file_bytes,
+        "policy": load_retention_policy_from_env().__dict__,
+        "evictions": evictions,
+    }
+
+
+async def compactor_loop(interval_s: Optional[float] = None) -> None:
+    """Background task: run `compact_store` every MEMORY_COMPACT_INTERVAL_S seconds (0 disables)."""
+
+    if interval_s is None:
+        interval_s = float(os.getenv("MEMORY_COMPACT_INTERVAL_S", "600"))
+    if interval_s <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await asyncio.to_thread(compact_store)
+        except Exception:
+            # Compaction is maintenance; a failed run is retried next interval.
+            pass
@@ -0,0 +1,417 @@
+"""Speculative background work: upload pre-ingest and follow-up prefetch.
+
+Pre-ingest: the dashboard shows a preview of an uploaded contract and waits for the
+user to confirm. `schedule_ingest` (`POST /ingest`, fired at upload) uses that time to
+build the contract's index (kept in the index LRU) and to run the analysis the client
+says it will request first, so its executive sections and the four agents' output are
+cached. The confirmed request is then an exact cache hit, or, with a different
+question, runs only its question-specific steps over the warm index.
+
+Follow-up prefetch: after the first analysis of a contract, users nearly always ask about payment,
+termination, liability, the SLA and privacy next (topics `_requested_topics` routes on).
+Once that first response has been sent, `schedule` queues `FOLLOW_UP_QUESTIONS` for the
+contract and a single background worker answers them with the same parameters the
+dashboard's follow-up box uses (`intent_override="qa"`, same tone, threshold and
+profile). The answers land in the result cache (the same question is an exact hit), the
+memory store (close paraphrases are recalled) and the section cache (other paraphrases
+skip answer formatting), so the follow-up doesn't wait for the pipeline.
+
+Both only use spare capacity. One worker runs the jobs, pre-ingest first:
+
+- it runs in the `background` lane (one thread by default, see `lanes.py`), and before
+  each step (index, analysis, question) waits until no interactive or heavy request is
+  running;
+- after each step it rests long enough to stay under `PREFETCH_MAX_BUSY` of the
+  wall clock;
+- each step is bounded (`PREFETCH_DEADLINE_MS`, `INGEST_DEADLINE_MS`); a cut-short
+  result is not cached;
+- it is charged to the daily compute quota of the caller who triggered it, and skipped
+  once that quota is exhausted.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple, TypeVar
+
+from milestone3.backend import admission, lanes
+from milestone3.backend.db_sqlite import ANONYMOUS_USER, quota_status, record_usage
+from milestone3.backend.deadlines import Deadline
+from milestone3.backend.result_cache import LRUCache
+
+T = TypeVar("T")
+
+# (topic, question): one standard follow-up per topic.
+FOLLOW_UP_QUESTIONS: Tuple[Tuple[str, str], ...] = (
+    ("payment", "What are the payment terms?"),
+    ("termination", "What are the termination conditions?"),
+    ("liability", "What is the limitation of liability?"),
+    ("sla", "What are the SLA and service credits?"),
+    ("privacy", "What are the data privacy obligations?"),
+)
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def prefetch_enabled() -> bool:
+    return os.getenv("PREFETCH", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def max_busy() -> float:
+    """`PREFETCH_MAX_BUSY` (default 0.5): share of wall-clock time the worker may compute."""
+    return min(1.0, max(0.01, _env_float("PREFETCH_MAX_BUSY", 0.5)))
+
+
+# ============================================================
+# JOBS
+# ============================================================
+
+@dataclass(frozen=True)
+class PrefetchJob:
+    """Follow-ups to prefetch for one analysed contract, with the caller's parameters."""
+
+    contract_text: str
+    contract_id: str
+    tone: str = "executive"
+    no_evidence_threshold: float = 0.25
+    profile: Optional[str] = None
+    user: str = ANONYMOUS_USER
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        # Follow-ups are cached per contract and parameters, not per user.
+        sha = hashlib.sha256(self.contract_text.encode("utf-8", errors="ignore")).hexdigest()
+        return (sha, self.contract_id, (self.tone or "").strip().lower(), float(self.no_evidence_threshold), self.profile)
+
+
+@dataclass(frozen=True)
+class IngestJob:
+    """An uploaded contract to index and analyse before the client asks.
+
+    The analysis parameters are those of the request the client will send on confirm.
+    """
+
+    contract_text: str
+    contract_id: str
+    question: str = "Provide a risk analysis of this contract"
+    tone: str = "executive"
+    no_evidence_threshold: float = 0.25
+    intent_override: Optional[str] = "risk_analysis"
+    run_all_agents: bool = True
+    profile: Optional[str] = None
+    user: str = ANONYMOUS_USER
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        sha = hashlib.sha256(self.contract_text.encode("utf-8", errors="ignore")).hexdigest()
+        return (
+            sha, self.contract_id, self.question, (self.tone or "").strip().lower(), float(self.no_evidence_threshold),
+            self.intent_override, self.run_all_agents, self.profile,
+        )
+
+
+_lock = threading.Lock()
+_queue: Deque[PrefetchJob] = deque()
+_ingest_queue: Deque[IngestJob] = deque()
+_ingesting: Set[Tuple[Any, ...]] = set()
+_seen = LRUCache(max_entries=max(1, _env_int("PREFETCH_SEEN_MAX", 1024)))
+_counters = {
+    "ingest_scheduled": 0,
+    "ingested": 0,
+    "scheduled": 0,
+    "dropped": 0,
+    "skipped_quota": 0,
+    "skipped_busy": 0,
+    "questions": 0,
+    "already_cached": 0,
+    "truncated": 0,
+    "errors": 0,
+    "idle_waits": 0,
+}
+_busy_s = [0.0]
+
+# Set by run_prefetch_worker: nothing is queued while no worker is running.
+_wakeup: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def schedule(job: PrefetchJob) -> bool:
+    """Queue `job` unless its contract was already prefetched with these parameters.
+
+    The queue holds `PREFETCH_QUEUE_MAX` jobs (default 32); when full, the oldest job is
+    dropped, since follow-ups to the most recent analyses are the likeliest.
+    """
+
+    if not prefetch_enabled() or _wakeup is None:
+        return False
+    key = job.key
+    with _lock:
+        if key in _seen:
+            return False
+        _seen.put(key, True)
+        _queue.append(job)
+        _counters["scheduled"] += 1
+        while len(_queue) > max(1, _env_int("PREFETCH_QUEUE_MAX", 32)):
+            _queue.popleft()
+            _counters["dropped"] += 1
+    if _loop is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+    return True
+
+
+def schedule_ingest(job: IngestJob) -> bool:
+    """Queue `job` unless the same upload is already queued or being ingested.
+
+    Uploading the same contract again re-queues it; the index and analysis are then
+    cache hits unless they were evicted.
+    """
+
+    if not prefetch_enabled() or _wakeup is None:
+        return False
+    key = job.key
+    with _lock:
+        if key in _ingesting:
+            return False
+        _ingesting.add(key)
+        _ingest_queue.append(job)
+        _counters["ingest_scheduled"] += 1
+        while len(_ingest_queue) > max(1, _env_int("PREFETCH_QUEUE_MAX", 32)):
+            _ingesting.discard(_ingest_queue.popleft().key)
+            _counters["dropped"] += 1
+    if _loop is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+    return True
+
+
+# ============================================================
+# RUNNING
+# ============================================================
+
+async def _wait_for_idle() -> None:
+    poll_s = max(1, _env_int("PREFETCH_IDLE_POLL_MS", 100)) / 1000.0
+    waited = False
+    while lanes.foreground_active():
+        waited = True
+        await asyncio.sleep(poll_s)
+    if waited:
+        _count("idle_waits")
+
+
+async def _quota_limits(user: str) -> Optional[Dict[str, Any]]:
+    """`user`'s limits, or None once their daily quota is spent."""
+
+    quota = await asyncio.to_thread(quota_status, user)
+    if quota["remaining_s"] is not None and quota["remaining_s"] <= 0:
+        return None
+    return quota["limits"]
+
+
+async def _background_step(user: str, work: Callable[[], Awaitable[T]], *, yield_to_foreground: bool) -> Optional[T]:
+    """Run one unit of speculative work when the server is idle; None if `user` is out of
+    quota or admission control sheds it.
+
+    The work holds one of `user`'s admission slots in the current lane (so it counts
+    against their concurrency cap and fair share), its time is charged to `user`, then
+    the worker rests to keep within `max_busy()`.
+    """
+
+    if yield_to_foreground:
+        await _wait_for_idle()
+    limits = await _quota_limits(user)
+    if limits is None:
+        _count("skipped_quota")
+        return None
+    try:
+        async with admission.admit(
+            None,
+            lanes.current_lane(),
+            user=user,
+            weight=limits["weight"],
+            max_user_concurrent=limits["max_concurrent"],
+        ):
+            started = time.perf_counter()
+            try:
+                return await work()
+            finally:
+                elapsed = time.perf_counter() - started
+                with _lock:
+                    _busy_s[0] += elapsed
+                await asyncio.to_thread(record_usage, user, compute_s=elapsed)
+                if yield_to_foreground:
+                    # Duty cycle: compute at most max_busy() of the time.
+                    await asyncio.sleep(elapsed * (1.0 / max_busy() - 1.0))
+    except admission.AdmissionRejected:
+        _count("skipped_busy")
+        return None
+
+
+def _deadline(name: str, default_ms: float) -> Deadline:
+    budget_ms = _env_float(name, default_ms)
+    return Deadline(budget_ms / 1000.0 if budget_ms > 0 else None)
+
+
+def _background_lane() -> Optional[str]:
+    return lanes.BACKGROUND if lanes.lanes_enabled() else None
+
+
+async def run_job(job: PrefetchJob, *, yield_to_foreground: bool = True) -> Dict[str, int]:
+    """Answer every follow-up of `job` (one at a time) through `run_full_pipeline`."""
+
+    from milestone3.backend.contract_pipeline import cached_contract_index, run_full_pipeline
+
+    done = {"questions": 0, "already_cached": 0, "truncated": 0, "errors": 0}
+
+    async def answer(question: str) -> Dict[str, Any]:
+        # Every follow-up searches the same index (built on the first, if not warm).
+        index = await cached_contract_index(job.contract_text, profile=job.profile)
+        final_json, _ = await run_full_pipeline(
+            contract_text=job.contract_text,
+            question=question,
+            tone=job.tone,
+            contract_id=job.contract_id,
+            no_evidence_threshold=job.no_evidence_threshold,
+            intent_override="qa",
+            index=index,
+            deadline=_deadline("PREFETCH_DEADLINE_MS", 10000.0),
+            profile=job.profile,
+        )
+        return final_json
+
+    with lanes.use_lane(_background_lane()):
+        for _, question in FOLLOW_UP_QUESTIONS:
+            try:
+                final_json = await _background_step(
+                    job.user, functools.partial(answer, question), yield_to_foreground=yield_to_foreground
+                )
+            except Exception:
+                done["errors"] += 1
+                continue
+            if final_json is None:
+                break
+            done["questions"] += 1
+            if final_json.get("cache") is not None:
+                done["already_cached"] += 1
+            if final_json.get("truncated"):
+                done["truncated"] += 1
+
+    for name, n in done.items():
+        _count(name, n)
+    return done
+
+
+async def run_ingest(job: IngestJob, *, yield_to_foreground: bool = True) -> Dict[str, Any]:
+    """Index `job`'s contract, then run the analysis the client will ask for first.
+
+    Both land where the confirmed request looks: the index in the index LRU, the
+    analysis (executive sections and the four agents' output) in the result and
+    section caches.
+    """
+
+    from milestone3.backend.contract_pipeline import cached_contract_index, run_full_pipeline
+
+    out: Dict[str, Any] = {"indexed": False, "analysed": False, "truncated": False}
+
+    async def index() -> bool:
+        await cached_contract_index(job.contract_text, profile=job.profile)
+        return True
+
+    async def analyse() -> Dict[str, Any]:
+        final_json, _ = await run_full_pipeline(
+            contract_text=job.contract_text,
+            question=job.question,
+            tone=job.tone,
+            contract_id=job.contract_id,
+            no_evidence_threshold=job.no_evidence_threshold,
+            intent_override=job.intent_override,
+            run_all_agents=job.run_all_agents,
+            deadline=_deadline("INGEST_DEADLINE_MS", 60000.0),
+            profile=job.profile,
+        )
+        return final_json
+
+    try:
+        with lanes.use_lane(_background_lane()):
+            out["indexed"] = bool(await _background_step(job.user, index, yield_to_foreground=yield_to_foreground))
+            if out["indexed"]:
+                final_json = await _background_step(job.user, analyse, yield_to_foreground=yield_to_foreground)
+                out["analysed"] = final_json is not None
+                out["truncated"] = bool(final_json and final_json.get("truncated"))
+    finally:
+        with _lock:
+            _ingesting.discard(job.key)
+    _count("ingested", int(out["analysed"]))
+    return out
+
+
+async def run_prefetch_worker() -> None:
+    """Run queued jobs one at a time until cancelled (started by the app lifespan).
+
+    Pre-ingest jobs go first: their user is reading the preview and about to confirm.
+    """
+
+    global _wakeup, _loop
+    _wakeup = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+    try:
+        while True:
+            with _lock:
+                if _ingest_queue:
+                    job = _ingest_queue.popleft()
+                else:
+                    job = _queue.popleft() if _queue else None
+            if job is None:
+                _wakeup.clear()
+                await _wakeup.wait()
+                continue
+            try:
+                if isinstance(job, IngestJob):
+                    await run_ingest(job)
+                else:
+                    await run_job(job)
+            except Exception:
+                # A failing quota lookup or ingest must not stop later jobs.
+                _count("errors")
+    finally:
+        _wakeup = None
+        _loop = None
+
+
+def prefetch_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "enabled": prefetch_enabled(),
+            "running": _wakeup is not None,
+            "queued": len(_queue),
+            "ingest_queued": len(_ingest_queue),
+            "contracts_seen": len(_seen),
+            "max_busy": max_busy(),
+            "busy_s": round(_busy_s[0], 3),
+            **_counters,
+        }
@@ -0,0 +1,111 @@
+"""Named analysis profiles: the knobs that trade speed for evidence quality.
+
+A caller picks `fast`, `balanced` (the default, same as before profiles existed) or
+`thorough` per request. A profile fixes:
+
+- `agent_top_k`: matches per agent query (`run_agent(top_k_per_query=...)`);
+- `agent_queries`: how many of an agent's `_agent_plan` queries run (primary first);
+- `topic_top_k`: matches per executive topic (`_extract_topic_statements`);
+- `evidence_items`: evidence snippets kept per agent;
+- `chunk_size` / `chunk_overlap`: how the contract is split for the index;
+- `llm_rewrite`: whether the optional Q&A rewriter runs.
+
+Load-adaptive degradation (`degradation.py`) only ever lowers these further.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass, replace
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from milestone3.backend.degradation import DegradationLevel
+
+DEFAULT_PROFILE = "balanced"
+
+
+@dataclass(frozen=True)
+class AnalysisProfile:
+    name: str
+    description: str
+    agent_top_k: int
+    agent_queries: int
+    topic_top_k: int
+    evidence_items: int
+    chunk_size: int
+    chunk_overlap: int
+    llm_rewrite: bool
+
+    def degraded(self, level: "DegradationLevel") -> "AnalysisProfile":
+        """This profile with a degradation level's limits applied on top."""
+        out = self
+        if level.top_k_per_query is not None:
+            out = replace(out, agent_top_k=min(out.agent_top_k, level.top_k_per_query))
+        if level.max_agent_queries is not None:
+            out = replace(out, agent_queries=min(out.agent_queries, level.max_agent_queries))
+        if not level.llm_rewrite:
+            out = replace(out, llm_rewrite=False)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+PROFILES: Dict[str, AnalysisProfile] = {
+    p.name: p
+    for p in (
+        AnalysisProfile(
+            name="fast",
+            description="Primary query per agent, shallow retrieval, coarse chunks, no LLM rewrite.",
+            agent_top_k=3,
+            agent_queries=1,
+            topic_top_k=4,
+            evidence_items=3,
+            chunk_size=1400,
+            chunk_overlap=100,
+            llm_rewrite=False,
+        ),
+        AnalysisProfile(
+            name="balanced",
+            description="Default: four queries per agent, top 5 matches each.",
+            agent_top_k=5,
+            agent_queries=4,
+            topic_top_k=6,
+            evidence_items=5,
+            chunk_size=900,
+            chunk_overlap=120,
+            llm_rewrite=True,
+        ),
+        AnalysisProfile(
+            name="thorough",
+            description="Deeper retrieval and more evidence per agent and topic.",
+            agent_top_k=8,
+            agent_queries=4,
+            topic_top_k=10,
+            evidence_items=8,
+            chunk_size=900,
+            chunk_overlap=120,
+            llm_rewrite=True,
+        ),
+    )
+}
+
+
+def default_profile_name() -> str:
+    """`ANALYSIS_PROFILE` (default `balanced`): profile for requests that don't pick one."""
+    name = os.getenv("ANALYSIS_PROFILE", DEFAULT_PROFILE).strip().lower()
+    return name if name in PROFILES else DEFAULT_PROFILE
+
+
+def get_profile(name: Optional[str] = None) -> AnalysisProfile:
+    """Profile by name (case-insensitive); `None`/empty means the default. Raises ValueError."""
+    key = (name or "").strip().lower() or default_profile_name()
+    profile = PROFILES.get(key)
+    if profile is None:
+        raise ValueError(f"Unknown profile {name!r}; expected one of: {', '.join(PROFILES)}")
+    return profile
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    return [p.to_dict() for p in PROFILES.values()]
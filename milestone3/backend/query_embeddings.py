@@ -0,0 +1,209 @@
+"""Query-embedding cache: precomputed static queries plus an LRU for everything else.
+
+Most retrieval queries are fixed strings (the agents' extra queries and the executive topic
+queries), yet every request used to re-encode them. Per embedder, this keeps:
+
+- a static table, filled once by `warm` (at startup) and persisted under
+  `QUERY_EMBED_DIR` as `<embedder>.npz`, so later processes (and process-pool workers)
+  load it instead of encoding;
+- a bounded LRU (`QUERY_EMBED_CACHE_MAX`, default 4096) for dynamic strings such as user
+  questions, which recur across contracts.
+
+Only query strings go through here; contract chunks are encoded directly.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from milestone3.backend.result_cache import MILESTONE3_DIR
+
+QUERY_EMBED_DIR = Path(os.getenv("QUERY_EMBED_DIR") or (MILESTONE3_DIR / "outputs" / "query_embeddings"))
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def cache_enabled() -> bool:
+    return os.getenv("QUERY_EMBED_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _store_path(embedder_name: str) -> Path:
+    return QUERY_EMBED_DIR / (re.sub(r"[^A-Za-z0-9._-]+", "_", embedder_name) + ".npz")
+
+
+# ============================================================
+# CACHE
+# ============================================================
+
+class QueryEmbeddingCache:
+    """Static table + LRU of normalized query vectors for one embedder (thread-safe)."""
+
+    def __init__(self, embedder_name: str, *, max_entries: int = 4096) -> None:
+        self.embedder_name = embedder_name
+        self.max_entries = max(0, int(max_entries))
+        self._static: Dict[str, np.ndarray] = {}
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.static_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def set_static(self, vectors: Dict[str, np.ndarray]) -> None:
+        frozen = {}
+        for text, vec in vectors.items():
+            vec = np.array(vec, dtype=np.float32)
+            vec.setflags(write=False)
+            frozen[text] = vec
+        with self._lock:
+            self._static = frozen
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._static.get(text)
+            if vec is not None:
+                self.static_hits += 1
+                return vec
+            vec = self._lru.get(text)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(text)
+            self.hits += 1
+            return vec
+
+    def put(self, text: str, vec: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        vec = np.array(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        with self._lock:
+            self._lru[text] = vec
+            self._lru.move_to_end(text)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.static_hits + self.hits + self.misses
+            return {
+                "static": len(self._static),
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "static_hits": self.static_hits,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": ((self.static_hits + self.hits) / lookups) if lookups else None,
+            }
+
+
+_caches: Dict[str, QueryEmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(embedder_name: str) -> QueryEmbeddingCache:
+    """Process-wide cache for one embedder; the persisted static table is loaded on first use."""
+
+    with _caches_lock:
+        cache = _caches.get(embedder_name)
+        if cache is None:
+            cache = QueryEmbeddingCache(embedder_name, max_entries=_env_int("QUERY_EMBED_CACHE_MAX", 4096))
+            cache.set_static(_load(embedder_name))
+            _caches[embedder_name] = cache
+        return cache
+
+
+def encode_queries(
+    embedder_name: str,
+    texts: Sequence[str],
+    encode_fn: Callable[[List[str]], np.ndarray],
+) -> np.ndarray:
+    """Normalized embeddings of `texts`; only strings not cached are passed to `encode_fn`."""
+
+    texts = list(texts)
+    if not cache_enabled() or not texts:
+        return encode_fn(texts)
+    cache = get_cache(embedder_name)
+    found = [cache.get(t) for t in texts]
+    missing = sorted({t for t, v in zip(texts, found) if v is None})
+    if missing:
+        fresh = dict(zip(missing, np.asarray(encode_fn(missing), dtype=np.float32)))
+        for t, vec in fresh.items():
+            cache.put(t, vec)
+        found = [v if v is not None else fresh[t] for t, v in zip(texts, found)]
+    return np.stack(found).astype(np.float32)
+
+
+# ============================================================
+# STATIC QUERIES
+# ============================================================
+
+def _load(embedder_name: str) -> Dict[str, np.ndarray]:
+    path = _store_path(embedder_name)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["embedder"]) != embedder_name:
+                return {}
+            return dict(zip((str(t) for t in data["texts"]), data["vectors"]))
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def _save(embedder_name: str, vectors: Dict[str, np.ndarray]) -> None:
+    path = _store_path(embedder_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    texts = sorted(vectors)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    np.savez(
+        tmp,
+        embedder=np.array(embedder_name),
+        texts=np.array(texts, dtype=str),
+        vectors=np.stack([vectors[t] for t in texts]).astype(np.float32),
+    )
+    os.replace(tmp, path)
+
+
+def warm(embedder_name: str, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray]) -> Dict[str, int]:
+    """Make `texts` the static table for `embedder_name`.
+
+    Vectors already persisted are reused; only new strings are encoded (in one call), and
+    the file is rewritten when the set of static queries changed.
+    """
+
+    wanted = sorted(set(t for t in texts if (t or "").strip()))
+    stored = _load(embedder_name)
+    missing = [t for t in wanted if t not in stored]
+    if missing:
+        stored.update(zip(missing, np.asarray(encode_fn(missing), dtype=np.float32)))
+    table = {t: stored[t] for t in wanted}
+    if missing or len(table) != len(stored):
+        _save(embedder_name, table)
+    get_cache(embedder_name).set_static(table)
+    return {"static": len(table), "encoded": len(missing)}
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _caches_lock:
+        items = list(_caches.items())
+    return {
+        "enabled": cache_enabled(),
+        "dir": str(QUERY_EMBED_DIR),
+        "embedders": {name: c.stats() for name, c in items},
+    }
@@ -0,0 +1,177 @@
+"""Request-wide retrieval planning.
+
+Without a plan every consumer queries the index on its own: each of the four agents
+re-embeds and re-searches the user's question, legal and finance both look up
+liability wording, and the executive sections add seven more topic queries. A
+`QueryPlan` collects every (query, top_k) a request needs up front, merges duplicates,
+embeds the unique queries in one `encode` call, searches each once at the largest
+top_k any consumer asked for, and hands every consumer its own prefix of the result.
+
+Two queries are merged when they have the same content words (case, punctuation,
+word order and stopwords ignored) or, with `QUERY_MERGE_MIN_SIM` < 1, when their
+embeddings are at least that similar.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from milestone3.backend.contract_pipeline import LocalRAGIndex, RetrievalMatch
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it its of on or the this that to what which with".split()
+)
+_WORD = re.compile(r"[a-z0-9%]+")
+
+# ============================================================
+# CONFIG
+# ============================================================
+
+def planner_enabled() -> bool:
+    return os.getenv("QUERY_PLANNER", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def merge_min_sim() -> float:
+    """`QUERY_MERGE_MIN_SIM` (default 1.0: only queries with the same content words merge)."""
+    try:
+        return float(os.getenv("QUERY_MERGE_MIN_SIM", "1.0"))
+    except ValueError:
+        return 1.0
+
+
+def query_key(text: str) -> Tuple[str, ...]:
+    """Content words of a query, sorted: equal keys retrieve the same evidence."""
+    words = {w for w in _WORD.findall((text or "").lower()) if w not in _STOPWORDS}
+    return tuple(sorted(words))
+
+
+# ============================================================
+# PLAN
+# ============================================================
+
+@dataclass
+class _Need:
+    text: str
+    top_k: int
+    consumers: List[str] = field(default_factory=list)
+    vector: Optional[np.ndarray] = None
+
+
+@dataclass(frozen=True)
+class PlanResults:
+    """Executed plan: matches per unique query (picklable, for process-pool workers)."""
+
+    matches: Dict[Tuple[str, ...], List["RetrievalMatch"]]
+    aliases: Dict[Tuple[str, ...], Tuple[str, ...]]
+
+    def get(self, query: str, top_k: int) -> Optional[List["RetrievalMatch"]]:
+        """The first `top_k` matches for `query`, or None if it wasn't planned."""
+        key = query_key(query)
+        hit = self.matches.get(self.aliases.get(key, key))
+        return None if hit is None else hit[: max(1, int(top_k))]
+
+
+class QueryPlan:
+    def __init__(self) -> None:
+        self._needs: Dict[Tuple[str, ...], _Need] = {}
+        self.requested = 0
+
+    def add(self, query: str, top_k: int, consumer: str, *, vector: Optional[np.ndarray] = None) -> None:
+        """Register one retrieval need. `vector` is the query's embedding if already known."""
+        if not (query or "").strip():
+            return
+        self.requested += 1
+        key = query_key(query)
+        need = self._needs.get(key)
+        if need is None:
+            need = self._needs[key] = _Need(text=query, top_k=int(top_k))
+        need.top_k = max(need.top_k, int(top_k))
+        need.consumers.append(consumer)
+        if vector is not None and need.vector is None:
+            need.vector = np.asarray(vector, dtype=np.float32)
+
+    @property
+    def unique(self) -> int:
+        return len(self._needs)
+
+    def execute(self, rag: "LocalRAGIndex") -> PlanResults:
+        """Embed the unique queries in one call and search each once (blocking).
+
+        Precomputed and recently seen query strings are not re-encoded (`query_embeddings`).
+        """
+
+        keys = list(self._needs)
+        missing = [k for k in keys if self._needs[k].vector is None]
+        if missing:
+            vecs = rag.encode_queries([self._needs[k].text for k in missing])
+            for k, v in zip(missing, vecs):
+                self._needs[k].vector = v
+
+        aliases = self._merge_similar(keys, merge_min_sim())
+        matches: Dict[Tuple[str, ...], List[RetrievalMatch]] = {}
+        for key in keys:
+            if key in aliases:
+                continue
+            need = self._needs[key]
+            top_k = max([need.top_k] + [self._needs[a].top_k for a, rep in aliases.items() if rep == key])
+            matches[key] = rag.query_vector(need.vector, top_k=top_k)
+        _record(self.requested, len(matches))
+        return PlanResults(matches=matches, aliases=aliases)
+
+    def _merge_similar(self, keys: List[Tuple[str, ...]], min_sim: float) -> Dict[Tuple[str, ...], Tuple[str, ...]]:
+        # Later queries whose embedding is close enough to an earlier one reuse its results.
+        if min_sim >= 1.0 or len(keys) < 2:
+            return {}
+        mat = np.stack([self._needs[k].vector for k in keys]).astype(np.float32)
+        norms = np.linalg.norm(mat, axis=1, keepdims=True)
+        mat = mat / np.where(norms == 0, 1.0, norms)
+        sims = mat @ mat.T
+        aliases: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        for j in range(1, len(keys)):
+            for i in range(j):
+                if keys[i] not in aliases and sims[i, j] >= min_sim:
+                    aliases[keys[j]] = keys[i]
+                    break
+        return aliases
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requested": self.requested,
+            "unique": self.unique,
+            "consumers": {" ".join(k) or "-": n.consumers for k, n in self._needs.items()},
+        }
+
+
+# ============================================================
+# STATS
+# ============================================================
+
+_lock = threading.Lock()
+_totals = {"plans": 0, "requested": 0, "executed": 0}
+
+
+def _record(requested: int, executed: int) -> None:
+    with _lock:
+        _totals["plans"] += 1
+        _totals["requested"] += requested
+        _totals["executed"] += executed
+
+
+def planner_stats() -> Dict[str, Any]:
+    with _lock:
+        totals = dict(_totals)
+    saved = totals["requested"] - totals["executed"]
+    return {
+        "enabled": planner_enabled(),
+        "merge_min_sim": merge_min_sim(),
+        **totals,
+        "saved": saved,
+        "saved_ratio": round(saved / totals["requested"], 3) if totals["requested"] else None,
+    }
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# ============================================================
+# CACHE LOCATION
+# ============================================================
+
+MILESTONE3_DIR = Path(__file__).resolve().parents[1]
+RESULT_CACHE_DB_PATH = Path(
+    os.getenv("RESULT_CACHE_DB_PATH") or (MILESTONE3_DIR / "outputs" / "result_cache.sqlite3")
+)
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# ============================================================
+# IN-MEMORY LRU
+# ============================================================
+
+class LRUCache:
+    """Small thread-safe LRU with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        # Membership test only: no hit/miss counted, recency unchanged.
+        with self._lock:
+            return key in self._data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else None,
+        }
+
+
+# ============================================================
+# FINGERPRINT
+# ============================================================
+
+def normalize_question(question: str) -> str:
+    return " ".join((question or "").split()).casefold()
+
+
+def analysis_fingerprint(
+    *,
+    contract_text: str,
+    contract_id: str,
+    question: str,
+    tone: str,
+    intent_override: Optional[str],
+    run_all_agents: bool,
+    no_evidence_threshold: float,
+    embedder: str,
+    pipeline_version: str,
+    profile: str = "balanced",
+    lazy_agents: bool = False,
+) -> str:
+    """Stable key for one analysis request: contract hash + every parameter that changes the output."""
+
+    parts = {
+        "contract_sha": hashlib.sha256((contract_text or "").encode("utf-8", errors="ignore")).hexdigest(),
+        "contract_id": contract_id,
+        "question": normalize_question(question),
+        "tone": (tone or "executive").strip().lower(),
+        "intent_override": (intent_override or "").strip().lower(),
+        "run_all_agents": bool(run_all_agents),
+        "no_evidence_threshold": round(float(no_evidence_threshold), 6),
+        "embedder": embedder,
+        "pipeline_version": pipeline_version,
+        "profile": profile,
+    }
+    if lazy_agents:
+        # Only when set, so existing fingerprints stay valid.
+        parts["lazy_agents"] = True
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# TWO-TIER RESULT CACHE
+# ============================================================
+
+class ResultCache:
+    """Exact-match cache of (final_json, report) keyed by analysis fingerprint.
+
+    Tier 1 is an in-process LRU; tier 2 is a SQLite table shared by all workers.
+    Disk entries written by a different pipeline version are deleted on startup.
+    """
+
+    def __init__(
+        self,
+        *,
+        db_path: Path,
+        pipeline_version: str,
+        max_entries: int = 256,
+        max_disk_entries: int = 5000,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.pipeline_version = pipeline_version
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self.memory = LRUCache(max_entries)
+        self.disk_hits = 0
+        self.invalidated = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._init_db()
+        self.invalidate_stale_versions()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.db_path, timeout=30.0)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        return con
+
+    def _init_db(self) -> None:
+        with closing(self._connect()) as con, con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    fingerprint TEXT PRIMARY KEY,
+                    pipeline_version TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    final_json TEXT NOT NULL,
+                    report TEXT NOT NULL
+                )
+            """)
+
+    def invalidate_stale_versions(self) -> int:
+        """Drop every disk entry not produced by the current pipeline version."""
+
+        with closing(self._connect()) as con, con:
+            cur = con.execute(
+                "DELETE FROM result_cache WHERE pipeline_version != ?",
+                (self.pipeline_version,)
+            )
+            n = int(cur.rowcount or 0)
+        self.invalidated += n
+        return n
+
+    def get(self, fingerprint: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        hit = self.peek(fingerprint)
+        return hit if hit is not None else self.load(fingerprint)
+
+    def peek(self, fingerprint: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Tier 1 only: cheap enough for the event loop."""
+
+        hit = self.memory.get(fingerprint)
+        if hit is None:
+            return None
+        # Callers may decorate the result; never hand out the cached object itself.
+        final_json, report = hit
+        return copy.deepcopy(final_json), report
+
+    def load(self, fingerprint: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Tier 2 lookup (blocking SQLite; async callers run it in a thread)."""
+
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT final_json, report FROM result_cache WHERE fingerprint = ? AND pipeline_version = ?",
+                (fingerprint, self.pipeline_version)
+            ).fetchone()
+        if not row:
+            return None
+        try:
+            hit = (json.loads(row["final_json"]), row["report"])
+        except Exception:
+            return None
+        self.disk_hits += 1
+        self.memory.put(fingerprint, hit)
+        final_json, report = hit
+        return copy.deepcopy(final_json), report
+
+    def put(self, fingerprint: str, final_json: Dict[str, Any], report: str) -> None:
+        self.remember(fingerprint, final_json, report)
+        self.persist(fingerprint, final_json, report)
+
+    def remember(self, fingerprint: str, final_json: Dict[str, Any], report: str) -> None:
+        """Tier 1 only."""
+
+        self.memory.put(fingerprint, (copy.deepcopy(final_json), report))
+
+    def persist(self, fingerprint: str, final_json: Dict[str, Any], report: str) -> None:
+        """Tier 2 write, plus a size-bound eviction every 64th write (blocking SQLite)."""
+
+        with closing(self._connect()) as con, con:
+            con.execute("""
+                INSERT OR REPLACE INTO result_cache(fingerprint, pipeline_version, created_at, final_json, report)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                fingerprint,
+                self.pipeline_version,
+                _utc_now_iso(),
+                json.dumps(final_json, ensure_ascii=False, separators=(",", ":")),
+                report,
+            ))
+
+            with self._lock:
+                self._puts += 1
+                evict = self._puts % 64 == 0
+            if evict:
+                con.execute("""
+                    DELETE FROM result_cache
+                    WHERE fingerprint IN (
+                        SELECT fingerprint FROM result_cache
+                        ORDER BY created_at DESC
+                        LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_disk_entries,))
+
+    def clear(self) -> None:
+        self.memory.clear()
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM result_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT COUNT(*) AS n FROM result_cache").fetchone()
+        return {
+            "pipeline_version": self.pipeline_version,
+            "memory": self.memory.stats(),
+            "disk_entries": int(row["n"]) if row else 0,
+            "disk_hits": self.disk_hits,
+            "invalidated": self.invalidated,
+        }
+
+
+# ============================================================
+# SINGLE-FLIGHT COALESCING
+# ============================================================
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical in-flight async calls.
+
+    The first caller for a key starts the work as its own task; it and every caller
+    arriving while the task runs await that task. A caller that is cancelled (its client
+    went away) only stops waiting: the task is cancelled once no caller is left.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return (result, shared); `shared` is True for coalesced callers."""
+
+        flight = self._inflight.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+
+            def _done(task: "asyncio.Task[Any]", flight: _Flight = flight) -> None:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                # Mark exceptions as retrieved when nobody was left waiting.
+                task.cancelled() or task.exception()
+
+            flight.task.add_done_callback(_done)
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # Shield so a cancelled caller does not cancel the work others await.
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+_instances: Dict[Tuple[str, str], ResultCache] = {}
+_instances_lock = threading.Lock()
+
+
+def get_result_cache(pipeline_version: str) -> Optional[ResultCache]:
+    """Process-wide cache for the current pipeline version (None when RESULT_CACHE=0)."""
+
+    if os.getenv("RESULT_CACHE", "1").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+
+    key = (str(RESULT_CACHE_DB_PATH), pipeline_version)
+    with _instances_lock:
+        cache = _instances.get(key)
+        if cache is None:
+            cache = ResultCache(
+                db_path=RESULT_CACHE_DB_PATH,
+                pipeline_version=pipeline_version,
+                max_entries=_env_int("RESULT_CACHE_MAX_ENTRIES", 256),
+                max_disk_entries=_env_int("RESULT_CACHE_DISK_MAX_ENTRIES", 5000),
+            )
+            _instances[key] = cache
+        return cache
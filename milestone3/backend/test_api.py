@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 import time
 
@@ -11,6 +12,14 @@ from app import app
 
 client = TestClient(app)
 
+ADMIN_TOKEN = "test-admin-token"
+ADMIN = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
+
+
+@pytest.fixture(autouse=True)
+def _admin_token(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", ADMIN_TOKEN)
+
 _FALLBACK_SAMPLE_CONTRACT = """
 MASTER SERVICES AGREEMENT
 
@@ -328,3 +337,1432 @@ def test_contract_id_override(sample_bytes: bytes):
     )
     assert r.status_code == 200
     assert r.json().get("contract_id") == "uploaded_contract"
+
+
+def test_memory_store_append_only_concurrent_writers(tmp_path, monkeypatch):
+    import threading
+
+    import numpy as np
+
+    from milestone3.backend import memory_store
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+
+    def writer(n: int) -> None:
+        for i in range(10):
+            memory_store.append_record(
+                contract_id="c1",
+                question=f"q{n}-{i}",
+                final_json={"intent": "qa", "n": n, "i": i},
+                embedding=np.full(384, float(i), dtype=np.float32),
+            )
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert memory_store.count_records("c1") == 40
+
+    latest = memory_store.latest_records("c1", limit=5)
+    assert len(latest) == 5
+    assert [r["id"] for r in latest] == sorted([r["id"] for r in latest], reverse=True)
+    vec = latest[0]["question_embedding"]
+    assert vec.dtype == np.float32 and vec.shape == (384,)
+    assert latest[0]["final_json"]["intent"] == "qa"
+
+
+def test_semantic_memory_recall_returns_stored_result(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import memory_store
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setenv("RESULT_CACHE", "0")
+
+    payload = {
+        "contract_text": sample_bytes.decode("utf-8", errors="ignore"),
+        "question": "Provide a risk analysis of payment terms and late fees",
+        "tone": "executive",
+    }
+    first = client.post("/analyze_text", json=payload)
+    assert first.status_code == 200
+    assert first.json().get("cache") is None
+
+    second = client.post("/analyze_text", json=payload)
+    assert second.status_code == 200
+    j = second.json()
+    assert j.get("cache") == "semantic"
+    assert j["analysis"]["cache_similarity"] >= 0.99
+    assert j["report"] == first.json()["report"]
+
+    # A different tone must not be served from memory.
+    third = client.post("/analyze_text", json={**payload, "tone": "simple"})
+    assert third.json().get("cache") is None
+
+    # Nor one computed with a different no-evidence threshold.
+    stricter = client.post("/analyze_text", json={**payload, "no_evidence_threshold": 0.9}).json()
+    assert stricter.get("cache") is None
+    assert "no_evidence_threshold" not in j["analysis"]
+
+    # A recalled answer reports the question as asked, and the one it was recalled from.
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "0.5")
+    paraphrase = "Provide a risk analysis of the payment terms and the late fees"
+    fourth = client.post("/analyze_text", json={**payload, "question": paraphrase}).json()
+    assert fourth.get("cache") == "semantic"
+    assert fourth["analysis"]["question"] == paraphrase
+    assert fourth["analysis"]["recalled_question"] == payload["question"]
+
+
+def test_exact_result_cache_hit_skips_index(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import contract_pipeline, result_cache
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    payload = {
+        "contract_text": sample_bytes.decode("utf-8", errors="ignore"),
+        "question": "Summarize payment terms",
+        "tone": "executive",
+    }
+    first = client.post("/analyze_text", json=payload)
+    assert first.status_code == 200
+    assert first.json().get("cache") is None
+
+    def _no_index(*args, **kwargs):
+        raise AssertionError("index must not be built on a cache hit")
+
+    monkeypatch.setattr(contract_pipeline.LocalRAGIndex, "build", _no_index)
+    second = client.post("/analyze_text", json={**payload, "question": "  summarize   PAYMENT terms "})
+    assert second.status_code == 200
+    assert second.json().get("cache") == "exact"
+    assert second.json()["report"] == first.json()["report"]
+
+    # Any parameter change is a different fingerprint.
+    monkeypatch.undo()
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+    third = client.post("/analyze_text", json={**payload, "tone": "simple"})
+    assert third.json().get("cache") is None
+
+
+def test_result_cache_disk_tier_runs_off_the_event_loop(sample_bytes: bytes, tmp_path, monkeypatch):
+    import asyncio
+
+    from milestone3.backend import contract_pipeline, result_cache
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    cache = result_cache.get_result_cache(contract_pipeline.PIPELINE_VERSION)
+
+    on_loop = []
+    for name in ("load", "persist"):
+        real = getattr(cache, name)
+
+        def tracked(*args, _real=real, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return _real(*args, **kwargs)
+
+        monkeypatch.setattr(cache, name, tracked)
+
+    payload = {"contract_text": sample_bytes.decode("utf-8", errors="ignore"), "question": "Who audits the books?"}
+    assert client.post("/analyze_text", json=payload).json().get("cache") is None
+    cache.memory.clear()  # as in another worker: only the disk tier has it
+    disk_hits = cache.disk_hits
+    assert client.post("/analyze_text", json=payload).json().get("cache") == "exact"
+    assert cache.disk_hits == disk_hits + 1
+
+    assert on_loop == [False, False, False]  # miss, write, disk hit
+
+
+def test_result_cache_invalidates_other_pipeline_versions(tmp_path):
+    from milestone3.backend.result_cache import ResultCache
+
+    db = tmp_path / "rc.sqlite3"
+    old = ResultCache(db_path=db, pipeline_version="v1")
+    old.put("fp", {"intent": "qa"}, "report")
+    assert old.get("fp") == ({"intent": "qa"}, "report")
+
+    new = ResultCache(db_path=db, pipeline_version="v2")
+    assert new.invalidated == 1
+    assert new.get("fp") is None
+
+
+def test_canonical_question_key_groups_paraphrases():
+    from milestone3.backend.contract_pipeline import canonical_question_key, replay_question_log
+
+    a = canonical_question_key("What are the payment terms?")
+    b = canonical_question_key("Explain payment terms and due dates")
+    c = canonical_question_key("What are the late fees?")
+    assert a == b
+    assert a != c
+
+    stats = replay_question_log(
+        ["What are the payment terms?", "Explain payment terms and due dates", "What are the late fees?"]
+    )
+    assert stats["exact_hit_rate"] == 0.0
+    assert abs(stats["canonical_hit_rate"] - 1 / 3) < 1e-9
+
+
+def test_paraphrase_reuses_cached_sections(sample_bytes: bytes, monkeypatch):
+    from milestone3.backend import contract_pipeline
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    text = sample_bytes.decode("utf-8", errors="ignore") + "\nParaphrase cache test."
+
+    calls = {"n": 0}
+    real = contract_pipeline.build_executive_report_data
+
+    def counting(**kwargs):
+        calls["n"] += 1
+        return real(**kwargs)
+
+    monkeypatch.setattr(contract_pipeline, "build_executive_report_data", counting)
+    for q in ["Provide a risk analysis of payment terms", "Risk analysis: explain payment terms and due dates"]:
+        r = client.post("/analyze_text", json={"contract_text": text, "question": q})
+        assert r.status_code == 200
+    assert calls["n"] == 1
+
+
+def test_single_flight_coalesces_identical_inflight_requests(sample_bytes: bytes, monkeypatch):
+    import asyncio
+
+    from milestone3.backend import contract_pipeline
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    runs = {"n": 0}
+    real = contract_pipeline._run_pipeline
+
+    async def slow_run(**kwargs):
+        runs["n"] += 1
+        await asyncio.sleep(0.05)
+        return await real(**kwargs)
+
+    monkeypatch.setattr(contract_pipeline, "_run_pipeline", slow_run)
+    before = contract_pipeline.coalescing_stats()["coalesced"]
+
+    async def burst():
+        kwargs = {
+            "contract_text": sample_bytes.decode("utf-8", errors="ignore"),
+            "question": "Summarize audit rights",
+        }
+        return await asyncio.gather(*[contract_pipeline.run_full_pipeline(**kwargs) for _ in range(3)])
+
+    results = asyncio.run(burst())
+    assert runs["n"] == 1
+    assert contract_pipeline.coalescing_stats()["coalesced"] - before == 2
+    assert sorted(str(fj.get("cache")) for fj, _ in results) == ["None", "coalesced", "coalesced"]
+    assert len({rep for _, rep in results}) == 1
+
+
+def test_single_flight_follower_survives_cancelled_leader(sample_bytes: bytes, monkeypatch):
+    import asyncio
+
+    from milestone3.backend import contract_pipeline
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    real = contract_pipeline._run_pipeline
+
+    async def slow_run(**kwargs):
+        await asyncio.sleep(0.05)
+        return await real(**kwargs)
+
+    monkeypatch.setattr(contract_pipeline, "_run_pipeline", slow_run)
+    kwargs = {"contract_text": sample_bytes.decode("utf-8", errors="ignore"), "question": "Summarize renewal terms"}
+
+    async def scenario():
+        leader = asyncio.create_task(contract_pipeline.run_full_pipeline(**kwargs))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(contract_pipeline.run_full_pipeline(**kwargs))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # its client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    final_json, report = asyncio.run(scenario())
+    assert final_json["cache"] == "coalesced"
+    assert not final_json.get("truncated") and report
+    assert contract_pipeline.coalescing_stats()["in_flight"] == 0
+
+    # With every caller gone, the shared work is cancelled too.
+    async def everyone_leaves():
+        callers = [asyncio.create_task(contract_pipeline.run_full_pipeline(**kwargs)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for t in callers:
+            t.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(everyone_leaves())
+    assert contract_pipeline.coalescing_stats()["in_flight"] == 0
+
+
+def test_interrupted_legacy_import_is_resumed_without_duplicates(tmp_path, monkeypatch):
+    from milestone3.backend import memory_store
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setenv("MEMORY_IMPORT_STALE_S", "0")
+
+    legacy = [
+        {"type": "final", "question": "First?", "timestamp": "2025-01-01T00:00:00+00:00", "final_json": {"intent": "qa"}},
+        {"type": "final", "question": "Second?", "final_json": {"intent": "qa"}},
+    ]
+    # A worker claimed the file and crashed after importing only the first record.
+    memory_store.append_record(
+        contract_id="old", question="First?", final_json={"intent": "qa"}, intent="qa",
+        record_type="final", created_at="2025-01-01T00:00:00+00:00",
+    )
+    (tmp_path / "old.json.importing").write_text(json.dumps(legacy), encoding="utf-8")
+
+    memory_store._initialized_paths.discard(str(tmp_path / "memory.sqlite3"))  # next startup
+    memory_store.init_store()
+    questions = sorted(r["question"] for r in memory_store.latest_records("old"))
+    assert questions == ["First?", "Second?"]
+    assert (tmp_path / "old.json.imported").exists() and not (tmp_path / "old.json.importing").exists()
+
+    # Crashing again before the final rename: a retry adds nothing.
+    (tmp_path / "old.json.imported").rename(tmp_path / "old.json.reimporting")
+    memory_store._initialized_paths.discard(str(tmp_path / "memory.sqlite3"))
+    memory_store.init_store()
+    assert len(memory_store.latest_records("old")) == 2
+    assert (tmp_path / "old.json.imported").exists()
+
+
+def test_memory_compaction_applies_retention(tmp_path, monkeypatch):
+    import numpy as np
+
+    from milestone3.backend import memory_store
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+
+    bulky = {"intent": "risk_analysis", "agent_analysis": {"legal": {"risk_level": "low", "retrieval": {"per_query": ["x" * 5000]}}}}
+    for i in range(6):
+        memory_store.append_record(contract_id="a", question=f"Question {i}", final_json=bulky, embedding=np.ones(8, dtype=np.float32))
+    for _ in range(3):
+        memory_store.append_record(contract_id="b", question="Same  question", final_json=bulky)
+    memory_store.append_record(contract_id="b", question="Ancient", final_json=bulky, created_at="2000-01-01T00:00:00+00:00")
+
+    policy = memory_store.RetentionPolicy(max_records_per_contract=4, max_age_days=30, max_total_bytes=0)
+    result = memory_store.compact_store(policy)
+    assert result == {"age": 1, "duplicates": 2, "per_contract": 2, "bytes_budget": 0, "stripped": 5}
+
+    assert [r["question"] for r in memory_store.latest_records("a")] == [f"Question {i}" for i in (5, 4, 3, 2)]
+    rec = memory_store.latest_records("b")
+    assert len(rec) == 1
+    assert "retrieval" not in rec[0]["final_json"]["agent_analysis"]["legal"]
+
+    # Byte budget evicts oldest records first.
+    memory_store.compact_store(memory_store.RetentionPolicy(max_records_per_contract=0, max_age_days=0, max_total_bytes=200))
+    assert memory_store.count_records() < 5
+
+    assert client.get("/admin/memory").status_code == 401
+    r = client.get("/admin/memory", headers=ADMIN)
+    assert r.status_code == 200
+    assert r.json()["store"]["evictions"]["evicted_duplicates"] >= 2
+
+
+def test_manual_compaction_is_admin_only_and_single_flight(monkeypatch):
+    from milestone3.backend import memory_store
+
+    monkeypatch.setenv("MEMORY_COMPACT_MIN_INTERVAL_S", "0")
+    assert client.post("/admin/memory/compact").status_code == 401
+
+    # A pass already in progress (e.g. the background compactor) blocks the manual one.
+    with memory_store._compact_lock:
+        r = client.post("/admin/memory/compact", headers=ADMIN)
+    assert r.status_code == 429
+    assert "Retry-After" in r.headers
+
+    assert client.post("/admin/memory/compact", headers=ADMIN).status_code == 200
+
+    # And the manual trigger is rate-limited between passes.
+    monkeypatch.setenv("MEMORY_COMPACT_MIN_INTERVAL_S", "3600")
+    r = client.post("/admin/memory/compact", headers=ADMIN)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) > 3000
+
+
+def test_analyze_batch_builds_index_once(sample_bytes: bytes, monkeypatch):
+    from milestone3.backend import contract_pipeline, memory_store
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    builds = {"n": 0}
+    real_init = contract_pipeline.LocalRAGIndex.__init__
+
+    def counting_init(self, *args, **kwargs):
+        builds["n"] += 1
+        real_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(contract_pipeline.LocalRAGIndex, "__init__", counting_init)
+    contract_pipeline._INDEX_CACHE.clear()
+
+    questions = [
+        "What are the payment terms?",
+        {"question": "Summarize audit rights", "intent_override": "qa"},
+        "",
+    ]
+    r = client.post(
+        "/analyze_batch",
+        files={"file": ("sample_contract.txt", sample_bytes, "text/plain")},
+        data={"questions": json.dumps(questions), "contract_id": "batch_contract"},
+    )
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert builds["n"] == 1
+    assert body["count"] == 3
+    assert [item["index"] for item in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["analysis"]["question"] == "What are the payment terms?"
+    assert body["results"][1]["analysis"]["intent"] == "qa"
+    assert "error" in body["results"][2]
+
+    # The contract can be referenced by id afterwards.
+    assert memory_store.load_contract_text("batch_contract", "anonymous:testclient") is not None
+    r = client.post("/analyze_batch_text", json={"contract_id": "batch_contract", "questions": [{"question": "Is liability capped?"}]})
+    assert r.status_code == 200, r.text
+    assert r.json()["results"][0]["analysis"]["question"] == "Is liability capped?"
+    # Same contract and profile: the batch reuses the index from the LRU.
+    assert builds["n"] == 1
+
+    r = client.post("/analyze_batch_text", json={"contract_id": "no_such_contract", "questions": [{"question": "x"}]})
+    assert r.status_code == 404
+
+
+def test_stored_contracts_are_scoped_to_their_caller(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import db_sqlite, memory_store
+
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+
+    headers = {}
+    for email in ("owner@example.com", "other@example.com"):
+        client.post("/auth/register", json={"email": email, "password": "secret", "name": email})
+        token = client.post("/auth/login", json={"email": email, "password": "secret"}).json()["token"]
+        headers[email] = {"Authorization": f"Bearer {token}"}
+
+    text = sample_bytes.decode("utf-8")
+    batch = {"contract_id": "shared_id", "questions": [{"question": "What are the payment terms?"}]}
+    r = client.post("/analyze_batch_text", json={**batch, "contract_text": text}, headers=headers["owner@example.com"])
+    assert r.status_code == 200, r.text
+
+    # Another caller (or an anonymous one) cannot read it by id...
+    assert client.post("/analyze_batch_text", json=batch, headers=headers["other@example.com"]).status_code == 404
+    assert client.post("/analyze_batch_text", json=batch).status_code == 404
+
+    # ...nor replace it by reusing the id.
+    r = client.post("/analyze_batch_text", json={**batch, "contract_text": "Other text."}, headers=headers["other@example.com"])
+    assert r.status_code == 200, r.text
+    assert memory_store.load_contract_text("shared_id", "owner@example.com") == text
+    assert memory_store.load_contract_text("shared_id", "other@example.com") == "Other text."
+
+
+def test_analyze_contracts_streams_per_contract_status(sample_bytes: bytes, monkeypatch):
+    import io
+    import zipfile
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    monkeypatch.setenv("BULK_MAX_WORKERS", "2")
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("deals/a.txt", sample_bytes)
+        zf.writestr("deals/b.txt", sample_bytes.replace(b"Payment", b"Fees"))
+        zf.writestr("deals/empty.txt", b"   ")
+        zf.writestr("deals/image.png", b"\x89PNG")
+        zf.writestr("__MACOSX/deals/._a.txt", b"junk")
+
+    r = client.post(
+        "/analyze_contracts",
+        files=[
+            ("files", ("upload.txt", sample_bytes, "text/plain")),
+            ("archive", ("deals.zip", buf.getvalue(), "application/zip")),
+        ],
+        data={"max_workers": "8"},
+    )
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+    summary = lines[-1]
+    assert summary["status"] == "complete"
+    assert summary == {**summary, "total": 4, "done": 3, "skipped": 1, "error": 0, "workers": 2}
+
+    by_name = {item["name"]: item for item in lines[:-1]}
+    assert set(by_name) == {"upload.txt", "deals/a.txt", "deals/b.txt", "deals/empty.txt"}
+    assert by_name["deals/empty.txt"]["status"] == "skipped"
+    assert by_name["deals/a.txt"]["analysis"]["intent"] == "risk_analysis"
+    assert by_name["upload.txt"]["contract_id"] == by_name["deals/a.txt"]["contract_id"]
+
+    r = client.post("/analyze_contracts", files=[("archive", ("x.zip", b"not a zip", "application/zip"))])
+    assert r.status_code == 400
+
+
+def test_analyze_stream_emits_stages_before_final(sample_bytes: bytes, monkeypatch):
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    r = client.post(
+        "/analyze_stream",
+        files={"file": ("sample_contract.txt", sample_bytes, "text/plain")},
+        data={"question": "Provide a risk analysis", "intent_override": "risk_analysis", "run_all_agents": "true"},
+    )
+    assert r.status_code == 200, r.text
+    events = [json.loads(line) for line in r.text.splitlines() if line.strip()]
+    names = [e["event"] for e in events]
+    assert names[:3] == ["plan", "probe", "executive"]
+    assert names[-1] == "final"
+    assert sorted(e["agent_type"] for e in events if e["event"] == "agent") == ["compliance", "finance", "legal", "operations"]
+    assert [e["elapsed_ms"] for e in events] == sorted(e["elapsed_ms"] for e in events)
+
+    final = events[-1]
+    assert final["analysis"]["intent"] == "risk_analysis"
+    assert final["report"].startswith("CONTRACT ANALYSIS REPORT")
+
+    r = client.post(
+        "/analyze_text_stream",
+        json={"contract_text": sample_bytes.decode("utf-8", errors="ignore"), "question": "What are the payment terms?"},
+        headers={"Accept": "text/event-stream"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert "event: probe\n" in r.text
+    assert "event: final\n" in r.text
+
+
+def test_job_queue_runs_and_expires_jobs(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import job_queue
+
+    monkeypatch.setattr(job_queue, "JOB_DB_PATH", tmp_path / "jobs.sqlite3")
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    monkeypatch.setenv("JOB_WORKERS", "2")
+
+    with TestClient(app) as c:
+        r = c.post(
+            "/jobs",
+            files={"file": ("sample_contract.txt", sample_bytes, "text/plain")},
+            data={"question": "Provide a risk analysis", "intent_override": "risk_analysis", "run_all_agents": "true"},
+        )
+        assert r.status_code == 202, r.text
+        job_id = r.json()["job_id"]
+
+        r = c.post("/jobs/text", json={"contract_text": sample_bytes.decode("utf-8", errors="ignore"), "question": "Is liability capped?"})
+        assert r.status_code == 202
+        qa_job_id = r.json()["job_id"]
+
+        deadline = time.time() + 30
+        jobs = {}
+        while time.time() < deadline:
+            jobs = {jid: c.get(f"/jobs/{jid}").json() for jid in (job_id, qa_job_id)}
+            if all(j["status"] in {"done", "error"} for j in jobs.values()):
+                break
+            time.sleep(0.05)
+
+        job = jobs[job_id]
+        assert job["status"] == "done", job
+        assert job["progress"] == 1.0
+        assert job["result"]["analysis"]["intent"] == "risk_analysis"
+        assert job["result"]["report"].startswith("CONTRACT ANALYSIS REPORT")
+        assert jobs[qa_job_id]["result"]["analysis"]["question"] == "Is liability capped?"
+
+        assert c.get("/jobs/does-not-exist").status_code == 404
+
+        # Jobs are only visible to the caller that submitted them.
+        other = TestClient(app, client=("10.0.0.2", 50000))
+        assert other.get(f"/jobs/{job_id}").status_code == 404
+
+    # Finished jobs disappear after the retention window.
+    monkeypatch.setenv("JOB_RETENTION_S", "0")
+    time.sleep(0.01)
+    assert job_queue.get_job(job_id) is None
+    assert job_queue.purge_expired_jobs() == 2
+
+
+def test_job_queue_requeues_stale_and_interrupted_jobs(tmp_path, monkeypatch):
+    from milestone3.backend import job_queue
+
+    monkeypatch.setattr(job_queue, "JOB_DB_PATH", tmp_path / "jobs.sqlite3")
+
+    job_id = job_queue.submit_job("analyze", {"x": 1})
+    claimed = job_queue.claim_next_job("w1")
+    assert claimed["job_id"] == job_id and claimed["params"] == {"x": 1}
+    assert job_queue.claim_next_job("w2") is None
+
+    # A worker that stopped heart-beating loses the job to the next worker...
+    assert job_queue.requeue_stale_jobs(stale_s=-1, max_attempts=2) == {"requeued": 1, "failed": 0}
+    assert job_queue.claim_next_job("w2")["attempts"] == 2
+    # ...until it has used up its attempts.
+    assert job_queue.requeue_stale_jobs(stale_s=-1, max_attempts=2) == {"requeued": 0, "failed": 1}
+    assert job_queue.get_job(job_id)["status"] == "error"
+
+
+def test_deadline_returns_truncated_partial_result(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import contract_pipeline, result_cache
+    from milestone3.backend.deadlines import Deadline
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    real_agent = contract_pipeline.run_agent
+
+    def slow_finance(**kwargs):
+        if kwargs["agent_type"] == "finance":
+            time.sleep(0.6)
+        return real_agent(**kwargs)
+
+    monkeypatch.setattr(contract_pipeline, "run_agent", slow_finance)
+
+    data = {"question": "Provide a risk analysis", "intent_override": "risk_analysis", "run_all_agents": "true"}
+    files = {"file": ("sample_contract.txt", sample_bytes, "text/plain")}
+
+    # A long-lived client, so the abandoned agent thread isn't joined when the request's event loop closes.
+    with TestClient(app) as c:
+        t0 = time.perf_counter()
+        r = c.post("/analyze", files=files, data=data, headers={"X-Deadline-Ms": "300"})
+        elapsed = time.perf_counter() - t0
+    assert r.status_code == 200, r.text
+    assert elapsed < 0.6
+    body = r.json()
+    assert body["truncated"] is True
+    agents = body["analysis"]["agent_analysis"]
+    assert agents["finance"]["truncated"] is True
+    assert agents["legal"].get("truncated") is None
+    assert body["report"].startswith("CONTRACT ANALYSIS REPORT")
+
+    # Partial results are not cached: the unbounded request recomputes and completes.
+    r = client.post("/analyze", files=files, data=data)
+    assert r.json()["cache"] is None
+    assert r.json()["truncated"] is False
+    assert "truncated" not in r.json()["analysis"]["agent_analysis"]["finance"]
+
+    dl = Deadline(None)
+    assert not dl.expired() and dl.remaining() is None
+    dl.cancel()
+    assert dl.expired() and dl.remaining() == 0.0
+
+
+def test_process_executor_matches_thread_executor(sample_bytes: bytes, monkeypatch):
+    import asyncio
+    import gc
+    from multiprocessing import shared_memory
+
+    from milestone3.backend import agent_executor, contract_pipeline
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    monkeypatch.setenv("AGENT_PROCESS_WORKERS", "2")
+    contract_text = sample_bytes.decode("utf-8", errors="ignore")
+
+    def run(mode: str):
+        monkeypatch.setenv("AGENT_EXECUTOR", mode)
+        contract_pipeline._SECTION_CACHE.clear()
+        final_json, _ = asyncio.run(contract_pipeline.run_full_pipeline(
+            contract_text=contract_text,
+            question="Provide a risk analysis",
+            intent_override="risk_analysis",
+            run_all_agents=True,
+        ))
+        agents = final_json["agent_analysis"]
+        return final_json["analysis"], {t: {k: v for k, v in agents[t].items() if k != "timestamp"} for t in agents["selected_agents"]}
+
+    try:
+        assert run("process") == run("thread")
+
+        # Workers see the same chunks/vectors through shared memory; segments go away with the index.
+        rag = contract_pipeline.LocalRAGIndex()
+        rag.build(contract_text)
+        handle = agent_executor.publish_index(rag)
+        view = agent_executor.attach_index(handle)
+        assert list(view.chunks) == list(rag.chunks)
+        assert (view.vectors == rag.vectors).all()
+        agent_executor.detach_all()
+        del view, rag
+        gc.collect()
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=handle.vectors_name)
+    finally:
+        agent_executor.shutdown_pool()
+
+
+def test_process_workers_see_parent_cancellation(sample_bytes: bytes, monkeypatch):
+    from milestone3.backend import agent_executor, contract_pipeline
+    from milestone3.backend.deadlines import Deadline
+
+    monkeypatch.setenv("AGENT_PROCESS_WORKERS", "1")
+    rag = contract_pipeline.LocalRAGIndex()
+    rag.build(sample_bytes.decode("utf-8", errors="ignore"))
+    handle = agent_executor.publish_index(rag)
+
+    # Unbounded: the worker gets no remaining-time snapshot, only the shared flag.
+    parent = Deadline()
+    flag = agent_executor.cancel_flag(parent)
+    assert agent_executor.cancel_flag(parent) == flag
+
+    def run_in_pool() -> dict:
+        return agent_executor.get_pool().submit(
+            agent_executor._agent_task, handle, "legal", "Is liability capped?", None, flag
+        ).result(timeout=120)
+
+    try:
+        assert not run_in_pool().get("truncated")
+        parent.cancel()
+        assert run_in_pool().get("truncated") is True
+    finally:
+        agent_executor.shutdown_pool()
+
+    # A worker-side deadline notices a cancel that happens while it is running.
+    parent = Deadline()
+    view = agent_executor._WorkerDeadline(None, agent_executor.cancel_flag(parent))
+    assert not view.expired() and not view.cancelled
+    parent.cancel()
+    assert view.expired() and view.cancelled
+    view.close()
+
+
+def test_embedding_batcher_coalesces_concurrent_queries(monkeypatch):
+    import threading
+
+    import numpy as np
+
+    from milestone3.backend import contract_pipeline
+    from milestone3.backend.embedding_batcher import EmbeddingBatcher
+
+    calls = []
+
+    def encode_fn(texts, normalize):
+        calls.append(len(texts))
+        return np.array([[float(len(t)), 1.0 if normalize else 0.0] for t in texts], dtype=np.float32)
+
+    batcher = EmbeddingBatcher(encode_fn, max_batch=64, max_wait_ms=50)
+    results = {}
+    start = threading.Barrier(16)
+
+    def caller(i: int) -> None:
+        start.wait()
+        results[i] = batcher.encode(["x" * i, "y" * (i + 100)], normalize_embeddings=True)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) < 16 and sum(calls) == 32
+    for i in range(16):
+        assert results[i].tolist() == [[float(i), 1.0], [float(i + 100), 1.0]]
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == len(calls)
+    assert stats["queue_wait_ms"]["count"] == 16
+
+    # Batched and direct query embeddings are identical.
+    rag = contract_pipeline.LocalRAGIndex()
+    monkeypatch.setenv("EMBED_BATCHING", "0")
+    direct = rag.encode(["What are the payment terms?"])
+    monkeypatch.setenv("EMBED_BATCHING", "always")
+    assert np.array_equal(rag.encode(["What are the payment terms?"]), direct)
+
+
+def test_rag_index_concurrent_queries_during_rebuild():
+    import threading
+
+    import numpy as np
+
+    from milestone3.backend import contract_pipeline
+
+    rag = contract_pipeline.LocalRAGIndex()
+    rag.build("Payment is due within 30 days. Late fees accrue at 1.5% per month.")
+    first = rag.snapshot
+    with pytest.raises(ValueError):
+        rag.vectors[0, 0] = 1.0
+
+    texts_a = set(first.chunks)
+    rag_b = contract_pipeline.LocalRAGIndex()
+    rag_b.build("Either party may terminate for material breach on 30 days notice.")
+    texts_b = set(rag_b.chunks)
+    expected_a = [(m.chunk_index, m.score) for m in rag.query("late fees", top_k=3)]
+
+    errors = []
+    stop = threading.Event()
+
+    def reader() -> None:
+        while not stop.is_set():
+            matches = rag.query("late fees", top_k=3)
+            texts = {m.text for m in matches}
+            # Every result comes from exactly one snapshot, never a mix.
+            if not (texts <= texts_a or texts <= texts_b):
+                errors.append(texts)
+
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+    for t in readers:
+        t.start()
+    for i in range(20):
+        snap = first if i % 2 else rag_b.snapshot
+        rag.load(snap.chunks, snap.vectors)
+    stop.set()
+    for t in readers:
+        t.join(5)
+
+    assert not errors
+    rag.load(first.chunks, first.vectors)
+    assert [(m.chunk_index, m.score) for m in rag.query("late fees", top_k=3)] == expected_a
+    assert np.array_equal(
+        contract_pipeline.cosine_sim_matrix(rag.encode(["late fees"])[0], rag.vectors),
+        rag.snapshot.score(rag.encode(["late fees"])[0]),
+    )
+
+
+def test_concurrency_budget_splits_cores_between_workers(monkeypatch):
+    import asyncio
+
+    from milestone3.backend import concurrency
+
+    for var in ("CPU_BUDGET", "BLAS_THREADS", "AGENT_THREADS", "AGENT_PROCESS_WORKERS", "TORCH_THREADS"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(concurrency.os, "cpu_count", lambda: 16)
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+
+    cfg = concurrency.load_config()
+    assert (cfg.cpu_budget, cfg.blas_threads, cfg.agent_threads, cfg.process_workers) == (4, 1, 8, 4)
+
+    monkeypatch.setenv("AGENT_THREADS", "3")
+    monkeypatch.setenv("OPENBLAS_NUM_THREADS", "2")
+    monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+    concurrency.apply_blas_env()
+    assert concurrency.os.environ["OPENBLAS_NUM_THREADS"] == "2"  # explicit setting wins
+    assert concurrency.os.environ["OMP_NUM_THREADS"] == "1"
+
+    async def pool_size() -> int:
+        concurrency.configure()
+        return asyncio.get_running_loop()._default_executor._max_workers
+
+    assert asyncio.run(pool_size()) == 3
+
+
+def test_admission_control_sheds_load_with_retry_after(sample_bytes: bytes, monkeypatch):
+    import asyncio
+
+    from milestone3.backend import admission
+    from milestone3.backend.deadlines import Deadline
+
+    async def scenario():
+        ctl = admission.AdmissionController(max_concurrent=1, max_queue=1, max_wait_s=5)
+        release = asyncio.Event()
+        order = []
+
+        async def job(name: str, deadline=None):
+            async with ctl.slot(deadline):
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(job("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(job("second"))
+        await asyncio.sleep(0)
+        assert (ctl.active, ctl.queued) == (1, 1)
+
+        # Queue full -> 429.
+        with pytest.raises(admission.AdmissionRejected) as e:
+            await job("third")
+        assert e.value.status_code == 429 and e.value.retry_after == "1"
+
+        release.set()
+        await asyncio.gather(first, second)
+        assert order == ["first", "second"]
+
+        # Once service time is known, a request that can't start before its deadline is shed.
+        ctl.service_s = 10.0
+        release.clear()
+        busy = asyncio.create_task(job("busy"))
+        await asyncio.sleep(0)
+        with pytest.raises(admission.AdmissionRejected) as e:
+            await job("late", Deadline(1.0))
+        assert e.value.status_code == 503 and e.value.retry_after == "10"
+        release.set()
+        await busy
+        return ctl.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["admitted"] == 3 and stats["active"] == 0 and stats["queued"] == 0
+    assert stats["rejected"] == {"queue_full": 1, "deadline": 1, "timeout": 0}
+
+    # Endpoint: a full controller answers immediately with 429 + Retry-After.
+    full = admission.AdmissionController(max_concurrent=1, max_queue=0, max_wait_s=5)
+    full._active = 1
+    monkeypatch.setitem(admission._controllers, "interactive", full)
+    with TestClient(app) as c:
+        r = c.post("/analyze_text", json={"contract_text": sample_bytes.decode("utf-8"), "question": "What are the payment terms?"})
+        assert r.status_code == 429
+        assert r.headers["Retry-After"] == "1"
+        assert c.get("/admin/admission", headers=ADMIN).json()["lanes"]["interactive"]["rejected"]["queue_full"] == 1
+
+
+def test_priority_lanes_keep_qa_p95_steady_under_reports(sample_bytes: bytes, tmp_path, monkeypatch):
+    import asyncio
+    import time
+
+    from milestone3.backend import contract_pipeline, lanes, memory_store
+
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    contract_text = sample_bytes.decode("utf-8", errors="ignore")
+
+    assert contract_pipeline.classify_request("What are the payment terms?", "qa") == lanes.INTERACTIVE
+    assert contract_pipeline.classify_request("Provide a risk analysis", "risk_analysis", True) == lanes.HEAVY
+
+    def p95(values):
+        return sorted(values)[int(0.95 * len(values)) - 1]
+
+    async def qa(i: int) -> float:
+        t0 = time.perf_counter()
+        await contract_pipeline.run_full_pipeline(
+            contract_text=contract_text, question=f"What are the payment terms? ({i})", intent_override="qa"
+        )
+        return time.perf_counter() - t0
+
+    async def scenario():
+        baseline = [await qa(i) for i in range(20)]
+        stop = asyncio.Event()
+
+        async def reports(w: int) -> None:
+            j = 0
+            while not stop.is_set():
+                await contract_pipeline.run_full_pipeline(
+                    contract_text=f"{contract_text}\nReference {w}-{j}.",
+                    question="Provide a risk analysis",
+                    intent_override="risk_analysis",
+                    run_all_agents=True,
+                )
+                j += 1
+
+        background = [asyncio.create_task(reports(w)) for w in range(4)]
+        await asyncio.sleep(0.1)
+        loaded = [await qa(100 + i) for i in range(20)]
+        stop.set()
+        await asyncio.gather(*background)
+        return baseline, loaded
+
+    try:
+        baseline, loaded = asyncio.run(scenario())
+    finally:
+        lanes.shutdown_lanes()
+
+    assert p95(loaded) <= 2 * p95(baseline) + 0.015
+    stats = lanes.lane_stats()["lanes"]
+    assert stats["heavy"]["yields"] > 0 and stats["interactive"]["active_requests"] == 0
+
+
+def test_heavy_work_yields_only_before_real_searches(sample_bytes: bytes, monkeypatch):
+    from milestone3.backend import contract_pipeline, lanes
+
+    monkeypatch.setenv("LANE_HEAVY_YIELD_MS", "20")
+    rag = contract_pipeline.LocalRAGIndex()
+    rag.build(sample_bytes.decode("utf-8", errors="ignore"))
+    question = "Provide a risk analysis"
+    plan = contract_pipeline.plan_retrieval(
+        question=question, question_vec=None, agents=["legal"], agent_top_k=5, max_agent_queries=None
+    )
+    retrieved = plan.execute(rag)
+
+    def heavy_yields() -> int:
+        return lanes.lane_stats()["lanes"]["heavy"]["yields"]
+
+    # An interactive request stays active throughout, so every checkpoint would wait.
+    with lanes.track_request(lanes.INTERACTIVE), lanes.use_lane(lanes.HEAVY):
+        before = heavy_yields()
+        planned = contract_pipeline.run_agent(agent_type="legal", question=question, rag=rag, retrieved=retrieved)
+        assert heavy_yields() == before
+
+        before = heavy_yields()
+        searched = contract_pipeline.run_agent(agent_type="legal", question=question, rag=rag)
+        assert heavy_yields() - before == len(searched["retrieval"]["per_query"])
+
+    assert planned["retrieval"] == searched["retrieval"]
+
+
+def test_fair_queuing_interleaves_users_and_caps_per_user():
+    import asyncio
+
+    from milestone3.backend import admission
+
+    async def scenario():
+        ctl = admission.AdmissionController(max_concurrent=1, max_queue=16, max_wait_s=5)
+        release = asyncio.Event()
+        order = []
+
+        async def job(user: str, name: str) -> None:
+            async with ctl.slot(user=user):
+                order.append(name)
+                await release.wait()
+                release.clear()
+
+        tasks = [asyncio.create_task(job("a", f"a{i}")) for i in range(1, 5)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(job("b", f"b{i}")) for i in range(1, 3)]
+        await asyncio.sleep(0)
+        while len(order) < 6 or not all(t.done() for t in tasks):
+            release.set()
+            await asyncio.sleep(0.001)
+        fair = list(order)
+
+        # Per-user cap: a second request of "a" waits even though a slot is free.
+        capped = admission.AdmissionController(max_concurrent=2, max_queue=4, max_wait_s=5)
+        hold = asyncio.Event()
+        running = []
+
+        async def capped_job(user: str, name: str) -> None:
+            async with capped.slot(user=user, max_user_concurrent=1):
+                running.append(name)
+                await hold.wait()
+
+        jobs = [asyncio.create_task(capped_job(u, n)) for u, n in (("a", "a1"), ("a", "a2"), ("b", "b1"))]
+        await asyncio.sleep(0.01)
+        snapshot = (list(running), capped.stats()["queued_by_user"])
+        hold.set()
+        await asyncio.gather(*jobs)
+        return fair, snapshot, running
+
+    fair, snapshot, running = asyncio.run(scenario())
+    assert fair == ["a1", "b1", "a2", "b2", "a3", "a4"]
+    assert snapshot == (["a1", "b1"], {"a": 1})
+    assert running == ["a1", "b1", "a2"]
+
+
+def test_degradation_level_follows_queue_depth_and_latency(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import admission, degradation, memory_store, result_cache
+
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+
+    ctl = admission.AdmissionController(max_concurrent=2, max_queue=16, max_wait_s=30)
+    monkeypatch.setitem(admission._controllers, "heavy", ctl)
+    assert degradation.choose("heavy").level == 0
+
+    # Queue depth, in rounds of waiting (queued / slots).
+    ctl._waiters = [object()] * 4
+    assert degradation.choose("heavy").name == "reduced"
+    ctl._waiters = [object()] * 6
+    lvl = degradation.choose("heavy")
+    assert lvl.level == 3 and lvl.max_agent_queries == 1 and lvl.signals["reason"] == "queue_depth"
+    ctl._waiters = []
+
+    # Latency against the lane target (heavy: 10s); the higher signal wins.
+    ctl.service_s = 12.0
+    assert degradation.choose("heavy").name == "no_rewrite"
+    monkeypatch.setenv("DEGRADE_MAX_LEVEL", "1")
+    ctl.service_s = 30.0
+    assert degradation.choose("heavy").level == 1
+    monkeypatch.delenv("DEGRADE_MAX_LEVEL")
+
+    body = {
+        "contract_text": sample_bytes.decode("utf-8"),
+        "question": "Give me a risk analysis of this contract",
+        "intent_override": "risk_analysis",
+        "run_all_agents": True,
+    }
+    with TestClient(app) as c:
+        r = c.post("/analyze_text", json=body)
+        assert r.status_code == 200
+        out = r.json()
+        assert out["degradation_level"] == 3
+        assert out["analysis"]["degradation"]["name"] == "minimal"
+        for agent in ("legal", "compliance", "finance", "operations"):
+            section = out["analysis"]["agent_analysis"][agent]
+            assert "retrieval" not in section and section["evidence"]
+
+        # Load is back to normal: the degraded answer was not cached.
+        ctl.service_s = None
+        out = c.post("/analyze_text", json=body).json()
+        assert out["degradation_level"] == 0 and out["cache"] is None
+        assert "degradation" not in out["analysis"]
+        legal = out["analysis"]["agent_analysis"]["legal"]["retrieval"]
+        assert legal["top_k_per_query"] == 5 and len(legal["per_query"]) == 4
+
+        stats = c.get("/admin/admission", headers=ADMIN).json()["degradation"]
+        assert stats["applied"]["heavy"]["3"] >= 1
+
+
+def test_analysis_profiles_bundle_retrieval_knobs(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import memory_store, result_cache
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+
+    body = {
+        "contract_text": sample_bytes.decode("utf-8"),
+        "question": "Give me a risk analysis of this contract",
+        "intent_override": "risk_analysis",
+        "run_all_agents": True,
+    }
+    with TestClient(app) as c:
+        listed = c.get("/profiles").json()
+        assert listed["default"] == "balanced"
+        assert [p["name"] for p in listed["profiles"]] == ["fast", "balanced", "thorough"]
+
+        assert c.post("/analyze_text", json={**body, "profile": "turbo"}).status_code == 400
+
+        fast = c.post("/analyze_text", json={**body, "profile": "fast"}).json()["analysis"]
+        assert fast["profile"] == "fast"
+        legal = fast["agent_analysis"]["legal"]
+        assert legal["retrieval"]["top_k_per_query"] == 3 and len(legal["retrieval"]["per_query"]) == 1
+        assert len(legal["evidence"]) <= 3
+
+        # Same request, other profile: a different cache entry.
+        out = c.post("/analyze_text", json={**body, "profile": "Thorough"}).json()
+        assert out["cache"] is None and out["analysis"]["profile"] == "thorough"
+        legal = out["analysis"]["agent_analysis"]["legal"]["retrieval"]
+        assert legal["top_k_per_query"] == 8 and len(legal["per_query"]) == 4
+
+        # No profile means the default, which is what requests got before profiles existed.
+        out = c.post("/analyze_text", json=body).json()
+        assert out["cache"] is None and out["analysis"]["profile"] == "balanced"
+        assert c.post("/analyze_text", json={**body, "profile": "balanced"}).json()["cache"] == "exact"
+
+
+def test_query_planner_merges_duplicate_retrieval(sample_bytes: bytes):
+    from milestone3.backend import contract_pipeline as cp
+    from milestone3.backend import query_planner
+
+    rag = cp.LocalRAGIndex()
+    rag.build(sample_bytes.decode("utf-8"))
+    question = "What are the liability risks?"
+    agents = ["legal", "compliance", "finance", "operations"]
+
+    plan = cp.plan_retrieval(
+        question=question,
+        question_vec=None,
+        agents=agents,
+        agent_top_k=5,
+        max_agent_queries=4,
+        executive_agents=set(agents),
+        topic_top_k=6,
+    )
+    # 4 agents x 4 queries + 7 executive topics; the question itself is shared by all agents.
+    assert plan.requested == 23 and plan.unique == 20
+    assert query_planner.query_key("The Liability, risks?") == query_planner.query_key("risks of liability")
+
+    retrieved = plan.execute(rag)
+    # Each consumer gets exactly what it would have retrieved on its own.
+    for agent_type in agents:
+        planned = cp.run_agent(agent_type=agent_type, question=question, rag=rag, retrieved=retrieved)
+        direct = cp.run_agent(agent_type=agent_type, question=question, rag=rag)
+        planned.pop("timestamp"), direct.pop("timestamp")
+        assert planned == direct
+    assert cp.build_executive_report_data(
+        rag=rag, question=question, selected_agents=agents, retrieved=retrieved
+    ) == cp.build_executive_report_data(rag=rag, question=question, selected_agents=agents)
+
+
+def test_static_query_embeddings_are_persisted_and_dynamic_ones_cached(sample_bytes: bytes, tmp_path, monkeypatch):
+    import numpy as np
+
+    from milestone3.backend import contract_pipeline as cp
+    from milestone3.backend import query_embeddings
+
+    monkeypatch.setattr(query_embeddings, "QUERY_EMBED_DIR", tmp_path)
+    monkeypatch.setattr(query_embeddings, "_caches", {})
+    encoded: list[str] = []
+    encode = cp.LocalRAGIndex.encode
+
+    def counting_encode(self, texts, **kwargs):
+        encoded.extend(texts)
+        return encode(self, texts, **kwargs)
+
+    monkeypatch.setattr(cp.LocalRAGIndex, "encode", counting_encode)
+
+    static = cp.static_queries()
+    assert "audit reporting" in static and not any("{question}" in q for q in static)
+    assert cp.warm_query_embeddings()["encoded"] == len(static)
+    assert list(tmp_path.glob("*.npz"))
+
+    # A new process loads the persisted table instead of encoding.
+    monkeypatch.setattr(query_embeddings, "_caches", {})
+    assert cp.warm_query_embeddings()["encoded"] == 0
+
+    rag = cp.LocalRAGIndex()
+    rag.build(sample_bytes.decode("utf-8"))
+    encoded.clear()
+    assert rag.query("audit reporting", top_k=3) == rag.query_vector(encode(rag, ["audit reporting"])[0], top_k=3)
+    for _ in range(3):
+        rag.query("What is the notice period?")
+    assert encoded == ["What is the notice period?"]
+    assert np.allclose(rag.encode_queries(["What is the notice period?"]), encode(rag, ["What is the notice period?"]))
+
+    lru = query_embeddings.QueryEmbeddingCache("test", max_entries=2)
+    for text in ["a", "b", "c"]:
+        lru.put(text, np.ones(3))
+    assert lru.get("a") is None and lru.get("c") is not None and lru.stats()["evictions"] == 1
+
+
+def test_lazy_agent_sections_are_computed_on_demand(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import contract_pipeline, memory_store, result_cache
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+
+    body = {
+        "contract_text": sample_bytes.decode("utf-8"),
+        "question": "Give me a risk analysis of this contract",
+        "intent_override": "risk_analysis",
+        "run_all_agents": True,
+    }
+    with TestClient(app) as c:
+        eager = c.post("/analyze_text", json=body).json()
+        lazy = c.post("/analyze_text", json={**body, "lazy_agents": True}).json()
+        assert lazy["cache"] is None and eager["analysis_id"] is None
+        agents = lazy["analysis"]["agent_analysis"]
+        assert agents["lazy"] is True and agents["analysis_id"] == lazy["analysis_id"]
+        assert agents["selected_agents"] == ["legal", "compliance", "finance", "operations"]
+        assert "legal" not in agents
+        assert lazy["analysis"]["analysis"] == eager["analysis"]["analysis"]
+        assert len(json.dumps(lazy)) < len(json.dumps(eager))
+
+        url = f"/analyses/{lazy['analysis_id']}/agents/legal"
+        first = c.get(url).json()["section"]
+        expected = dict(eager["analysis"]["agent_analysis"]["legal"])
+        first.pop("timestamp"), expected.pop("timestamp")
+        assert first == expected
+
+        # Stored after the first request: later ones (from any worker) don't recompute.
+        contract_pipeline._INDEX_CACHE.clear()
+        monkeypatch.setattr(contract_pipeline, "run_agent", None)
+        assert c.get(url).json()["section"]["evidence"] == first["evidence"]
+
+        assert c.get(f"/analyses/{lazy['analysis_id']}/agents/marketing").status_code == 404
+        assert c.get("/analyses/unknown/agents/legal").status_code == 404
+
+
+def test_daily_compute_quota_is_enforced_and_reported(sample_bytes: bytes, tmp_path, monkeypatch):
+    import time
+
+    from milestone3.backend import db_sqlite
+
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    with TestClient(app) as c:
+        assert c.post("/auth/register", json={"email": "Batch@Example.com", "password": "secret", "name": "Batch"}).status_code == 200
+        token = c.post("/auth/login", json={"email": "batch@example.com", "password": "secret"}).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        r = c.put("/admin/users/batch@example.com/limits", json={"daily_compute_s": 0.0001, "weight": 2}, headers=ADMIN)
+        assert r.json()["limits"] == {"weight": 2.0, "max_concurrent": 2, "daily_compute_s": 0.0001}
+
+        payload = {"contract_text": sample_bytes.decode("utf-8"), "question": "What are the payment terms?"}
+        assert c.post("/analyze_text", json=payload, headers=headers).status_code == 200
+        for _ in range(100):
+            if c.get("/usage", headers=headers).json()["requests"] == 1:
+                break
+            time.sleep(0.01)
+
+        r = c.post("/analyze_text", json=payload, headers=headers)
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) >= 1
+
+        # Anonymous callers (and expired sessions) share their own default, unlimited bucket.
+        assert c.post("/analyze_text", json=payload).status_code == 200
+        assert c.post("/analyze_text", json=payload, headers={"Authorization": "Bearer nope"}).status_code == 200
+
+        for _ in range(100):
+            report = c.get("/admin/usage", headers=ADMIN).json()
+            if len(report["users"]) == 2 and report["users"][1]["rejected"] == 1:
+                break
+            time.sleep(0.01)
+        assert [u["email"] for u in report["users"]] == ["anonymous:testclient", "batch@example.com"]
+        usage = c.get("/usage", headers=headers).json()
+        assert usage["requests"] == 1 and usage["compute_s"] > 0 and usage["remaining_s"] == 0.0
+
+
+def test_anonymous_clients_are_scheduled_and_metered_separately(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import db_sqlite
+
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+    monkeypatch.setenv("RESULT_CACHE", "0")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    # No per-caller cap for anonymous callers unless one is configured.
+    assert db_sqlite.get_user_limits("anonymous:10.0.0.1")["max_concurrent"] is None
+    assert db_sqlite.get_user_limits("someone@example.com")["max_concurrent"] == 2
+
+    monkeypatch.setenv("ANONYMOUS_DAILY_COMPUTE_S", "1")
+    db_sqlite.record_usage("anonymous:10.0.0.1", compute_s=2.0, requests=1)
+    payload = {"contract_text": sample_bytes.decode("utf-8"), "question": "What are the payment terms?"}
+
+    first = TestClient(app, client=("10.0.0.1", 50000))
+    second = TestClient(app, client=("10.0.0.2", 50000))
+    assert first.post("/analyze_text", json=payload).status_code == 429
+    assert second.post("/analyze_text", json=payload).status_code == 200
+
+    # An admin override for "anonymous" applies to each anonymous caller on its own.
+    db_sqlite.set_user_limits("anonymous", max_concurrent=1)
+    assert db_sqlite.get_user_limits("anonymous:10.0.0.2")["max_concurrent"] == 1
+    assert db_sqlite.quota_status("anonymous:10.0.0.2")["remaining_s"] > 0
+
+
+def test_admin_routes_require_the_admin_token(tmp_path, monkeypatch):
+    from milestone3.backend import db_sqlite
+
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+    client.post("/auth/register", json={"email": "self@example.com", "password": "secret", "name": "Self", "role": "Admin"})
+    token = client.post("/auth/login", json={"email": "self@example.com", "password": "secret"}).json()["token"]
+    user = {"Authorization": f"Bearer {token}"}
+
+    routes = [
+        ("get", "/admin/cache", None),
+        ("get", "/admin/admission", None),
+        ("get", "/admin/concurrency", None),
+        ("get", "/admin/embeddings", None),
+        ("get", "/admin/jobs", None),
+        ("get", "/admin/usage", None),
+        ("put", "/admin/users/self@example.com/limits", {"weight": 100, "max_concurrent": 0, "daily_compute_s": 0}),
+    ]
+    for method, url, body in routes:
+        kwargs = {"json": body} if body is not None else {}
+        assert getattr(client, method)(url, **kwargs).status_code == 401
+        # A self-assigned "Admin" role is not enough.
+        assert getattr(client, method)(url, headers=user, **kwargs).status_code == 403
+        assert getattr(client, method)(url, headers=ADMIN, **kwargs).status_code == 200
+
+    monkeypatch.delenv("ADMIN_TOKEN")
+    assert client.get("/admin/cache", headers=ADMIN).status_code == 403
+
+
+def test_quota_applies_to_jobs_streams_and_bulk_uploads(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import db_sqlite
+
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+
+    with TestClient(app) as c:
+        assert c.post("/auth/register", json={"email": "bulk@example.com", "password": "secret", "name": "Bulk"}).status_code == 200
+        token = c.post("/auth/login", json={"email": "bulk@example.com", "password": "secret"}).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        c.put("/admin/users/bulk@example.com/limits", json={"daily_compute_s": 1.0}, headers=ADMIN)
+        db_sqlite.record_usage("bulk@example.com", compute_s=2.0, requests=1)
+
+        upload = {"file": ("contract.txt", sample_bytes, "text/plain")}
+        form = {"question": "What are the payment terms?"}
+        payload = {"contract_text": sample_bytes.decode("utf-8"), **form}
+        rejected = [
+            c.post("/jobs", files=upload, data=form, headers=headers),
+            c.post("/jobs/text", json=payload, headers=headers),
+            c.post("/analyze_contracts", files={"files": ("a.txt", sample_bytes, "text/plain")}, headers=headers),
+            c.post("/analyze_text_stream", json=payload, headers=headers),
+            c.post("/ingest", files=upload, headers=headers),
+        ]
+        for r in rejected:
+            assert r.status_code == 429
+            assert int(r.headers["Retry-After"]) >= 1
+
+
+def test_follow_up_questions_are_prefetched_into_the_result_cache(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import contract_pipeline, db_sqlite, lanes, memory_store, prefetch, result_cache
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+    monkeypatch.setenv("PREFETCH_MAX_BUSY", "1")
+
+    # Every standard follow-up routes to the topic it stands for.
+    for topic, question in prefetch.FOLLOW_UP_QUESTIONS:
+        assert topic in contract_pipeline._requested_topics(question)
+
+    contract_text = sample_bytes.decode("utf-8") + "\n\nPrefetch test copy."
+    body = {"contract_text": contract_text, "question": "Provide a risk analysis", "intent_override": "risk_analysis"}
+    before = prefetch.prefetch_stats()
+    n = len(prefetch.FOLLOW_UP_QUESTIONS)
+    with TestClient(app) as c:
+        assert c.post("/analyze_text", json=body).json()["cache"] is None
+        for _ in range(500):
+            stats = c.get("/admin/cache", headers=ADMIN).json()["prefetch"]
+            if stats["questions"] + stats["errors"] >= before["questions"] + before["errors"] + n:
+                break
+            time.sleep(0.01)
+        assert stats["scheduled"] == before["scheduled"] + 1 and stats["errors"] == before["errors"]
+        assert stats["questions"] == before["questions"] + n
+        assert c.get("/admin/admission", headers=ADMIN).json()["executors"]["lanes"]["background"]["submitted"] > 0
+
+        # A contract is prefetched once per set of parameters.
+        c.post("/analyze_text", json={**body, "question": "When can either party terminate?"})
+        assert c.get("/admin/cache", headers=ADMIN).json()["prefetch"]["scheduled"] == before["scheduled"] + 1
+
+        # The dashboard's follow-up box: answered without touching the index.
+        def _no_index(*args, **kwargs):
+            raise AssertionError("index must not be built for a prefetched follow-up")
+
+        monkeypatch.setattr(contract_pipeline.LocalRAGIndex, "build", _no_index)
+        follow_up = {**body, "question": "What are the payment terms?", "intent_override": "qa"}
+        r = c.post("/analyze_text", json=follow_up).json()
+        assert r["cache"] == "exact"
+        assert "fifteen (15) days" in r["report"]
+
+    # Background work waits for foreground requests to finish.
+    with lanes.track_request(lanes.INTERACTIVE):
+        assert lanes.foreground_active() == 1
+    assert lanes.foreground_active() == 0
+
+
+def test_ingest_warms_index_and_first_analysis_at_background_priority(sample_bytes: bytes, tmp_path, monkeypatch):
+    from milestone3.backend import contract_pipeline, db_sqlite, memory_store, prefetch, result_cache
+
+    monkeypatch.setattr(memory_store, "MEMORY_DB_PATH", tmp_path / "memory.sqlite3")
+    monkeypatch.setattr(memory_store, "MEMORY_DIR", tmp_path)
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DB_PATH", tmp_path / "result_cache.sqlite3")
+    monkeypatch.setattr(db_sqlite, "DB_PATH", tmp_path / "backend.sqlite3")
+    monkeypatch.setenv("PREFETCH_MAX_BUSY", "1")
+    monkeypatch.setenv("MEMORY_RECALL_THRESHOLD", "2")
+
+    contract = sample_bytes + b"\n\nIngest test copy."
+    form = {
+        "question": "Provide comprehensive contract analysis",
+        "tone": "executive",
+        "no_evidence_threshold": "0.15",
+        "intent_override": "risk_analysis",
+        "run_all_agents": "true",
+    }
+    before = prefetch.prefetch_stats()
+    with TestClient(app) as c:
+        assert c.post("/ingest", files={"file": ("c.txt", b"  ", "text/plain")}).status_code == 400
+        r = c.post("/ingest", files={"file": ("c.txt", contract, "text/plain")}, data=form)
+        assert r.status_code == 202 and r.json()["status"] == "queued"
+        for _ in range(500):
+            stats = c.get("/admin/cache", headers=ADMIN).json()["prefetch"]
+            if stats["ingested"] + stats["errors"] > before["ingested"] + before["errors"]:
+                break
+            time.sleep(0.01)
+        assert stats["ingested"] == before["ingested"] + 1 and stats["errors"] == before["errors"]
+
+        def _no_index(*args, **kwargs):
+            raise AssertionError("a pre-ingested contract must not be indexed again")
+
+        monkeypatch.setattr(contract_pipeline.LocalRAGIndex, "build", _no_index)
+        files = {"file": ("c.txt", contract, "text/plain")}
+        first = c.post("/analyze", files=files, data=form).json()
+        assert first["contract_id"] == r.json()["contract_id"]
+        assert first["cache"] == "exact"
+        assert set(first["analysis"]["agent_analysis"]["selected_agents"]) == {"legal", "compliance", "finance", "operations"}
+
+        # Another question only runs its own steps, over the warm index.
+        other = c.post("/analyze", files=files, data={**form, "question": "Which clauses carry the most risk?"}).json()
+        assert other["cache"] is None and other["analysis"]["agent_analysis"]["legal"]
@@ -3,7 +3,7 @@ from __future__ import annotations
 import time
 import base64
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 import streamlit as st
 from services.analysis import ContractAnalyzer
@@ -14,6 +14,54 @@ from components.final_report import JsonEvidencePanel, ReportSummary
 from components.pdf_preview import PDFPreviewWithHighlights, ConfirmationPanel
 from components.qa_report import QuestionAnswerReport, QuestionAnswerWithPDF
 
+# Analysis profiles (speed vs. evidence depth) come from the backend's GET /profiles;
+# these are only used when it can't be reached or predates profiles.
+FALLBACK_PROFILE_OPTIONS = {"Balanced": "balanced", "Fast": "fast", "Thorough": "thorough"}
+FALLBACK_PROFILE_HELP = (
+    "Fast: one query per agent, no LLM rewrite. "
+    "Balanced: the default. "
+    "Thorough: deeper retrieval and more evidence per section."
+)
+# Initial analysis when the user leaves the question empty.
+DEFAULT_ANALYSIS_QUESTION = (
+    "Provide comprehensive contract analysis covering risks, payment terms, termination, liability, and compliance."
+)
+
+
+def _session_token() -> str:
+    # Sent with every backend call so quotas and fair scheduling see this user, not one
+    # anonymous caller for the whole UI server.
+    user = st.session_state.get("user") or {}
+    token = st.session_state.get("token") or (user.get("token") if isinstance(user, dict) else None)
+    return (token or "").strip()
+
+
+def _profile_options() -> Tuple[Dict[str, str], str]:
+    """(label -> profile name, help text), default profile first. Fetched once per session."""
+    cached = st.session_state.get("profile_options")
+    if cached:
+        return cached
+
+    listing = ContractAnalyzer().list_profiles()
+    entries = [p for p in listing.get("profiles") or [] if isinstance(p, dict) and p.get("name")]
+    if not entries:
+        # Not cached, so a backend that was briefly down is asked again on the next rerun.
+        return FALLBACK_PROFILE_OPTIONS, FALLBACK_PROFILE_HELP
+
+    default = listing.get("default")
+    entries.sort(key=lambda p: p["name"] != default)
+    options = {str(p["name"]).title(): str(p["name"]) for p in entries}
+    help_text = " ".join(f"{str(p['name']).title()}: {p.get('description') or ''}".strip() for p in entries)
+    st.session_state["profile_options"] = (options, help_text)
+    return options, help_text
+
+
+def _selected_profile() -> str:
+    options, _ = _profile_options()
+    label = st.session_state.get("analysis_profile_select")
+    return options.get(label) or next(iter(options.values()))
+
+
 def dashboard_page():
     # Surface any history-load error from sidebar/history page.
     if st.session_state.get("history_load_error"):
@@ -78,6 +126,22 @@ def dashboard_page():
             
             # Show PDF preview with auto-highlights
             file_bytes = files.getvalue()
+
+            # Let the backend index and profile the contract while the user reads the preview,
+            # with the parameters "Start Analysis" sends by default. Once per upload.
+            upload_key = f"{uploader_key}:{files.name}:{files.size}"
+            if st.session_state.get("ingested_upload") != upload_key:
+                st.session_state["ingested_upload"] = upload_key
+                ContractAnalyzer(token=_session_token() or None).ingest_file(
+                    file_bytes=file_bytes,
+                    filename=files.name,
+                    question=DEFAULT_ANALYSIS_QUESTION,
+                    tone="Executive",
+                    no_evidence_threshold=0.15,
+                    intent_override="risk_analysis",
+                    run_all_agents=True,
+                    profile=_selected_profile(),
+                )
             PDFPreviewWithHighlights(file_bytes, files.name)
             
             # Confirmation button
@@ -101,6 +165,13 @@ def dashboard_page():
                     key="query_box_input",
                     help="Leave empty for comprehensive contract analysis"
                 )
+                profile_options, profile_help = _profile_options()
+                st.selectbox(
+                    "Analysis Profile",
+                    list(profile_options),
+                    key="analysis_profile_select",
+                    help=profile_help,
+                )
             
             st.markdown("<br>", unsafe_allow_html=True)
             
@@ -119,16 +190,16 @@ def dashboard_page():
         analyze_btn = False
 
     
-    analyzer = ContractAnalyzer()
+    analyzer = ContractAnalyzer(token=_session_token() or None)
     q = (st.session_state.get("query_box_input") or "").strip()
     tone = "Executive"  # Default tone for initial analysis
     full_review = True  # Always run full review for initial analysis
+    profile = _selected_profile()
 
     user = st.session_state.get("user") or {}
     user_email = (user.get("email") or "").strip().lower() if isinstance(user, dict) else ""
 
-# ✅ FIX — token is stored separately, not inside user
-    token = (st.session_state.get("token") or "").strip()
+    token = _session_token()
 
 
     # Initialize QA history
@@ -143,7 +214,7 @@ def dashboard_page():
         intent_override = None
         # If no question provided, use comprehensive analysis
         if not q:
-            q = "Provide comprehensive contract analysis covering risks, payment terms, termination, liability, and compliance."
+            q = DEFAULT_ANALYSIS_QUESTION
             intent_override = "risk_analysis"
         
         progress = st.progress(0)
@@ -151,16 +222,45 @@ def dashboard_page():
         
         status.markdown(f"**📄 Analyzing:** `{files.name}`...")
         file_bytes = files.getvalue()
-        
-        res = analyzer.analyze_file(
+        early = st.empty()
+        stage_state = {"agents_total": 0, "agents_done": 0}
+
+        def _on_stage(event):
+            # Render evidence and finished agents while the slower ones run.
+            kind = event.get("event")
+            if kind == "plan":
+                stage_state["agents_total"] = len(event.get("selected_agents") or [])
+                progress.progress(0.1)
+            elif kind == "probe":
+                progress.progress(0.3)
+                top = (event.get("evidence") or [{}])[0].get("text") or ""
+                if top:
+                    early.info(f"**Top evidence:** {top[:300]}")
+            elif kind == "executive":
+                progress.progress(0.5)
+                overall = ((event.get("analysis") or {}).get("overall_risk") or "unknown").upper()
+                status.markdown(f"**📄 Analyzing:** `{files.name}` — overall risk so far: **{overall}**")
+            elif kind == "agent":
+                stage_state["agents_done"] += 1
+                total = max(stage_state["agents_total"], stage_state["agents_done"])
+                progress.progress(0.5 + 0.45 * stage_state["agents_done"] / total)
+                status.markdown(
+                    f"**📄 Analyzing:** `{files.name}` — {event.get('agent_type', 'agent').title()} review done "
+                    f"({stage_state['agents_done']}/{total})"
+                )
+
+        res = analyzer.analyze_file_stream(
             file_bytes=file_bytes,
             filename=files.name,
             question=q,
             tone=tone,
+            on_event=_on_stage,
             no_evidence_threshold=0.15,
             intent_override=intent_override,
             run_all_agents=bool(full_review),
+            profile=profile,
         )
+        early.empty()
         res["filename"] = files.name
         res["_file_b64"] = base64.b64encode(file_bytes).decode("utf-8")
         res["_file_mime"] = "application/pdf"
@@ -250,6 +350,7 @@ def dashboard_page():
                                 no_evidence_threshold=0.15,
                                 intent_override="qa", 
                                 run_all_agents=False,
+                                profile=profile,
                             )
                             res_sub["filename"] = current_name
                             
@@ -281,6 +382,16 @@ def dashboard_page():
             if not full_review_report:
                 st.info("ℹ️ Agents will be automatically selected based on your analysis question.")
 
+            profile_options, profile_help = _profile_options()
+            profile_names = list(profile_options.values())
+            report_profile = st.selectbox(
+                "Report Profile",
+                list(profile_options),
+                index=profile_names.index(profile) if profile in profile_names else 0,
+                key="report_profile_select",
+                help=profile_help,
+            )
+
             no_evidence_threshold = st.slider(
                 "No-evidence threshold", 
                 0.05, 0.50, 0.15, 0.05,
@@ -326,14 +437,22 @@ def dashboard_page():
 
             status.markdown(f"**📄 Running {'comprehensive' if full_review_setting else 'focused'} analysis...**")
 
-            res = analyzer.analyze_file(
+            def _on_job_progress(fraction, stage):
+                progress.progress(min(1.0, max(0.0, fraction)))
+                if stage and stage.startswith("agent:"):
+                    status.markdown(f"**📄 {stage.split(':', 1)[1].title()} review done...**")
+
+            # Report runs every agent; poll a backend job instead of holding one long request.
+            res = analyzer.analyze_file_job(
                 file_bytes=analysis_pdf_bytes,
                 filename=analysis_result.get("filename", "document.pdf"),
                 question=report_question,
                 tone=report_tone,
+                on_progress=_on_job_progress,
                 no_evidence_threshold=float(no_evidence_threshold),
                 intent_override="risk_analysis",
                 run_all_agents=bool(full_review_setting),
+                profile=profile_options[report_profile],
             )
             
             progress.progress(1.0)
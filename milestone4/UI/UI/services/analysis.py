@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import json
 import os
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Callable, Dict, Optional
 
 import requests
 
@@ -69,6 +71,7 @@ class BackendContractAnalyzer:
         contract_id: Optional[str] = None,
         intent_override: Optional[str] = None,
         run_all_agents: bool = False,
+        profile: Optional[str] = None,
     ) -> Dict[str, Any]:
 
         url = f"{self.base_url}/analyze"
@@ -96,6 +99,9 @@ class BackendContractAnalyzer:
         if run_all_agents:
             data["run_all_agents"] = "true"
 
+        if profile:
+            data["profile"] = profile
+
         try:
             r = requests.post(
                 url,
@@ -118,6 +124,322 @@ class BackendContractAnalyzer:
 
     # --------------------------------------------------
 
+    def analyze_file_stream(
+        self,
+        *,
+        file_bytes: bytes,
+        filename: str,
+        question: str,
+        tone: str,
+        on_event: Callable[[Dict[str, Any]], None],
+        no_evidence_threshold: float = 0.25,
+        contract_id: Optional[str] = None,
+        intent_override: Optional[str] = None,
+        run_all_agents: bool = False,
+        profile: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Like analyze_file, but calls `on_event` for each stage (plan, probe,
+        executive, agent) as the backend finishes it. Returns the same dict as
+        analyze_file. Falls back to analyze_file on backends without streaming."""
+
+        url = f"{self.base_url}/analyze_stream"
+
+        files = {
+            "file": (
+                filename,
+                file_bytes,
+                _guess_content_type(filename),
+            )
+        }
+
+        data: Dict[str, Any] = {
+            "question": question,
+            "tone": _normalize_tone(tone),
+            "no_evidence_threshold": str(no_evidence_threshold),
+        }
+
+        if contract_id:
+            data["contract_id"] = contract_id
+
+        if intent_override:
+            data["intent_override"] = intent_override
+
+        if run_all_agents:
+            data["run_all_agents"] = "true"
+
+        if profile:
+            data["profile"] = profile
+
+        fallback = dict(
+            file_bytes=file_bytes,
+            filename=filename,
+            question=question,
+            tone=tone,
+            no_evidence_threshold=no_evidence_threshold,
+            contract_id=contract_id,
+            intent_override=intent_override,
+            run_all_agents=run_all_agents,
+            profile=profile,
+        )
+
+        try:
+            r = requests.post(
+                url,
+                files=files,
+                data=data,
+                headers=self._headers(),
+                timeout=self.timeout_s,
+                stream=True,
+            )
+        except Exception as e:
+            return {"error": f"Failed to reach backend at {self.base_url}: {e}"}
+
+        with r:
+            if r.status_code == 404:
+                return self.analyze_file(**fallback)
+
+            if r.status_code >= 400:
+                return {
+                    "error": f"Backend error {r.status_code}",
+                    "detail": _safe_json(r),
+                    "status_code": r.status_code,
+                }
+
+            try:
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    kind = event.get("event")
+                    if kind == "final":
+                        return {
+                            "contract_id": (event.get("analysis") or {}).get("contract_id"),
+                            "cache": event.get("cache"),
+                            "analysis": event.get("analysis"),
+                            "report": event.get("report"),
+                        }
+                    if kind == "error":
+                        return {"error": "Backend error", "detail": event.get("detail")}
+                    on_event(event)
+            except Exception as e:
+                return {"error": f"Stream from {self.base_url} interrupted: {e}"}
+
+        return {"error": "Backend stream ended without a result"}
+
+    # --------------------------------------------------
+
+    def analyze_file_job(
+        self,
+        *,
+        file_bytes: bytes,
+        filename: str,
+        question: str,
+        tone: str,
+        on_progress: Optional[Callable[[float, Optional[str]], None]] = None,
+        no_evidence_threshold: float = 0.25,
+        contract_id: Optional[str] = None,
+        intent_override: Optional[str] = None,
+        run_all_agents: bool = False,
+        profile: Optional[str] = None,
+        poll_interval_s: float = 1.5,
+        max_wait_s: float = 1800.0,
+    ) -> Dict[str, Any]:
+        """Submit the analysis as a backend job and poll until it finishes.
+
+        Each HTTP call is short, so long analyses no longer hit `timeout_s`.
+        Returns the same dict as analyze_file. Falls back to analyze_file on
+        backends without the job API."""
+
+        files = {
+            "file": (
+                filename,
+                file_bytes,
+                _guess_content_type(filename),
+            )
+        }
+
+        data: Dict[str, Any] = {
+            "question": question,
+            "tone": _normalize_tone(tone),
+            "no_evidence_threshold": str(no_evidence_threshold),
+        }
+
+        if contract_id:
+            data["contract_id"] = contract_id
+
+        if intent_override:
+            data["intent_override"] = intent_override
+
+        if run_all_agents:
+            data["run_all_agents"] = "true"
+
+        if profile:
+            data["profile"] = profile
+
+        try:
+            r = requests.post(
+                f"{self.base_url}/jobs",
+                files=files,
+                data=data,
+                headers=self._headers(),
+                timeout=self.timeout_s,
+            )
+        except Exception as e:
+            return {"error": f"Failed to reach backend at {self.base_url}: {e}"}
+
+        if r.status_code == 404:
+            return self.analyze_file(
+                file_bytes=file_bytes,
+                filename=filename,
+                question=question,
+                tone=tone,
+                no_evidence_threshold=no_evidence_threshold,
+                contract_id=contract_id,
+                intent_override=intent_override,
+                run_all_agents=run_all_agents,
+                profile=profile,
+            )
+
+        if r.status_code >= 400:
+            return {
+                "error": f"Backend error {r.status_code}",
+                "detail": _safe_json(r),
+                "status_code": r.status_code,
+            }
+
+        return self.wait_for_job(
+            r.json()["job_id"],
+            on_progress=on_progress,
+            poll_interval_s=poll_interval_s,
+            max_wait_s=max_wait_s,
+        )
+
+    def ingest_file(
+        self,
+        *,
+        file_bytes: bytes,
+        filename: str,
+        question: str,
+        tone: str,
+        no_evidence_threshold: float = 0.25,
+        intent_override: Optional[str] = None,
+        run_all_agents: bool = False,
+        profile: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Let the backend index the contract and run the given analysis in the
+        background while the user reviews the preview (`POST /ingest`).
+
+        Pass the parameters the confirmed analysis will use. Best effort: returns
+        an error dict instead of raising, and older backends just skip it."""
+
+        files = {
+            "file": (
+                filename,
+                file_bytes,
+                _guess_content_type(filename),
+            )
+        }
+
+        data: Dict[str, Any] = {
+            "question": question,
+            "tone": _normalize_tone(tone),
+            "no_evidence_threshold": str(no_evidence_threshold),
+        }
+
+        if intent_override:
+            data["intent_override"] = intent_override
+
+        if run_all_agents:
+            data["run_all_agents"] = "true"
+
+        if profile:
+            data["profile"] = profile
+
+        try:
+            r = requests.post(
+                f"{self.base_url}/ingest",
+                files=files,
+                data=data,
+                headers=self._headers(),
+                timeout=min(self.timeout_s, 15.0),
+            )
+        except Exception as e:
+            return {"error": f"Failed to reach backend at {self.base_url}: {e}"}
+
+        if r.status_code >= 400:
+            return {
+                "error": f"Backend error {r.status_code}",
+                "detail": _safe_json(r),
+                "status_code": r.status_code,
+            }
+
+        return r.json()
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        try:
+            r = requests.get(
+                f"{self.base_url}/jobs/{job_id}",
+                headers=self._headers(),
+                timeout=min(self.timeout_s, 30.0),
+            )
+        except Exception as e:
+            return {"error": f"Failed to reach backend at {self.base_url}: {e}", "transient": True}
+
+        if r.status_code >= 400:
+            return {
+                "error": f"Backend error {r.status_code}",
+                "detail": _safe_json(r),
+                "status_code": r.status_code,
+            }
+
+        return r.json()
+
+    def wait_for_job(
+        self,
+        job_id: str,
+        *,
+        on_progress: Optional[Callable[[float, Optional[str]], None]] = None,
+        poll_interval_s: float = 1.5,
+        max_wait_s: float = 1800.0,
+    ) -> Dict[str, Any]:
+        deadline = time.monotonic() + max_wait_s
+
+        while time.monotonic() < deadline:
+            job = self.get_job(job_id)
+
+            # The job keeps running on the backend; ride out brief network errors.
+            if job.get("transient"):
+                time.sleep(poll_interval_s)
+                continue
+
+            if "error" in job and "status" not in job:
+                return job
+
+            if on_progress:
+                on_progress(float(job.get("progress") or 0.0), job.get("stage"))
+
+            if job.get("status") == "done":
+                return job.get("result") or {"error": "Job finished without a result"}
+
+            if job.get("status") == "error":
+                return {"error": "Analysis failed", "detail": job.get("error"), "job_id": job_id}
+
+            time.sleep(poll_interval_s)
+
+        return {"error": f"Analysis still running after {int(max_wait_s)}s", "job_id": job_id}
+
+    def list_profiles(self) -> Dict[str, Any]:
+        """Analysis profiles offered by the backend ({} on older backends)."""
+        try:
+            r = requests.get(f"{self.base_url}/profiles", timeout=min(self.timeout_s, 10.0))
+        except Exception:
+            return {}
+        if r.status_code >= 400:
+            return {}
+        return r.json()
+
+    # --------------------------------------------------
+
     def analyze_text(
         self,
         *,
@@ -128,6 +450,7 @@ class BackendContractAnalyzer:
         contract_id: Optional[str] = None,
         intent_override: Optional[str] = None,
         run_all_agents: bool = False,
+        profile: Optional[str] = None,
     ) -> Dict[str, Any]:
 
         url = f"{self.base_url}/analyze_text"
@@ -148,6 +471,9 @@ class BackendContractAnalyzer:
         if run_all_agents:
             payload["run_all_agents"] = True
 
+        if profile:
+            payload["profile"] = profile
+
         try:
             r = requests.post(
                 url,